@@ -5,26 +5,31 @@ import time
 import json
 import os
 import random
-from collections import deque
-import pygame
+import math
 import cv2
 import numpy as np
-from PIL import Image, ImageTk
+from PIL import Image
 import tkinter.simpledialog
 import shutil
 import uuid
-try:
-    from PyQt5.QtWidgets import QApplication, QSplashScreen, QLabel
-    from PyQt5.QtCore import Qt, QTimer
-    from PyQt5.QtGui import QPixmap, QPainter
-    PYQT_AVAILABLE = True
-except ImportError:
-    print("⚠️ PyQt5 not installed. Install with: pip install PyQt5")
-    PYQT_AVAILABLE = False
+# pygame and PyQt5 are imported under the __main__ guard at the bottom: decode
+# worker processes re-import this script as __mp_main__ and need neither
 
 
 # Import your working device handler
 from device_handler import IntifaceClient
+from pattern_sequencer import PatternSequencer
+from clock import MonotonicClock
+from position_bus import PositionBus, PositionFileExporter, PositionUpdate
+from position_shm import MODE_MANUAL, MODE_PATTERN, PositionShmWriter
+from motion_broadcast import MotionBroadcaster
+from video_frames import (FrameProvider, PositionFrameTable, VideoPreloader, fit_size,
+                          DEFAULT_MEMORY_BUDGET, FULLSCREEN_MEMORY_BUDGET, FULLSCREEN_PREFETCH)
+from frame_atlas import FrameAtlasCache
+from parallel_decode import render_thumbnail, render_thumbnails, shutdown_pool
+from video_proxy import ProxyTranscoder, find_proxy, proxy_path_for
+from motion_mapping import MotionMapCache, LUT_STEPS
+from display_surface import DisplaySurface
 
 
 class MoansManager:
@@ -130,6 +135,10 @@ class VideoGallery:
         # Thumbnail settings - MUCH BIGGER!
         self.thumbnail_size = (400, 300)  # MUCH BIGGER thumbnails!  
         
+        # All-intra proxies for fast random seeks (saved in gallery.json)
+        self.build_proxies = True
+        self.proxy_transcoder = ProxyTranscoder(os.path.join(self.gallery_folder, "proxies"))
+        
         # Create gallery folders
         self.ensure_gallery_folders()
         
@@ -141,7 +150,8 @@ class VideoGallery:
         folders = [
             self.gallery_folder,
             os.path.join(self.gallery_folder, "videos"),
-            os.path.join(self.gallery_folder, "thumbnails")
+            os.path.join(self.gallery_folder, "thumbnails"),
+            os.path.join(self.gallery_folder, "proxies")
         ]
         
         for folder in folders:
@@ -152,35 +162,9 @@ class VideoGallery:
     def generate_thumbnail(self, video_path, output_path):
         """Generate thumbnail from video file"""
         try:
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                print(f"❌ Could not open video: {video_path}")
-                return False
-            
-            # Get video properties
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            
-            # Seek to middle of video for thumbnail
-            middle_frame = total_frames // 2
-            cap.set(cv2.CAP_PROP_POS_FRAMES, middle_frame)
-            
-            ret, frame = cap.read()
-            cap.release()
-            
-            if not ret:
+            if not render_thumbnail(video_path, output_path, self.thumbnail_size):
                 print(f"❌ Could not read frame from video: {video_path}")
                 return False
-            
-            # Convert BGR to RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Create PIL Image and resize
-            pil_image = Image.fromarray(frame_rgb)
-            pil_image = pil_image.resize(self.thumbnail_size, Image.Resampling.LANCZOS)
-            
-            # Save thumbnail
-            pil_image.save(output_path, "PNG")
             print(f"✅ Generated thumbnail: {output_path}")
             return True
             
@@ -207,6 +191,7 @@ class VideoGallery:
                     self.videos = data.get('videos', [])
                     self.current_index = data.get('current_index', 0)
                     self.gallery_page = data.get('gallery_page', 0)
+                    self.build_proxies = data.get('build_proxies', True)
                 
                     # Validate indices
                     if self.current_index >= len(self.videos):
@@ -216,6 +201,7 @@ class VideoGallery:
             
                 # Regenerate missing thumbnails
                 self.check_and_regenerate_thumbnails()
+                self.queue_proxies()
             else:
                 self.videos = []
                 self.current_index = 0
@@ -227,7 +213,8 @@ class VideoGallery:
             self.gallery_page = 0
     
     def check_and_regenerate_thumbnails(self):
-        """Check for missing thumbnails and regenerate them"""
+        """Check for missing thumbnails and regenerate them - in parallel worker processes"""
+        missing = []
         for video in self.videos:
             thumbnail_path = video.get('thumbnail_path')
             if not thumbnail_path or not os.path.exists(thumbnail_path):
@@ -236,14 +223,22 @@ class VideoGallery:
                 if video_file and os.path.exists(video_file):
                     thumbnail_filename = f"thumb_{video['id']}.png"
                     thumbnail_path = os.path.join(self.gallery_folder, "thumbnails", thumbnail_filename)
-                    
-                    if self.generate_thumbnail(video_file, thumbnail_path):
-                        video['thumbnail_path'] = thumbnail_path
-                        print(f"🔄 Regenerated thumbnail for: {video['name']}")
+                    missing.append((video, (video_file, thumbnail_path, self.thumbnail_size)))
+        
+        results = render_thumbnails([job for _, job in missing])
+        for (video, job), generated in zip(missing, results):
+            if generated:
+                video['thumbnail_path'] = job[1]
+                print(f"🔄 Regenerated thumbnail for: {video['name']}")
         
         # Save updated gallery
         self.save_gallery()
     
+    def queue_proxies(self):
+        """Transcode intra-frame proxies for gallery videos that lack one (background)"""
+        if self.build_proxies:
+            self.proxy_transcoder.enqueue([video.get('file_path') for video in self.videos])
+    
     def save_gallery(self):
         """Save gallery to JSON file"""
         try:
@@ -251,7 +246,8 @@ class VideoGallery:
             gallery_data = {
                 'videos': self.videos,
                 'current_index': self.current_index,    # ADD THIS LINE
-                'gallery_page': self.gallery_page       # ADD THIS LINE TOO
+                'gallery_page': self.gallery_page,      # ADD THIS LINE TOO
+                'build_proxies': self.build_proxies
             }
             with open(gallery_file, 'w') as f:
                 json.dump(gallery_data, f, indent=2)
@@ -288,6 +284,7 @@ class VideoGallery:
             
             self.videos.append(video_entry)
             self.save_gallery()
+            self.queue_proxies()
             
             print(f"✅ Saved video: {name} (with thumbnail: {thumbnail_generated})")
             return True
@@ -301,9 +298,12 @@ class VideoGallery:
         try:
             video = next((v for v in self.videos if v['id'] == video_id), None)
             if video:
-                # Delete video file
+                # Delete video file and its proxy
                 if os.path.exists(video['file_path']):
                     os.remove(video['file_path'])
+                proxy_path = proxy_path_for(video['file_path'], self.proxy_transcoder.directory)
+                if os.path.exists(proxy_path):
+                    os.remove(proxy_path)
                 
                 # Delete thumbnail file
                 thumbnail_path = video.get('thumbnail_path')
@@ -1078,529 +1078,6 @@ class JoystickController:
                time.sleep(0.1)
 
                
-class PatternSequencer:
-    """AI-driven pattern sequencer - FIXED TRANSITION PAUSES"""
-    
-    def __init__(self):
-        self.pattern_database = {}
-        
-        # FIXED motion stream - NO GAPS
-        self.motion_stream = deque()
-        self.stream_target_duration = 8000  # 8 seconds buffer
-        self.last_command_time = 0
-        
-        # Manual override state
-        self.manual_override_active = False
-        self.manual_return_position = 0.5
-        
-        # Speed control
-        self.base_speed = 0.75
-        self.joystick_speed_multiplier = 1.0
-        
-        # Build-up mode
-        self.buildup_mode = False
-        self.buildup_duration = 300
-        self.buildup_start_time = None
-        self.buildup_start_speed = 0.3
-        self.buildup_end_speed = 2.0
-        self.buildup_cycles = 1
-        self.current_buildup_cycle = 0
-
-        self.cycle_folders = False
-        self.trigger_type = "time" 
-        self.interval_value = "2:00"
-        self.folder_change_counter = 0
-        self.last_folder_change = time.time()
-        
-        # Pattern tracking
-        self.current_pattern = None
-        self.pattern_history = deque(maxlen=5)
-        
-        # Load patterns
-        self.load_patterns("BLOWJOB")
-
-        # ADD THESE CHAOS MODE VARIABLES
-        self.chaos_mode = False
-        self.chaos_speed_target = 1.0
-        self.chaos_current_speed = 1.0
-        self.chaos_speed_change_rate = 0.05  # Moderate speed changes
-        self.chaos_last_speed_change = time.time()
-        self.chaos_last_folder_change = time.time()
-        self.chaos_last_pattern_skip = time.time()
-        self.chaos_speed_change_interval = 3.0  # Change speed every 2-6 seconds
-        self.chaos_folder_change_interval = 15.0  # Change folder every 12-25 seconds
-        self.chaos_pattern_skip_interval = 5.0   # Skip patterns every 4-8 seconds
-    
-        # Available chaos categories (exclude current)
-        self.chaos_categories = []
-        self.chaos_current_category = "BLOWJOB"
-    
-    def load_patterns(self, category_folder="BLOWJOB"):
-        """Load patterns from specified category folder"""
-        print(f"Loading patterns from funscripts/{category_folder}/...")
-        self.pattern_database = {}
-    
-        category_path = os.path.join("funscripts", category_folder)
-        if os.path.exists(category_path):
-            for file in os.listdir(category_path):
-                if file.endswith('.funscript'):
-                    try:
-                        file_path = os.path.join(category_path, file)
-                        with open(file_path, 'r') as f:
-                            data = json.load(f)
-                            actions = data['actions']
-                    
-                        if len(actions) >= 3:
-                            pattern_id = f"{category_folder}_{file}"
-                            pattern_info = {
-                                'file': file,
-                                'category': category_folder,
-                                'pattern_id': pattern_id,
-                                'funscript_actions': actions,
-                                'start_pos': actions[0]['pos'],
-                                'end_pos': actions[-1]['pos'],
-                                'total_duration': actions[-1]['at'] - actions[0]['at']
-                            }
-                        
-                            self.pattern_database[pattern_id] = pattern_info
-                
-                    except Exception as e:
-                        print(f"⚠️ Error loading {file}: {e}")
-
-    def set_chaos_mode(self, enabled):
-        """Enable/disable chaos mode"""
-        self.chaos_mode = enabled
-        if enabled:
-            print("🌪️ CHAOS MODE ACTIVATED - Bot takes control!")
-            self.chaos_current_speed = self.base_speed
-            self.chaos_speed_target = self.base_speed
-            self.chaos_last_speed_change = time.time()
-            self.chaos_last_folder_change = time.time()
-            # Load available categories for chaos
-            self.update_chaos_categories()
-        else:
-            print("🛑 Chaos mode deactivated")
-
-    def update_chaos_categories(self):
-        """Update available categories for chaos mode"""
-        all_categories = self.get_available_categories()
-        # Exclude current category for more variety
-        self.chaos_categories = [cat for cat in all_categories if cat != self.chaos_current_category]
-        print(f"🌪️ Chaos categories: {self.chaos_categories}")
-
-    def update_chaos_control(self, base_speed):
-        """Update chaos mode control - BALANCED CHAOS VERSION"""
-        if not self.chaos_mode:
-            return base_speed
-        
-        current_time = time.time()
-    
-        # FREQUENT BUT NOT MANIC SPEED TRANSITIONS (2-6 seconds)
-        if current_time - self.chaos_last_speed_change > self.chaos_speed_change_interval:
-            # Pick new random speed target with some bias towards extremes
-            if random.random() < 0.3:  # 30% chance for extreme speeds
-                if random.random() < 0.5:
-                    self.chaos_speed_target = random.uniform(0.1, 0.3)  # Very slow
-                else:
-                    self.chaos_speed_target = random.uniform(1.2, 1.5)  # Very fast
-            else:  # 70% chance for normal range
-                self.chaos_speed_target = random.uniform(0.4, 1.1)
-        
-            # Moderate interval for next change (2-6 seconds)
-            self.chaos_speed_change_interval = random.uniform(2.0, 6.0)
-            self.chaos_last_speed_change = current_time
-        
-            print(f"🌪️ CHAOS SPEED: {self.chaos_current_speed:.2f}x → {self.chaos_speed_target:.2f}x (next in {self.chaos_speed_change_interval:.1f}s)")
-    
-        # SMOOTH BUT NOTICEABLE INTERPOLATION to target speed
-        speed_diff = self.chaos_speed_target - self.chaos_current_speed
-        if abs(speed_diff) > 0.01:
-            self.chaos_current_speed += speed_diff * self.chaos_speed_change_rate
-            if abs(self.chaos_speed_target - self.chaos_current_speed) < 0.01:
-                self.chaos_current_speed = self.chaos_speed_target
-    
-        # REGULAR FOLDER SWITCHING (12-25 seconds)
-        if (current_time - self.chaos_last_folder_change > self.chaos_folder_change_interval and 
-            self.chaos_categories):
-        
-            new_category = random.choice(self.chaos_categories)
-            print(f"🌪️ CHAOS FOLDER: {self.chaos_current_category} → {new_category}")
-        
-            if hasattr(self, 'chaos_folder_callback') and self.chaos_folder_callback:
-                self.chaos_folder_callback(new_category)
-        
-            self.chaos_current_category = new_category
-            self.update_chaos_categories()
-        
-            # Moderate folder changes (12-25 seconds)
-            self.chaos_folder_change_interval = random.uniform(12.0, 25.0)
-            self.chaos_last_folder_change = current_time
-    
-        # OCCASIONAL PATTERN SKIPPING (4-8 seconds)
-        if current_time - self.chaos_last_pattern_skip > self.chaos_pattern_skip_interval:
-            # Skip to next pattern for variety
-            self.skip_to_next_pattern()
-        
-            # Moderate skip interval (4-8 seconds)
-            self.chaos_pattern_skip_interval = random.uniform(4.0, 8.0)
-            self.chaos_last_pattern_skip = current_time
-        
-            print(f"🌪️ CHAOS SKIP PATTERN (next in {self.chaos_pattern_skip_interval:.1f}s)")
-    
-        return self.chaos_current_speed                        
-    
-
-    def get_available_categories(self):
-        """Get list of available pattern categories"""
-        categories = []
-        funscripts_dir = "funscripts"
-        if os.path.exists(funscripts_dir):
-            for item in os.listdir(funscripts_dir):
-                item_path = os.path.join(funscripts_dir, item)
-                if os.path.isdir(item_path):
-                    # Check if folder contains .funscript files
-                    funscript_files = [f for f in os.listdir(item_path) if f.endswith('.funscript')]
-                    if funscript_files:
-                        categories.append(item)
-        return sorted(categories) if categories else ["bj"]  # fallback to bj
-    
-    def initialize_seamless_stream(self, speed=1.0):
-        """Initialize the seamless motion stream - FIXED"""
-        print("🌊 Initializing SEAMLESS stream...")
-        
-        self.motion_stream.clear()
-        self.last_command_time = time.time() * 1000
-        self.base_speed = speed
-        
-        self.build_seamless_stream(speed)
-        
-        print(f"✅ Stream ready: {len(self.motion_stream)} commands")
-    
-    def build_seamless_stream(self, speed=1.0):
-        """Build continuous motion stream - ZERO GAPS"""
-        pattern_count = 0
-        max_patterns = 8
-        
-        while self._get_stream_duration() < self.stream_target_duration and pattern_count < max_patterns:
-            next_pattern = self.select_next_pattern()
-            if not next_pattern:
-                break
-                
-            self._integrate_pattern_seamlessly(next_pattern, speed)
-            pattern_count += 1
-    
-    def _get_stream_duration(self):
-        """Get current stream duration - FIXED"""
-        if not self.motion_stream:
-            return 0
-        
-        current_time = time.time() * 1000
-        future_commands = [cmd for cmd in self.motion_stream if cmd['timestamp'] > current_time]
-        
-        if not future_commands:
-            return 0
-            
-        return future_commands[-1]['timestamp'] - current_time
-    
-    def _integrate_pattern_seamlessly(self, pattern, speed):
-        """Integrate pattern into stream - ABSOLUTELY SEAMLESS WITH SPEED"""
-        actions = pattern.get('funscript_actions', [])
-        if not actions:
-            return
-            
-        # Get start time - SEAMLESS CONTINUATION
-        if not self.motion_stream:
-            start_time = time.time() * 1000
-        else:
-            # Start EXACTLY where last command is scheduled - NO GAPS
-            start_time = self.motion_stream[-1]['timestamp']
-        
-        # FIXED: Apply speed properly to duration
-        base_duration = 250  # Base 180ms
-        speed_adjusted_duration = base_duration / max(0.3, min(3.0, speed))
-        actual_duration = max(80, min(400, int(speed_adjusted_duration)))
-        
-        current_time = start_time
-        
-        # Add ALL actions with perfect timing AND speed consideration
-        for action in actions:
-            stream_action = {
-                'timestamp': current_time,
-                'pos': action['pos'],
-                'duration': actual_duration,
-                'pattern_id': pattern['pattern_id'],
-                'speed_used': speed
-            }
-            self.motion_stream.append(stream_action)
-            current_time += actual_duration  # PERFECT SPACING WITH SPEED
-        
-        self.pattern_history.append(pattern)
-        self.current_pattern = pattern
-    
-    def select_next_pattern(self):
-        """Select next pattern - random selection"""
-        if not self.pattern_database:
-            return None
-        
-        available_patterns = list(self.pattern_database.values())
-        recent_ids = {p['pattern_id'] for p in self.pattern_history if p}
-        
-        candidates = [p for p in available_patterns if p['pattern_id'] not in recent_ids]
-        
-        if len(candidates) < 3:
-            candidates = available_patterns
-        
-        return random.choice(candidates) if candidates else None
-    
-    def get_next_motion_command(self, speed=1.0):
-        """Get next motion command - ZERO PAUSE TRANSITIONS WITH SPEED"""
-        # Manual override mode
-        if self.manual_override_active:
-            position = int(self.manual_return_position * 100)
-            return position, 50, "manual_override"
-        
-        # Get CURRENT speed including build-up
-        current_speed = self.get_current_speed(speed)
-        
-        # Initialize stream if needed
-        if not self.motion_stream:
-            self.initialize_seamless_stream(current_speed)
-            
-        # AGGRESSIVE refill to prevent ANY gaps - with current speed
-        if self._get_stream_duration() < self.stream_target_duration * 0.7:
-            self.build_seamless_stream(current_speed)
-        
-        # Get next command
-        if not self.motion_stream:
-            return 50, 150, "fallback"
-        
-        # Remove old commands
-        current_time = time.time() * 1000
-        while self.motion_stream and self.motion_stream[0]['timestamp'] <= current_time:
-            self.motion_stream.popleft()
-        
-        if not self.motion_stream:
-            # Emergency fallback - immediate rebuild with current speed
-            self.initialize_seamless_stream(current_speed)
-            if not self.motion_stream:
-                return 50, 150, "emergency"
-        
-        command = self.motion_stream.popleft()
-        
-        # APPLY CURRENT SPEED TO DURATION
-        base_duration = command.get('duration', 250)
-        speed_ratio = current_speed / command.get('speed_used', 1.0)
-        adjusted_duration = max(80, min(400, int(base_duration / speed_ratio)))
-        
-        position = command['pos']
-        action_type = f"stream_{command.get('pattern_id', 'unknown')}"
-        
-        return position, adjusted_duration, action_type
-    
-    def set_joystick_speed_multiplier(self, multiplier):
-        """Set joystick speed multiplier"""
-        self.joystick_speed_multiplier = multiplier
-    
-    def start_manual_override(self, position):
-        """Start manual override"""
-        if not self.manual_override_active:
-            self.manual_override_active = True
-            self.manual_return_position = position
-            print(f"🎮 Manual override started at {position*100:.1f}%")
-    
-    def update_manual_position(self, position):
-        """Update manual position"""
-        if self.manual_override_active:
-            self.manual_return_position = position
-    
-    def end_manual_override(self):
-        """End manual override"""
-        if self.manual_override_active:
-            self.manual_override_active = False
-            print("🎮 Manual override ended")
-    
-    def skip_to_next_pattern(self):
-        """Skip to next pattern"""
-        if not self.manual_override_active:
-            print("⭐ Skipping to next pattern...")
-            # Clear and rebuild for immediate skip
-            self.motion_stream.clear()
-            self.build_seamless_stream(self.base_speed)
-
-    # Add this method to your PatternSequencer class
-
-    def start_buildup_mode(self, duration_seconds, cycles=1, start_speed=0.1, end_speed=1.5,
-                          cycle_folders=False, trigger_type="time", interval_value="2:00"):
-        """Start build-up mode with FIXED speed limits"""
-        self.buildup_mode = True
-        self.buildup_duration = duration_seconds
-        self.buildup_start_time = time.time()
-        self.buildup_start_speed = start_speed  # Now starts at 0.1x
-        self.buildup_end_speed = end_speed      # Now max 1.5x
-        self.buildup_cycles = max(1, cycles)
-        self.current_buildup_cycle = 0
-    
-        # Store folder cycling settings
-        self.cycle_folders = cycle_folders
-        self.trigger_type = trigger_type
-        self.interval_value = interval_value
-        self.folder_change_counter = 0
-        self.last_folder_change = time.time()
-
-        print(f"🚀 Build-up: {start_speed}x → {end_speed}x, {cycles} cycles, {duration_seconds}s")
-        if cycle_folders:
-            print(f"📁 Folder cycling enabled: {trigger_type} every {interval_value}")            
-    
-    
-    def stop_buildup_mode(self):
-        """Stop build-up mode"""
-        self.buildup_mode = False
-        self.buildup_start_time = None
-        print("ℹ️ Build-up stopped")
-    
-    def get_current_speed(self, manual_speed):
-        """Get current speed with build-up and joystick multipliers - FIXED RANGE 0.1-1.5"""
-        base_speed = manual_speed          # keep pattern timing stable
-        effective_speed = base_speed       # what we'll actually return
-
-        if self.buildup_mode and self.buildup_start_time:
-            elapsed = time.time() - self.buildup_start_time
-            total_dur = max(0.001, float(self.buildup_duration))
-            cycles = max(1, int(self.buildup_cycles))
-
-            cycle_dur = total_dur / cycles
-            cycle_idx = min(cycles - 1, int(elapsed // cycle_dur))
-            cycle_elapsed = elapsed - (cycle_idx * cycle_dur)
-            cycle_progress = min(1.0, cycle_elapsed / cycle_dur)
-
-            self.current_buildup_cycle = cycle_idx
-
-            # FIXED: Better milestone tracking to prevent spam
-            current_cycle_key = f"cycle_{cycle_idx}"
-    
-            # Only fire milestone sounds once per cycle
-            if cycle_progress >= 0.25:
-                milestone_key = f"{current_cycle_key}_25"
-                if not getattr(self, f"_fired_{milestone_key}", False):
-                    setattr(self, f"_fired_{milestone_key}", True)
-                    if hasattr(self, "audio_manager"):
-                        self.audio_manager.play("buildup_progress_25")
-                
-            if cycle_progress >= 0.50:
-                milestone_key = f"{current_cycle_key}_50"
-                if not getattr(self, f"_fired_{milestone_key}", False):
-                    setattr(self, f"_fired_{milestone_key}", True)
-                    if hasattr(self, "audio_manager"):
-                        self.audio_manager.play("buildup_progress_50")
-                
-            if cycle_progress >= 0.75:
-                milestone_key = f"{current_cycle_key}_75"
-                if not getattr(self, f"_fired_{milestone_key}", False):
-                    setattr(self, f"_fired_{milestone_key}", True)
-                    if hasattr(self, "audio_manager"):
-                        self.audio_manager.play("buildup_progress_75")
-
-            # Ramp speed (applied only to effective_speed)
-            eased_progress = cycle_progress * cycle_progress
-            effective_speed = self.buildup_start_speed + eased_progress * (
-                self.buildup_end_speed - self.buildup_start_speed
-            )
-
-                # FIXED: Build-up complete - only fire once per build-up session
-            if cycle_idx == (cycles - 1) and cycle_progress >= 1.0:
-                effective_speed = self.buildup_end_speed
-        
-                # Only fire completion sound once
-                if not getattr(self, "_buildup_completed", False):
-                    self._buildup_completed = True
-                    if hasattr(self, "audio_manager"):
-                        self.audio_manager.play("buildup_complete")
-                    self.stop_buildup_mode()
-                    self.play_climax_patterns()
-        # 🌪️ ADD CHAOS MODE CONTROL HERE - BEFORE THE RETURN!
-        if self.chaos_mode:
-            effective_speed = self.update_chaos_control(effective_speed)            
-                             
-
-        # Apply joystick multiplier + clamp to NEW RANGE
-        final_speed = effective_speed * self.joystick_speed_multiplier
-        return round(max(0.1, min(1.5, final_speed)), 2)  # 🔧 NEW LIMITS: 0.1-1.5
-
-        
-
-    def play_climax_patterns(self):
-        """Switch to climax folder and start playing patterns - FIXED"""
-        import os, random, json
-    
-        # FIXED: Look in root directory, not inside funscripts
-        climax_folder = "climax"  # Root level folder
-    
-        if not os.path.isdir(climax_folder):
-            print(f"⚠️ Climax folder not found: {climax_folder}")
-            print("💡 Make sure 'climax' folder exists in the same directory as your script")
-            return
-
-        # Get all .funscript files from climax folder
-        scripts = []
-        for file in os.listdir(climax_folder):
-            if file.endswith(".funscript"):
-                scripts.append(os.path.join(climax_folder, file))
-    
-        if not scripts:
-            print("⚠️ No funscripts found in climax folder!")
-            return
-
-        # Choose a random climax script
-        chosen_script = random.choice(scripts)
-        print(f"🔥 Playing climax script: {os.path.basename(chosen_script)}")
-
-        try:
-            # Load the climax script
-            with open(chosen_script, 'r') as f:
-                data = json.load(f)
-                actions = data.get('actions', [])
-        
-            if not actions:
-                print("⚠️ No actions found in climax script")
-                return
-        
-            # Clear current stream and load climax patterns
-            self.motion_stream.clear()
-        
-            # Create climax pattern entry
-            climax_pattern = {
-                'file': os.path.basename(chosen_script),
-                'category': 'climax',
-                'pattern_id': f"climax_{os.path.basename(chosen_script)}",
-                'funscript_actions': actions,
-                'start_pos': actions[0]['pos'],
-                'end_pos': actions[-1]['pos'],
-                'total_duration': actions[-1]['at'] - actions[0]['at']
-            }    
-        
-            # Integrate the climax pattern with high speed
-            climax_speed = 1.5  # Max speed for climax
-            self._integrate_pattern_seamlessly(climax_pattern, climax_speed)
-        
-            # Add to pattern history
-            self.current_pattern = climax_pattern
-            self.pattern_history.append(climax_pattern)
-        
-            print(f"✅ Climax pattern loaded: {len(actions)} actions at {climax_speed}x speed")
-        
-            # Play audio notification
-            if hasattr(self, "audio_manager"):
-                self.audio_manager.play("buildup_complete")
-        
-        except Exception as e:
-            print(f"❌ Error loading climax script: {e}")
-            import traceback
-            traceback.print_exc()
-
-            
-
-
-
 class MouseWheelEntry(tk.Entry):
     """Entry widget with mouse wheel support for time input"""
     
@@ -1708,11 +1185,29 @@ class VideoVisualizer:
         self.parent_frame = parent_frame
         self.status_file = status_file
         
-        # Video data
-        self.video_frames = []
+        # Video data - frames are decoded on demand by the frame provider
+        self.frame_provider = None
+        self.atlas_cache = FrameAtlasCache()  # decoded frames persist across loads
+        self.table_positions = 0  # >0: decode only the frames at this many positions
+        self._load_generation = 0  # bumped per load_video so superseded loads drop out
+        self._requested_path = ""  # video of the newest load_video, before it's installed
+        self.preloader = VideoPreloader(self._open_preload)
+        
+        # Motion-aligned position -> frame table (None: linear mapping)
+        self.motion_maps = MotionMapCache()
+        self.motion_mapping = False  # opt-in: maps positions onto one detected stroke only
+        self.motion_map = None
         self.total_frames = 0
         self.video_path = ""
         self.fps = 30
+        self.display_surface = DisplaySurface(parent_frame)  # persistent PhotoImage on the label
+        self._display_frame = None  # frame array currently on the display surface
+        
+        # Fullscreen - a resident decoder producing frames already at screen size
+        self.fullscreen_window = None
+        self.fullscreen_provider = None
+        self.fullscreen_surface = None
+        self._fullscreen_frame = None
         
         # Settings
         self.direction = "0_to_100"
@@ -1722,7 +1217,23 @@ class VideoVisualizer:
         
         # Position interpolation for smooth movement
         self.target_position = 50.0
-        self.interpolation_speed = 10.0
+        self.interpolation_speed = 5.0  # approach rate toward the target position (1/s)
+        
+        # Render loop - paced on the Tk main loop, nothing scheduled while idle.
+        # Other threads set _render_request and, if the loop is idle, post a
+        # <<RenderRequest>> event that wakes it on the Tk thread.
+        self.render_fps = 60
+        self.achieved_fps = 0.0
+        self.rendered_frames = 0
+        self.dropped_frames = 0
+        self._render_request = threading.Event()
+        self._render_job = None
+        self._render_idle = True
+        self._next_render = None
+        self._last_render = None
+        self._fps_window_start = 0.0
+        self._fps_window_frames = 0
+        self._last_frame = None
         
         # UI elements (will be created later)
         self.video_label = None
@@ -1730,8 +1241,10 @@ class VideoVisualizer:
         self.test_mode_var = None
         self.test_slider = None
         
-        # Start smooth interpolation
-        self.start_smooth_interpolation()
+        # Start rendering
+        if hasattr(self.parent_frame, 'bind'):
+            self.parent_frame.bind('<<RenderRequest>>', lambda event: self.wake_render_loop())
+        self.wake_render_loop()
 
     def toggle_fullscreen(self):
         """Toggle fullscreen mode - IMPROVED VERSION"""
@@ -1742,7 +1255,7 @@ class VideoVisualizer:
 
     def enter_fullscreen(self):
         """Enter fullscreen mode with proper sizing and controls"""
-        if not self.video_frames:
+        if not self.frame_provider:
             print("❌ No video loaded for fullscreen")
             return
     
@@ -1798,7 +1311,8 @@ class VideoVisualizer:
             self.fullscreen_window.focus_set()
             self.fullscreen_window.grab_set()  # Modal behavior
         
-            # Show current frame in fullscreen with proper sizing
+            # Start the screen-size decoder and show the current frame
+            self.open_fullscreen_provider()
             self.update_fullscreen_display()
         
             print("🖥️ Entered fullscreen mode - Press ESC, click X, or click EXIT button")
@@ -1811,6 +1325,7 @@ class VideoVisualizer:
                 except:
                     pass
                 self.fullscreen_window = None
+            self.close_fullscreen_provider()
 
     def exit_fullscreen(self):
         """Exit fullscreen mode safely"""
@@ -1827,6 +1342,7 @@ class VideoVisualizer:
                 # Destroy window
                 self.fullscreen_window.destroy()
                 self.fullscreen_window = None
+                self.close_fullscreen_provider()
             
                 print("✅ Fullscreen mode exited")
             
@@ -1834,184 +1350,119 @@ class VideoVisualizer:
             print(f"⚠️ Error exiting fullscreen: {e}")
             # Force cleanup
             self.fullscreen_window = None
+            self.close_fullscreen_provider()
+
+    def open_fullscreen_provider(self):
+        """Resident decoder for fullscreen - frames are decoded straight to screen size
+        with a fast upscale, prefetched ahead of playback and kept in a small LRU"""
+        self.close_fullscreen_provider()
+        if not self.video_path or not self.fullscreen_window:
+            return
+        
+        # Table mode already has the fullscreen frames pre-rendered
+        if getattr(self.frame_provider, 'fullscreen_frames', None) is not None:
+            return
+        
+        screen_size = (self.fullscreen_window.winfo_screenwidth(), self.fullscreen_window.winfo_screenheight())
+        size = fit_size((self.display_width, self.display_height), screen_size)
+        try:
+            self.fullscreen_provider = FrameProvider(
+                self.video_path,
+                display_size=size,
+                memory_budget=FULLSCREEN_MEMORY_BUDGET,
+                prefetch=FULLSCREEN_PREFETCH,
+                interpolation=cv2.INTER_LINEAR
+            )
+        except IOError as e:
+            print(f"⚠️ Fullscreen decoder unavailable: {e}")
+            return
+        self.fullscreen_provider.on_frame_ready = self._on_fullscreen_frame_ready
+        self.fullscreen_provider.request(self.current_frame_index)
+        print(f"📺 Fullscreen decoder: {size[0]}x{size[1]}")
+    
+    def close_fullscreen_provider(self):
+        if self.fullscreen_provider:
+            self.fullscreen_provider.close(wait=False)
+            self.fullscreen_provider = None
+        self.fullscreen_surface = None
+        self._fullscreen_frame = None
+    
+    def _on_fullscreen_frame_ready(self, frame_index):
+        if frame_index == self.current_frame_index:
+            self.request_render()
 
     def update_fullscreen_display(self):
-        """Update fullscreen display with proper image scaling - FIXED VERSION"""
-        if not (hasattr(self, 'fullscreen_window') and 
-                self.fullscreen_window and 
+        """Show the current frame at screen size - blits into one persistent PhotoImage, never
+        blocks on decoding
+        
+        Returns True once the exact frame is on screen.
+        """
+        if not (self.fullscreen_window and
                 hasattr(self, 'fullscreen_label') and
-                0 <= self.current_frame_index < len(self.video_frames)):
-            return
+                0 <= self.current_frame_index < self.total_frames):
+            return True
     
         try:
-            # Get current frame (it's already a PhotoImage)
-            current_frame = self.video_frames[self.current_frame_index]
-        
-            # Get screen dimensions
-            screen_width = self.fullscreen_window.winfo_screenwidth()
-            screen_height = self.fullscreen_window.winfo_screenheight()
-        
-            # Get the original PIL image from the PhotoImage
-            # We need to recreate the PIL image from the video source
-            if hasattr(self, 'display_width') and hasattr(self, 'display_height'):
-                # Use the stored display dimensions to calculate scaling
-                orig_width = self.display_width
-                orig_height = self.display_height
-            
-                # Calculate proper fullscreen scaling - USE 100% OF SCREEN
-                scale_x = screen_width / orig_width
-                scale_y = screen_height / orig_height
-                scale = min(scale_x, scale_y) * 1.0  # 100% FULL SCREEN
-            
-                # Calculate new size - MUCH BIGGER
-                new_width = int(orig_width * scale)
-                new_height = int(orig_height * scale)
-            
-                print(f"📺 FULL SCREEN scaling: {orig_width}x{orig_height} -> {new_width}x{new_height} (100% SCREEN)")
-            
-                # We need to recreate the frame at the larger size
-                # Get the frame from video source again
-                if hasattr(self, 'video_path') and self.video_path:
-                    try:
-                        import cv2
-                        cap = cv2.VideoCapture(self.video_path)
-                        cap.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame_index)
-                        ret, frame = cap.read()
-                        cap.release()
-                    
-                        if ret:
-                            # Convert and resize for fullscreen
-                            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                            frame_resized = cv2.resize(frame_rgb, (new_width, new_height))
-                        
-                            from PIL import Image, ImageTk
-                            pil_image = Image.fromarray(frame_resized)
-                            fullscreen_photo = ImageTk.PhotoImage(pil_image)
-                        
-                            # Update display
-                            self.fullscreen_label.config(image=fullscreen_photo)
-                            self.fullscreen_label.image = fullscreen_photo  # Keep reference
-                        
-                            print(f"✅ Fullscreen frame updated: {new_width}x{new_height}")
-                            return
-                    except Exception as e:
-                        print(f"⚠️ Error recreating fullscreen frame: {e}")
-        
-            # Fallback - use original frame (will be smaller)
-            self.fullscreen_label.config(image=current_frame)
-            print("⚠️ Using original frame size (fallback)")
+            # Table mode pre-renders frames at fullscreen size
+            get_fullscreen = getattr(self.frame_provider, 'get_fullscreen', None)
+            frame = get_fullscreen(self.current_frame_index) if get_fullscreen else None
+            exact = frame is not None
+            
+            if frame is None and self.fullscreen_provider:
+                frame = self.fullscreen_provider.get(self.current_frame_index)
+                exact = frame is not None
+                if frame is None:
+                    # Still decoding - keep the closest frame on screen
+                    frame = self.fullscreen_provider.nearest(self.current_frame_index)
+            
+            if frame is None or frame is self._fullscreen_frame:
+                return exact
+            self._fullscreen_frame = frame
+            
+            if self.fullscreen_surface is None:
+                self.fullscreen_surface = DisplaySurface(self.fullscreen_window)
+            if self.fullscreen_surface.blit(frame):
+                self.fullscreen_label.config(image=self.fullscreen_surface.photo)
+            return exact
         
         except Exception as e:
             print(f"⚠️ Fullscreen display update error: {e}")
-            # Last resort fallback
-            try:
-                if hasattr(self, 'video_frames') and self.video_frames:
-                    self.fullscreen_label.config(image=self.video_frames[self.current_frame_index])
-            except:
-                pass
-            
-    def update_video_display(self):
-        """Update video display (both normal and fullscreen) - IMPROVED VERSION"""
-        current_time = time.time()
-        if hasattr(self, '_last_update') and current_time - self._last_update < 0.016:
-            return
-        self._last_update = current_time
-
-        if not self.video_frames or not self.video_label:
-            return
-
-        if hasattr(self, '_last_frame') and self._last_frame == self.current_frame_index:
-            return
-
-        if 0 <= self.current_frame_index < len(self.video_frames):
-            # Update normal display
-            self.video_label.config(image=self.video_frames[self.current_frame_index])
-
-            # 🔧 ALSO update fullscreen if active - IMPROVED
-            if (hasattr(self, 'fullscreen_window') and 
-                self.fullscreen_window and 
-                hasattr(self, 'fullscreen_label')):
+            return True
             
-                try:
-                    # Use our improved fullscreen update method
-                    self.update_fullscreen_display()
-                except Exception as e:
-                    print(f"⚠️ Fullscreen update error: {e}")
-
-            self._last_frame = self.current_frame_index
-    
     def load_video(self, file_path):
-        """Load video and create frames - IMPROVED VERSION"""
+        """Open a video for on-demand decoding - the middle frame shows first, coarse
+        positions fill in while playing, and a newer load cancels this one"""
         if not file_path or not os.path.exists(file_path):
             print(f"❌ Video file not found: {file_path}")
             return
         
-        print(f"📹 Loading video: {file_path}")
-    
-    def load_video(self, file_path):
-        """Load video and create frames - IMPROVED VERSION"""
-        if not file_path or not os.path.exists(file_path):
-            print(f"❌ Video file not found: {file_path}")
+        self._load_generation += 1
+        generation = self._load_generation
+        self._requested_path = file_path
+        table_positions = self.table_positions
+        screen_size = (self.parent_frame.winfo_screenwidth(), self.parent_frame.winfo_screenheight())
+        
+        # Preloaded videos are already open and decoding - just swap them in
+        provider = self.preloader.take(file_path)
+        if provider and isinstance(provider, PositionFrameTable) == bool(table_positions):
+            print(f"⚡ Switching to preloaded video: {file_path}")
+            self._install_provider(provider, file_path)
             return
+        if provider:
+            provider.close(wait=False)  # preloaded for a different frame mode
         
         print(f"📹 Loading video: {file_path}")
     
         def load_video_thread():
             try:
-                cap = cv2.VideoCapture(file_path)
-                if not cap.isOpened():
-                    raise Exception("Could not open video file")
-            
-                self.fps = cap.get(cv2.CAP_PROP_FPS)
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            
-                # Calculate display size
-                max_width, max_height = 800, 600
-                aspect_ratio = width / height
-            
-                if aspect_ratio > 1:
-                    self.display_width = min(max_width, width // 2)
-                    self.display_height = int(self.display_width / aspect_ratio)
-                else:
-                    self.display_height = min(max_height, height // 2)
-                    self.display_width = int(self.display_height * aspect_ratio)
-            
-                # Extract frames
-                new_video_frames = []
-                frame_count = 0
-            
-                while True:
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    frame_resized = cv2.resize(frame_rgb, (self.display_width, self.display_height))
-                
-                    pil_image = Image.fromarray(frame_resized)
-                    photo = ImageTk.PhotoImage(pil_image)
-                    new_video_frames.append(photo)
-                
-                    frame_count += 1
-            
-                cap.release()
+                provider = self._open_provider(file_path, table_positions, screen_size)
             
                 # Update on main thread
                 def update_gui():
-                    self.video_frames = new_video_frames
-                    self.total_frames = len(self.video_frames)
-                    self.video_path = file_path
-
-                    # Set initial position and display first frame
-                    self.current_position = 50.0
-                    self.target_position = 50.0
-                    frame_index = self.calculate_frame_index(50.0)
-                    self.current_frame_index = frame_index
-                    self.update_video_display()
-
-                    print(f"✅ Video loaded: {self.total_frames} frames, showing frame {frame_index}")
+                    if generation != self._load_generation:
+                        provider.close(wait=False)  # another video was picked meanwhile
+                        return
+                    self._install_provider(provider, file_path)
             
                 if hasattr(self.parent_frame, 'after'):
                     self.parent_frame.after(0, update_gui)
@@ -2027,88 +1478,268 @@ class VideoVisualizer:
                 if hasattr(self.parent_frame, 'after'):
                     self.parent_frame.after(0, show_error)
     
-        # Start loading in background
+        # Open in background - only metadata is read up front
         threading.Thread(target=load_video_thread, daemon=True).start()
     
+    def _open_provider(self, file_path, table_positions, screen_size, preload=False):
+        """Frame source for a video in the current frame mode - decodes from the intra-frame
+        proxy when there is one; preloads get their share of the preload budget, leave
+        filling the atlas until they're shown and pass no screen_size (tables skip the
+        fullscreen frames, fullscreen falls back to its own decoder)"""
+        if table_positions:
+            # With a motion map the table holds the frames the mapped positions land on
+            motion_map = self.motion_maps.load(file_path) if self.motion_mapping else None
+            frame_indices = None
+            if motion_map is not None and len(motion_map):
+                frame_indices = motion_map[np.round(np.linspace(0, LUT_STEPS, table_positions)).astype(int)]
+            return PositionFrameTable(file_path, positions=table_positions,
+                                      fullscreen_bounds=None if preload else screen_size,
+                                      frame_indices=frame_indices)
+        provider = FrameProvider(
+            file_path,
+            proxy_path=find_proxy(file_path),
+            atlas_cache=self.atlas_cache,
+            memory_budget=self.preloader.provider_budget() if preload else DEFAULT_MEMORY_BUDGET,
+            fill_atlas=not preload
+        )
+        # Start on the middle frame (position 50) before the GUI even swaps over
+        provider.request(provider.frame_count // 2)
+        return provider
+    
+    def _open_preload(self, file_path):
+        return self._open_provider(file_path, self.table_positions, None, preload=True)
+    
+    def preload_videos(self, paths):
+        """Keep these videos open and decoding in the background (others are released)"""
+        current = self._requested_path or self.video_path  # still loading counts as current
+        self.preloader.prepare([path for path in paths if path and path != current])
+    
+    def _install_provider(self, provider, file_path):
+        """Make provider the visualizer's frame source and show position 50"""
+        if self.frame_provider:
+            self.frame_provider.close(wait=False)
+        if isinstance(provider, FrameProvider):
+            provider.set_memory_budget(DEFAULT_MEMORY_BUDGET)
+            provider.start_atlas_fill()
+        self.frame_provider = provider
+        self.fps = provider.fps
+        self.display_width, self.display_height = provider.display_size
+        self.total_frames = provider.frame_count
+        self.video_path = file_path
+        self._last_frame = None
+        self._display_frame = None
+        self.load_motion_map(file_path)
+        provider.on_frame_ready = self._on_frame_ready
+        if self.fullscreen_window:
+            self.open_fullscreen_provider()
+
+        # Set initial position and display first frame
+        self.current_position = 50.0
+        self.target_position = 50.0
+        frame_index = self.calculate_frame_index(50.0)
+        self.current_frame_index = frame_index
+        provider.request(frame_index)
+        self.wake_render_loop()
+
+        if isinstance(provider, PositionFrameTable):
+            cached = f" ({provider.positions} positions)"
+        else:
+            cached = f" ({provider.atlas.stored} cached)" if provider.atlas else ""
+        print(f"✅ Video loaded: {self.total_frames} frames{cached}, showing frame {frame_index}")
+    
+    def _on_frame_ready(self, frame_index):
+        """Decoder thread delivered a frame - repaint unless the exact frame is already shown"""
+        if self._last_frame != self.current_frame_index:
+            self.request_render()
+    
+    def load_motion_map(self, file_path):
+        """Use this video's motion map - the cache lookup (a content hash) and any analysis
+        run in the background, so a video switch never waits on them"""
+        self.motion_map = None
+        if not self.motion_mapping:
+            return
+        
+        def motion_map_thread():
+            motion_map = self.motion_maps.load(file_path)
+            if motion_map is None:
+                motion_map = self.motion_maps.analyze(file_path, find_proxy(file_path),
+                                                      should_stop=lambda: self.video_path != file_path)
+                if motion_map is None:
+                    return
+                print(f"🧭 Motion map for {os.path.basename(file_path)}: "
+                      f"{'stroke found' if len(motion_map) else 'no clear stroke, keeping linear mapping'}")
+            if len(motion_map) and hasattr(self.parent_frame, 'after'):
+                self.parent_frame.after(0, lambda: self._apply_motion_map(file_path, motion_map))
+        
+        threading.Thread(target=motion_map_thread, daemon=True).start()
+    
+    def _apply_motion_map(self, file_path, motion_map):
+        if self.video_path != file_path or not self.motion_mapping:
+            return
+        if isinstance(self.frame_provider, PositionFrameTable) and not self.frame_provider.mapped:
+            self.load_video(file_path)  # rebuild the table on the mapped frames
+            return
+        self.motion_map = motion_map
+        self._last_frame = None
+        self.wake_render_loop()
+    
+    def set_motion_mapping(self, enabled):
+        self.motion_mapping = enabled
+        if self.video_path:
+            if isinstance(self.frame_provider, PositionFrameTable):
+                self.load_video(self.video_path)
+            else:
+                self.load_motion_map(self.video_path)
+                self._last_frame = None
+                self.wake_render_loop()
+    
     def calculate_frame_index(self, position):
-        """Calculate frame index from position"""
+        """Calculate frame index from position - through the motion map when there is one"""
         if self.total_frames == 0:
             return 0
         
         if self.invert_var and self.invert_var.get():
             position = 100 - position
         
-        if self.direction == "0_to_100":
-            frame_index = int(position * (self.total_frames - 1) / 100)
+        if self.direction != "0_to_100":
+            position = 100 - position
+        
+        if self.motion_map is not None:
+            step = int(max(0.0, min(100.0, position)) * LUT_STEPS / 100 + 0.5)
+            frame_index = int(self.motion_map[step])
         else:
-            frame_index = int((100 - position) * (self.total_frames - 1) / 100)
+            frame_index = int(position * (self.total_frames - 1) / 100)
         
         return max(0, min(self.total_frames - 1, frame_index))
     
     def update_video_display(self):
-        """Update video display (both normal and fullscreen)"""
-        current_time = time.time()
-        if hasattr(self, '_last_update') and current_time - self._last_update < 0.016:
-            return
-        self._last_update = current_time
+        """Show current_frame_index in the window and fullscreen
+        
+        Returns True once the exact frame is on screen everywhere.
+        """
+        if not self.frame_provider or not self.video_label:
+            return True
 
-        if not self.video_frames or not self.video_label:
-            return
+        if self._last_frame == self.current_frame_index:
+            return True
 
-        if hasattr(self, '_last_frame') and self._last_frame == self.current_frame_index:
-            return
+        if not 0 <= self.current_frame_index < self.total_frames:
+            return True
 
-        if 0 <= self.current_frame_index < len(self.video_frames):
-            # Update normal display
-            self.video_label.config(image=self.video_frames[self.current_frame_index])
+        frame = self.frame_provider.get(self.current_frame_index)
+        exact = frame is not None
+        if not exact:
+            # Still decoding - show the closest frame we have
+            frame = self.frame_provider.nearest(self.current_frame_index)
         
-            # 🔧 ALSO update fullscreen if active
-            self.update_fullscreen_display()
+        # Neighbouring indices often resolve to the same frame (table mode)
+        if frame is not None and frame is not self._display_frame:
+            self._display_frame = frame
+            if self.display_surface.blit(frame):
+                self.video_label.config(image=self.display_surface.photo)
+            self.rendered_frames += 1
+        
+        # 🔧 ALSO update fullscreen if active
+        if self.fullscreen_window:
+            exact = self.update_fullscreen_display() and exact
         
-            self._last_frame = self.current_frame_index
+        self._last_frame = self.current_frame_index if exact else None
+        return exact
     
     def update_position(self, position):
-        """Update target position for smooth interpolation"""
+        """Update target position for smooth interpolation - called from the streaming thread"""
         if abs(position - self.target_position) > 0.1:
             self.target_position = position
+            self.request_render()
     
-    def start_smooth_interpolation(self):
-        """Start smooth interpolation thread"""
-        def interpolation_loop():
-            while True:
-                try:
-                    if not (self.test_mode_var and self.test_mode_var.get()):
-                        position_diff = self.target_position - self.current_position
-                        
-                        if abs(position_diff) > 0.1:
-                            move_amount = position_diff * self.interpolation_speed * 0.016
-                            self.current_position += move_amount
-                            
-                            frame_index = self.calculate_frame_index(self.current_position)
-                            self.current_frame_index = frame_index
-                            
-                            if self.video_label and 0 <= frame_index < len(self.video_frames):
-                                if hasattr(self.parent_frame, 'after'):
-                                    self.parent_frame.after(0, self.update_video_display)
-                    
-                    time.sleep(0.033)  # 60fps
-                    
-                except Exception as e:
-                    time.sleep(0.1)
+    def request_render(self):
+        """Ask for a repaint - safe from any thread. A running loop picks the request
+        up on its next tick; an idle one is woken through a Tk virtual event."""
+        self._render_request.set()
+        if self._render_idle and hasattr(self.parent_frame, 'event_generate'):
+            try:
+                self.parent_frame.event_generate('<<RenderRequest>>', when='tail')
+            except (tk.TclError, RuntimeError):
+                pass  # window closed, or Tcl built without thread support
+    
+    def wake_render_loop(self):
+        """Render right away if the loop is idle - Tk thread only"""
+        self._render_request.set()
+        if not hasattr(self.parent_frame, 'after'):
+            return
+        if self._render_job is None:
+            self._render_idle = False
+            self._render_job = self.parent_frame.after(0, self._render_tick)
+    
+    def _render_tick(self):
+        """One paced frame: ease toward the newest target, show its frame, schedule the next
+        tick - or go idle, with nothing scheduled, once the target is reached and the exact
+        frame is shown"""
+        self._render_request.clear()
+        now = time.perf_counter()
+        interval = 1.0 / self.render_fps
+        if self._next_render is None:
+            self._next_render = now
+        elif now - self._next_render > interval:
+            # Late by more than a frame: drop the missed ticks instead of catching up
+            self.dropped_frames += int((now - self._next_render) / interval)
+            self._next_render = now
+        dt = min(0.1, now - self._last_render) if self._last_render else interval
+        self._last_render = now
+        
+        moving = False
+        if not (self.test_mode_var and self.test_mode_var.get()):
+            position_diff = self.target_position - self.current_position
+            if abs(position_diff) > 0.1:
+                self.current_position += position_diff * (1.0 - math.exp(-self.interpolation_speed * dt))
+                moving = True
+        
+        shown = True
+        try:
+            self.current_frame_index = self.calculate_frame_index(self.current_position)
+            shown = self.update_video_display()
+        except Exception as e:
+            print(f"⚠️ Video render error: {e}")
         
-        threading.Thread(target=interpolation_loop, daemon=True).start()
+        if now - self._fps_window_start >= 1.0:
+            self.achieved_fps = (self.rendered_frames - self._fps_window_frames) / (now - self._fps_window_start)
+            self._fps_window_start = now
+            self._fps_window_frames = self.rendered_frames
+        
+        if moving or not shown or self._render_request.is_set():
+            self._next_render += interval
+            delay_ms = max(0, int((self._next_render - time.perf_counter()) * 1000))
+            self._render_job = self.parent_frame.after(delay_ms, self._render_tick)
+        else:
+            self._render_job = None
+            self._render_idle = True
+            self._next_render = None
+            self._last_render = None
+            self.achieved_fps = 0.0
+            # A request_render that still saw the loop running posted no event
+            if self._render_request.is_set():
+                self.wake_render_loop()
+    
+    def get_render_stats(self):
+        """Achieved FPS and frame counters of the render loop"""
+        return {
+            'fps': round(self.achieved_fps, 1),
+            'target_fps': self.render_fps,
+            'rendered': self.rendered_frames,
+            'dropped': self.dropped_frames,
+            'photo_allocations': self.display_surface.allocations,
+        }
     
     def on_direction_change(self, event=None):
         """Handle direction change"""
-        self.update_video_display()
+        self._last_frame = None
+        self.wake_render_loop()
     
     def on_test_position_change(self, value):
         """Handle test slider change"""
         if self.test_mode_var and self.test_mode_var.get():
             self.current_position = float(value)
-            frame_index = self.calculate_frame_index(self.current_position)
-            self.current_frame_index = frame_index
-            self.update_video_display()
+            self.wake_render_loop()
 
 
 class SimpleStickers:
@@ -2538,13 +2169,15 @@ class SimpleStickers:
             # Create background and paste image with alpha
             background = Image.new('RGB', img.size, bg_rgb)
             background.paste(img, (0, 0), img)  # Use img as its own alpha mask
-            tk_img = ImageTk.PhotoImage(background)
-        else:
-            tk_img = ImageTk.PhotoImage(img)
-
-        # FIXED: These lines must be OUTSIDE the if/else block
-        sticker.config(image=tk_img)
-        sticker.image = tk_img
+            img = background
+
+        # Re-render into the sticker's own persistent PhotoImage
+        surface = getattr(sticker, "_surface", None)
+        if surface is None:
+            surface = sticker._surface = DisplaySurface(sticker)
+        if surface.blit_image(img):
+            sticker.config(image=surface.photo)
+            sticker.image = surface.photo
         sticker._long_side = long_side
             
     def show_sticker_menu(self, event, sticker):
@@ -2673,7 +2306,9 @@ class AIPatternSequencerGUI:
         self.audio_manager = EnhancedAudioManager()
         self.moans_manager = MoansManager()
         self.stickers = SimpleStickers(self.root)
-        self.pattern_sequencer = PatternSequencer()
+        # Single engine clock shared by everything that schedules motion
+        self.clock = MonotonicClock()
+        self.pattern_sequencer = PatternSequencer(clock=self.clock)
         self.pattern_sequencer.audio_manager = self.audio_manager  # ADD THIS LINE
         self.current_category = "BLOWJOB"
         self.joystick_controller = JoystickController()
@@ -2697,8 +2332,28 @@ class AIPatternSequencerGUI:
         # State variables
         self.arousal = 0.75
         self.running = False
-        self.last_json_write_time = 0
-        self.json_write_interval = 0.05
+        
+        # Live position goes over the in-process bus; the JSON file is only a low-rate export
+        self.position_bus = PositionBus()
+        self.position_bus.subscribe(self.on_bus_position)
+        # Pattern strokes come precomputed from the motion stream
+        self.pattern_sequencer.stroke_callbacks.append(self.on_stream_strokes)
+        self.export_position_file = True
+        self.position_exporter = PositionFileExporter(self.position_bus, interval=0.5)
+        if self.export_position_file:
+            self.position_exporter.start()
+        
+        # Shared-memory record for external overlays, written at command rate
+        try:
+            self.position_shm = PositionShmWriter()
+        except OSError as e:
+            print(f"⚠️ Shared-memory position channel unavailable: {e}")
+            self.position_shm = None
+        
+        # Emitted command stream for third-party players on localhost UDP
+        self.motion_broadcast = MotionBroadcaster()
+        self.motion_broadcast.start()
+        self.pattern_sequencer.stream_callbacks.append(self.on_stream_scheduled)
 
 
         # ADD THESE MISSING AUTO-SWITCHER VARIABLES:
@@ -2706,6 +2361,7 @@ class AIPatternSequencerGUI:
         self.stroke_count = 0
         self.stroke_threshold = 15.0  # Minimum position change to count as stroke
         self.random_timer = None  # For time-based switching
+        self.next_random_index = None  # Random mode's next pick (preloaded ahead of the switch)
         self.stroke_direction = None  # Track if we're going up or down
         self.stroke_peak_detected = False  # Track if we've hit a peak
         self._last_direction = None  # ADD THIS LINE
@@ -2768,6 +2424,7 @@ class AIPatternSequencerGUI:
         self.detected_prev_video_button = -1     # ADD THIS
         
         self.pattern_sequencer.chaos_folder_callback = self.on_chaos_folder_change
+        self.pattern_sequencer.folder_cycle_callback = self.on_cycle_folder_change
 
         
 
@@ -2852,6 +2509,14 @@ class AIPatternSequencerGUI:
         except Exception as e:
             print(f"❌ Chaos folder change error: {e}")
 
+    def on_cycle_folder_change(self, new_category):
+        """Build-up folder cycling swapped categories (called from the streaming thread)"""
+        def update_ui():
+            self.current_category = new_category
+            self.category_combo.set(new_category)
+            self.audio_manager.play('category_change')
+        self.root.after(0, update_ui)
+
     def update_chaos_status_display(self):
         """Update chaos mode status display"""
         if self.pattern_sequencer.chaos_mode:
@@ -3518,7 +3183,7 @@ class AIPatternSequencerGUI:
         """Handle fullscreen button click"""
         try:
             if hasattr(self, 'video_visualizer') and self.video_visualizer:
-                if not self.video_visualizer.video_frames:
+                if not self.video_visualizer.frame_provider:
                     messagebox.showwarning("No Video", "Please load a video first!")
                     return
             
@@ -3691,6 +3356,40 @@ class AIPatternSequencerGUI:
            command=self.on_video_direction_change
        ).pack(pady=2)
    
+       # Frame decoding mode
+       frames_frame = tk.LabelFrame(
+           top_controls, 
+           text="Frames", 
+           font=("Gothic", 9, "bold"),
+           fg='#ff66cc', 
+           bg='#110011'
+       )
+       frames_frame.pack(side=tk.LEFT, padx=20)
+   
+       self.frame_mode_var = tk.StringVar(value="All frames")
+       frame_mode_combo = ttk.Combobox(
+           frames_frame, 
+           textvariable=self.frame_mode_var, 
+           values=["All frames", "101 positions", "256 positions"], 
+           state="readonly", 
+           width=12,
+           font=("Gothic", 9)
+       )
+       frame_mode_combo.pack(pady=5, padx=5)
+       frame_mode_combo.bind("<<ComboboxSelected>>", self.on_frame_mode_change)
+   
+       self.motion_mapping_var = tk.BooleanVar(value=False)
+       tk.Checkbutton(
+           frames_frame, 
+           text="Follow motion", 
+           variable=self.motion_mapping_var, 
+           fg='#ff66cc', 
+           bg='#110011', 
+           selectcolor='#333333',
+           font=("Gothic", 9),
+           command=lambda: self.video_visualizer.set_motion_mapping(self.motion_mapping_var.get())
+       ).pack(pady=2)
+   
        # Test controls
        test_frame = tk.LabelFrame(
            top_controls, 
@@ -4471,27 +4170,20 @@ class AIPatternSequencerGUI:
         self.video_visualizer.direction = self.direction_var.get()
         self.video_visualizer.on_direction_change()
 
+    def on_frame_mode_change(self, event=None):
+        """Switch between decoding all frames and a quantized position table, then reload"""
+        mode = self.frame_mode_var.get()
+        self.video_visualizer.table_positions = 0 if mode == "All frames" else int(mode.split()[0])
+        if self.video_visualizer.video_path:
+            self.video_visualizer.load_video(self.video_visualizer.video_path)
+
     def on_test_position_change(self, value):
         """Handle test slider change"""
         self.video_visualizer.on_test_position_change(value)
 
     def start_video_position_monitoring(self):
-        """Start monitoring position data for video"""
-        def monitor_loop():
-            while True:
-                try:
-                    if os.path.exists(self.video_visualizer.status_file):
-                        with open(self.video_visualizer.status_file, 'r') as f:
-                            content = f.read().strip()
-                            if content:
-                                data = json.loads(content)
-                                position = data.get('position', 50)
-                                self.video_visualizer.update_position(position)
-                    time.sleep(0.003)
-                except:
-                    time.sleep(0.1)
-    
-        threading.Thread(target=monitor_loop, daemon=True).start()    
+        """Subscribe the video visualizer to the position bus"""
+        self.position_bus.subscribe(lambda update: self.video_visualizer.update_position(update.position))
             
     def auto_apply_config(self):
         """Auto-apply config if everything is detected"""
@@ -4986,7 +4678,7 @@ class AIPatternSequencerGUI:
     def update_buildup_status(self):
         """Update build-up status"""
         if self.pattern_sequencer.buildup_mode and self.pattern_sequencer.buildup_start_time:
-            elapsed = time.time() - self.pattern_sequencer.buildup_start_time
+            elapsed = self.clock.now() - self.pattern_sequencer.buildup_start_time
             remaining = max(0, self.pattern_sequencer.buildup_duration - elapsed)
             
             current_speed = self.pattern_sequencer.get_current_speed(self.arousal)
@@ -5098,7 +4790,7 @@ class AIPatternSequencerGUI:
         
         while self.running:
             try:
-                loop_start = time.time()
+                loop_start = self.clock.now()
                 
                 # MANUAL OVERRIDE: Ultra-responsive mode
                 if self.pattern_sequencer.manual_override_active:
@@ -5109,7 +4801,10 @@ class AIPatternSequencerGUI:
                     # Send directly with minimal delay
                     device_position = position / 100.0
                     self.device_client.send_position_command(device_position, 50)
-                    self.write_position_status(position)
+                    if self.position_shm:
+                        self.position_shm.write(position, self.arousal, MODE_MANUAL, True,
+                                                self.pattern_sequencer.buildup_mode, self.running)
+                    self.motion_broadcast.publish(position, 50)
                     self.write_position_status(position)
                     if hasattr(self, 'video_visualizer'):
                         self.video_visualizer.update_position(position)
@@ -5120,7 +4815,7 @@ class AIPatternSequencerGUI:
                         text=f"Stream: MANUAL | Pos: {position} | Mode: Manual"
                     ))
                     
-                    time.sleep(0.008)  # ~125Hz
+                    self.clock.sleep(0.008)  # ~125Hz
                     continue
                 
                 # PATTERN MODE: ZERO GAPS WITH PROPER SPEED
@@ -5128,7 +4823,7 @@ class AIPatternSequencerGUI:
                 result = self.pattern_sequencer.get_next_motion_command(self.arousal)
                 
                 if result[0] is None:
-                    time.sleep(0.005)  # Minimal wait
+                    self.clock.sleep(0.005)  # Minimal wait
                     continue
                 
                 position, duration, action_type = result
@@ -5139,9 +4834,12 @@ class AIPatternSequencerGUI:
                 # Send command IMMEDIATELY - NO WAITING
                 device_position = position / 100.0
                 current_speed = self.pattern_sequencer.get_current_speed(self.arousal)
-                final_duration = int(duration / current_speed)
-                final_duration = max(50, min(500, final_duration))
+                final_duration = self.pattern_sequencer.device_duration(duration, current_speed)
                 self.device_client.send_position_command(device_position, final_duration)
+                self.publish_sent_command(self.pattern_sequencer.last_command, position, final_duration)
+                if self.position_shm:
+                    self.position_shm.write(position, current_speed, MODE_PATTERN, False,
+                                            self.pattern_sequencer.buildup_mode, self.running)
                 self.write_position_status(position)
                 if hasattr(self, 'video_visualizer') and not self.test_mode_var.get():
                     self.video_visualizer.target_position = position
@@ -5161,24 +4859,18 @@ class AIPatternSequencerGUI:
                 target_sleep = duration / 1000.0
                 
                 # Account for actual loop execution time
-                loop_time = time.time() - loop_start
+                loop_time = self.clock.now() - loop_start
                 adjusted_sleep = max(0.003, target_sleep - loop_time)  # Minimal floor
                 
-                time.sleep(max(0.001, adjusted_sleep))
+                self.clock.sleep(max(0.001, adjusted_sleep))
                 
             except Exception as e:
                 print(f"Streaming error: {e}")
-                time.sleep(0.005)  # Quick recovery
+                self.clock.sleep(0.005)  # Quick recovery
                 self.audio_manager.play('error_playback')
 
     def write_position_status(self, position=None):
-        if hasattr(self, 'stroke_enabled'):
-            print(f"Stroke enabled: {self.stroke_enabled.get()}, Position: {position}")
-        current_time = time.time()
-        if current_time - self.last_json_write_time < self.json_write_interval:
-            return
-        self.last_json_write_time = current_time
-
+        """Publish the current position on the position bus"""
         try:
             if position is None:
                 if self.pattern_sequencer.manual_override_active:
@@ -5188,35 +4880,59 @@ class AIPatternSequencerGUI:
             else:
                 current_position = position
 
-            # FIXED: Stroke detection for video switching
-            if (hasattr(self, 'stroke_enabled') and 
-                hasattr(self, 'stroke_interval_entry') and 
-                self.stroke_enabled.get() and 
-                position is not None):
-                self.detect_stroke(position)
-
-            status_data = {
-                'manual_active': self.pattern_sequencer.manual_override_active,
-                'position': current_position,
-                'timestamp': time.time(),
-                'running': self.running,
-                'mode': 'manual' if self.pattern_sequencer.manual_override_active else 'pattern',
-                'buildup_active': getattr(self.pattern_sequencer, 'buildup_mode', False),
-                'current_speed': self.arousal,
-                'joystick_speed_multiplier': self.joystick_controller.get_current_speed_multiplier() if self.joystick_controller else 1.0
-            }
-    
-            # Write atomically
-            temp_file = 'manual_position_temp.json'
-            with open(temp_file, 'w') as f:
-                json.dump(status_data, f)
-
-            if os.path.exists('manual_position.json'):
-                os.remove('manual_position.json')
-            os.rename(temp_file, 'manual_position.json')
+            manual_active = self.pattern_sequencer.manual_override_active
+            self.position_bus.publish(PositionUpdate(
+                position=current_position,
+                timestamp=time.time(),
+                mode='manual' if manual_active else 'pattern',
+                manual_active=manual_active,
+                running=self.running,
+                buildup_active=getattr(self.pattern_sequencer, 'buildup_mode', False),
+                current_speed=self.arousal,
+                joystick_speed_multiplier=self.joystick_controller.get_current_speed_multiplier() if self.joystick_controller else 1.0,
+                fallback=position is None
+            ))
 
         except Exception as e:
             pass
+
+    def on_bus_position(self, update):
+        """Position bus subscriber - stroke detection for manual control
+
+        Pattern strokes are counted from the stream schedule (on_stream_strokes).
+        """
+        if (update.manual_active and
+            not update.fallback and
+            hasattr(self, 'stroke_enabled') and 
+            hasattr(self, 'stroke_interval_entry') and 
+            self.stroke_enabled.get()):
+            self.detect_stroke(update.position)
+
+    def on_stream_scheduled(self, commands):
+        """Broadcast newly queued stream commands at their scheduled wall-clock start,
+        with the device duration they get if the speed holds until they are sent"""
+        offset = time.time() - self.clock.now()
+        for command in commands:
+            stamp = offset + command['timestamp'] / 1000.0
+            predicted = self.pattern_sequencer.device_duration(command['duration'], command['speed_used'])
+            command['broadcast'] = (stamp, predicted)
+            self.motion_broadcast.publish(command['pos'], predicted, stamp)
+
+    def publish_sent_command(self, command, position, final_duration):
+        """Broadcast the duration the device was actually sent - an update under the
+        announced timestamp when the speed changed since the command was queued"""
+        announced = command.get('broadcast') if command else None
+        if announced is None:
+            self.motion_broadcast.publish(position, final_duration)
+        elif announced[1] != final_duration:
+            self.motion_broadcast.publish(position, final_duration, announced[0])
+
+    def on_stream_strokes(self, count, timestamp_ms):
+        """Strokes reached by the pattern stream - exact, no position sampling"""
+        if (hasattr(self, 'stroke_enabled') and 
+            hasattr(self, 'stroke_interval_entry') and 
+            self.stroke_enabled.get()):
+            self.count_strokes(count)
         
     def detect_stroke(self, current_position):
         """Simple stroke detection that actually works"""
@@ -5229,18 +4945,7 @@ class AIPatternSequencerGUI:
             
                 # Count stroke on direction change
                 if hasattr(self, '_last_direction') and self._last_direction != current_direction:
-                    self.stroke_count += 1
-                    print(f"🎬 STROKE DETECTED! Count: {self.stroke_count}")
-                    self.update_stroke_display()  # Add this line
-                
-                    try:
-                        target_strokes = int(self.stroke_interval_entry.get())
-                        if self.stroke_count >= target_strokes:
-                            print(f"🎬 SWITCHING VIDEO! ({self.stroke_count}/{target_strokes})")
-                            self.switch_to_next_video()
-                            self.stroke_count = 0
-                    except:
-                        pass
+                    self.count_strokes(1)
             
                 self._last_direction = current_direction
         
@@ -5249,6 +4954,21 @@ class AIPatternSequencerGUI:
         except Exception as e:
             print(f"Stroke detection error: {e}")
 
+    def count_strokes(self, count):
+        """Add strokes toward the stroke-based video switch"""
+        self.stroke_count += count
+        print(f"🎬 STROKE DETECTED! Count: {self.stroke_count}")
+        self.root.after(0, self.update_stroke_display)
+    
+        try:
+            target_strokes = int(self.stroke_interval_entry.get())
+            if self.stroke_count >= target_strokes:
+                print(f"🎬 SWITCHING VIDEO! ({self.stroke_count}/{target_strokes})")
+                self.root.after(0, self.switch_to_next_video)
+                self.stroke_count = 0
+        except:
+            pass
+
     def update_stroke_display(self):
         """Update stroke count display"""
         try:
@@ -5496,6 +5216,25 @@ class AIPatternSequencerGUI:
         self.current_video_name.config(
             text=f"{current_video['name']} ({self.video_gallery.current_index + 1}/{len(self.video_gallery.videos)})"
         )
+        
+        self.preload_gallery_neighbours()
+
+    def preload_gallery_neighbours(self):
+        """Preload the videos next/prev and random switching would pick"""
+        videos = self.video_gallery.videos
+        current_index = self.video_gallery.current_index
+        if len(videos) < 2:
+            return
+        indices = [(current_index + 1) % len(videos), (current_index - 1) % len(videos)]
+        
+        # Random mode picks its next video now so it can be preloaded
+        if getattr(self, 'random_enabled', None) and self.random_enabled.get():
+            if self.next_random_index is None or self.next_random_index == current_index or \
+                    self.next_random_index >= len(videos):
+                self.next_random_index = random.choice([i for i in range(len(videos)) if i != current_index])
+            indices.append(self.next_random_index)
+        
+        self.video_visualizer.preload_videos([videos[i]['file_path'] for i in indices])
 
     def update_gallery_display(self):
         """Update gallery display with current video highlighting - FIXED VERSION"""
@@ -5515,15 +5254,18 @@ class AIPatternSequencerGUI:
                 try:
                     # Get thumbnail image
                     thumbnail_pil = self.video_gallery.get_thumbnail_image(video['id'], (350, 250))
-                    thumbnail_tk = ImageTk.PhotoImage(thumbnail_pil)
                 
-                    # Update thumbnail display
+                    # Update thumbnail display - each slot keeps one persistent PhotoImage
+                    surface = thumb.get('surface')
+                    if surface is None:
+                        surface = thumb['surface'] = DisplaySurface(thumb['label'])
+                    surface.blit_image(thumbnail_pil)
                     thumb['label'].config(
-                        image=thumbnail_tk, 
+                        image=surface.photo, 
                         text="",
                         compound='center'
                     )
-                    thumb['label'].image = thumbnail_tk
+                    thumb['label'].image = surface.photo
                 
                     # Update name
                     thumb['name'].config(text=video['name'][:15])
@@ -5715,13 +5457,6 @@ class AIPatternSequencerGUI:
     def start_buildup_mode(self):
         """Start build-up mode with FIXED speed limits and time parsing"""
         try:
-            # RESET all audio tracking flags
-            self.pattern_sequencer._buildup_completed = False
-            # Clear any existing milestone flags
-            for attr in list(vars(self.pattern_sequencer).keys()):
-                if attr.startswith('_fired_cycle_'):
-                    delattr(self.pattern_sequencer, attr)
-                
             time_input = self.buildup_time_entry.get().strip()
     
             # Parse time input - handle both "MM:SS" and plain seconds
@@ -5944,8 +5679,9 @@ class AIPatternSequencerGUI:
             interval_seconds = int(self.random_interval_entry.get())
             interval_ms = interval_seconds * 1000
         
-            # Schedule next switch
+            # Schedule next switch and preload its pick
             self.random_timer = self.root.after(interval_ms, self._random_video_switch)
+            self.preload_gallery_neighbours()
         
             # Update status
             if hasattr(self, 'video_status_label'):
@@ -5967,13 +5703,15 @@ class AIPatternSequencerGUI:
             """Internal method for random video switching"""
             try:
                 if self.random_enabled.get() and self.video_gallery.videos:
-                    # Switch to random video
-                    import random
+                    # Switch to the preloaded random pick (or a fresh one if the gallery changed)
                     current_index = self.video_gallery.current_index
                     available_indices = [i for i in range(len(self.video_gallery.videos)) if i != current_index]
             
                     if available_indices:
-                        new_index = random.choice(available_indices)
+                        new_index = self.next_random_index
+                        if new_index not in available_indices:
+                            new_index = random.choice(available_indices)
+                        self.next_random_index = None
                         self.video_gallery.current_index = new_index
                         self.load_gallery_video()
                         self.update_gallery_display()
@@ -6115,6 +5853,24 @@ class AIPatternSequencerGUI:
                 except Exception as e:
                     print(f"⚠️ Error disconnecting: {e}")
     
+            # Final position export, then stop the exporter
+            if hasattr(self, 'position_exporter'):
+                self.position_exporter.stop()
+                if self.export_position_file and self.position_bus.latest:
+                    self.position_exporter.export(self.position_bus.latest)
+            if getattr(self, 'position_shm', None):
+                self.position_shm.close()
+            if hasattr(self, 'motion_broadcast'):
+                self.motion_broadcast.stop()
+            if getattr(self, 'video_visualizer', None):
+                self.video_visualizer.preloader.close()
+                self.video_visualizer.close_fullscreen_provider()
+                if self.video_visualizer.frame_provider:
+                    self.video_visualizer.frame_provider.close()
+            if hasattr(self, 'video_gallery'):
+                self.video_gallery.proxy_transcoder.stop()
+            shutdown_pool()
+    
             # Stop joystick controller
             if hasattr(self, 'joystick_controller'):
                 print("🛑 Stopping joystick controller...")
@@ -6196,6 +5952,16 @@ class AIPatternSequencerGUI:
 
 
 if __name__ == "__main__":
+    import pygame
+    try:
+        from PyQt5.QtWidgets import QApplication, QSplashScreen, QLabel
+        from PyQt5.QtCore import Qt, QTimer
+        from PyQt5.QtGui import QPixmap, QPainter
+        PYQT_AVAILABLE = True
+    except ImportError:
+        print("⚠️ PyQt5 not installed. Install with: pip install PyQt5")
+        PYQT_AVAILABLE = False
+
     try:
         print("Initializing AI Pattern Sequencer...")
         app = AIPatternSequencerGUI()
@@ -0,0 +1,150 @@
+"""
+Arousal Estimator
+Closed-loop estimate of current arousal from live input signals - emitted
+strokes, joystick speed, manual override use and skip presses - over a
+sliding window held in a fixed ring of time buckets (constant memory)
+"""
+
+import math
+
+from stroke_detection import STROKE_MIN_TRAVEL
+
+WINDOW_SECONDS = 30.0
+BUCKET_SECONDS = 1.0
+
+STROKE_RATE_FULL = 180.0     # strokes per minute that read as 100% arousal
+SPEED_GAIN = 30.0            # arousal points per 1.0x joystick speed above/below 1.0x
+MANUAL_GAIN = 15.0           # arousal points for a window spent fully in manual override
+SKIP_PENALTY = 5.0           # arousal points per skip in the window
+SKIP_PENALTY_MAX = 20.0
+
+
+class ArousalEstimator:
+    """Incremental arousal estimate - every update is O(1), memory is fixed"""
+
+    def __init__(self, window=WINDOW_SECONDS, bucket=BUCKET_SECONDS):
+        self.window = float(window)
+        self.bucket = float(bucket)
+        self.bucket_count = max(1, int(math.ceil(self.window / self.bucket)))
+
+        # Ring buckets per windowed signal plus their running sums
+        self.strokes = [0] * self.bucket_count
+        self.skips = [0] * self.bucket_count
+        self.manual = [0.0] * self.bucket_count  # seconds spent in manual override
+        self.stroke_total = 0
+        self.skip_total = 0
+        self.manual_total = 0.0
+        self._bucket_index = None  # absolute bucket number of the newest bucket
+
+        # Joystick speed: exponential average with the window as time constant
+        self.speed = 1.0
+        self._speed_time = None
+
+        # Manual override state for measuring time spent in it
+        self.manual_active = False
+        self._manual_since = None
+
+        # Timeline seeks pin the estimate, fading out over one window
+        self.anchor = None
+        self._anchor_time = None
+
+        # Stroke detection from raw positions
+        self._last_position = None
+        self._last_direction = 0
+
+    def _advance(self, now):
+        """Roll the ring forward to `now`, expiring buckets that left the window"""
+        index = int(now // self.bucket)
+        if self._bucket_index is None:
+            self._bucket_index = index
+            return
+        steps = index - self._bucket_index
+        if steps <= 0:
+            return
+        for step in range(1, min(steps, self.bucket_count) + 1):
+            slot = (self._bucket_index + step) % self.bucket_count
+            self.stroke_total -= self.strokes[slot]
+            self.skip_total -= self.skips[slot]
+            self.manual_total -= self.manual[slot]
+            self.strokes[slot] = 0
+            self.skips[slot] = 0
+            self.manual[slot] = 0.0
+        self._bucket_index = index
+
+    def _slot(self):
+        return self._bucket_index % self.bucket_count
+
+    def _accumulate_manual(self, now):
+        if self.manual_active and self._manual_since is not None:
+            seconds = max(0.0, now - self._manual_since)
+            self.manual[self._slot()] += seconds
+            self.manual_total += seconds
+            self._manual_since = now
+
+    def record_position(self, now, position):
+        """Feed one emitted position (0-100) - a stroke is counted on each reversal"""
+        if self._last_position is None:
+            self._last_position = position
+            return
+        change = position - self._last_position
+        self._last_position = position
+        if abs(change) >= STROKE_MIN_TRAVEL:
+            direction = 1 if change > 0 else -1
+            if self._last_direction and direction != self._last_direction:
+                self.record_stroke(now)
+            self._last_direction = direction
+
+    def record_stroke(self, now):
+        self._advance(now)
+        self._accumulate_manual(now)
+        self.strokes[self._slot()] += 1
+        self.stroke_total += 1
+
+    def record_skip(self, now):
+        self._advance(now)
+        self._accumulate_manual(now)
+        self.skips[self._slot()] += 1
+        self.skip_total += 1
+
+    def record_speed(self, now, speed):
+        """Joystick/base speed multiplier - faster than 1.0x reads as higher arousal"""
+        if self._speed_time is None:
+            self.speed = speed
+        else:
+            alpha = 1.0 - math.exp(-max(0.0, now - self._speed_time) / self.window)
+            self.speed += (speed - self.speed) * alpha
+        self._speed_time = now
+
+    def record_manual(self, now, active):
+        """Manual override switched on or off"""
+        self._advance(now)
+        self._accumulate_manual(now)
+        self.manual_active = active
+        self._manual_since = now if active else None
+
+    def record_anchor(self, now, arousal):
+        """Explicit arousal from a timeline seek - dominates, then fades over the window"""
+        self.anchor = arousal
+        self._anchor_time = now
+
+    def estimate(self, now):
+        """Current arousal estimate (0-100)"""
+        self._advance(now)
+        self._accumulate_manual(now)
+
+        strokes_per_minute = self.stroke_total * 60.0 / self.window
+        arousal = min(100.0, strokes_per_minute / STROKE_RATE_FULL * 100.0)
+        arousal += (self.speed - 1.0) * SPEED_GAIN
+        arousal += min(1.0, self.manual_total / self.window) * MANUAL_GAIN
+        arousal -= min(SKIP_PENALTY_MAX, self.skip_total * SKIP_PENALTY)
+
+        if self.anchor is not None:
+            weight = math.exp(-max(0.0, now - self._anchor_time) / self.window)
+            arousal = self.anchor * weight + arousal * (1.0 - weight)
+            if weight < 0.01:
+                self.anchor = None
+
+        return max(0.0, min(100.0, arousal))
+
+    def reset(self):
+        self.__init__(self.window, self.bucket)
@@ -0,0 +1,476 @@
+"""
+Motion Hot-Path Benchmarks
+Headless benchmark harness for the pattern engine - no display, audio or hardware needed
+
+Usage:
+    python benchmark.py                         # run everything, compare against baseline
+    python benchmark.py --quick                 # smaller sizes for a fast sanity run
+    python benchmark.py --only load_patterns    # run selected benchmarks
+    python benchmark.py --save-baseline         # store results as the new baseline
+    python benchmark.py --output results.json   # write machine-readable results
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+from clock import MonotonicClock, VirtualClock
+from device_handler import PatternManager, PlaybackEngine
+from motion_broadcast import MotionBroadcaster
+from pattern_sequencer import PatternSequencer
+from position_shm import PositionShmReader, PositionShmWriter
+from session_manager import SessionManager
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+REGRESSION_THRESHOLD = 0.10  # 10% slower than baseline counts as a regression
+NOISE_FLOOR = 50e-6          # seconds - smaller slowdowns of a timing are never regressions
+NOISE_FLOOR_PER_OP = 20e-9   # seconds - the same for per-operation averages
+SUB_MS_REPEATS = 9           # repeats for sub-millisecond metrics (median of 3 flaps)
+LATENCY_RUNS = 5             # real-time jitter / latency runs, median of each statistic
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def write_synthetic_library(root, category, count, seed=0):
+    """Write `count` random funscripts into root/funscripts/<category>"""
+    rng = random.Random(seed)
+    folder = os.path.join(root, "funscripts", category)
+    os.makedirs(folder, exist_ok=True)
+    for i in range(count):
+        endpoint = rng.choice([0, 50, 100])
+        length = rng.randint(8, 40)
+        actions = [{'at': 0, 'pos': endpoint}]
+        for j in range(1, length - 1):
+            actions.append({'at': j * rng.randint(80, 300), 'pos': rng.randint(0, 100)})
+        actions.append({'at': length * 300, 'pos': endpoint})
+        with open(os.path.join(folder, f"pattern_{i:05d}.funscript"), 'w') as f:
+            json.dump({'version': '1.0', 'inverted': False, 'range': 100, 'actions': actions}, f)
+    return folder
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the engine's print/log chatter while timing"""
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def time_repeated(fn, repeats):
+    """Run fn `repeats` times, return per-run seconds"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples, unit_scale=1000.0, unit="ms", noise_floor=NOISE_FLOOR):
+    """Median/min/max of per-run seconds in `unit`; noise_floor (seconds) is the smallest
+    slowdown compare_to_baseline will flag"""
+    return {
+        'value': round(statistics.median(samples) * unit_scale, 4),
+        'min': round(min(samples) * unit_scale, 4),
+        'max': round(max(samples) * unit_scale, 4),
+        'unit': unit,
+        'noise_floor': round(noise_floor * unit_scale, 6),
+        'lower_is_better': True
+    }
+
+
+def latency_result(values_ms):
+    """Median over runs of one real-time statistic, in ms"""
+    return {'value': round(statistics.median(values_ms), 4), 'unit': "ms",
+            'noise_floor': NOISE_FLOOR * 1000.0, 'lower_is_better': True}
+
+
+class MockDevice:
+    """Records command send times instead of talking to the C# server"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.connected = True
+        self.device_connected = True
+        self.sent = []
+
+    def send_position_command(self, position, duration):
+        self.sent.append(self.clock.now())
+
+    def send_stop_command(self):
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks - each returns {result_name: summary}
+# ---------------------------------------------------------------------------
+
+def bench_load_patterns(workdir, sizes):
+    results = {}
+    for size in sizes:
+        category = f"BENCH_{size}"
+        write_synthetic_library(workdir, category, size)
+        with working_directory(workdir), quiet():
+            sequencer = PatternSequencer(clock=VirtualClock(), rng=random.Random(0))
+            samples = time_repeated(lambda: sequencer.load_patterns(category), 3)
+        results[f"load_patterns[{size}]"] = summarize(samples)
+    return results
+
+
+def _make_sequencer(workdir, size=200):
+    category = f"BENCH_{size}"
+    if not os.path.isdir(os.path.join(workdir, "funscripts", category)):
+        write_synthetic_library(workdir, category, size)
+    clock = VirtualClock()
+    with working_directory(workdir), quiet():
+        sequencer = PatternSequencer(clock=clock, rng=random.Random(0))
+        sequencer.load_patterns(category)
+    return sequencer, clock
+
+
+def bench_next_motion_command(workdir, commands):
+    sequencer, clock = _make_sequencer(workdir)
+
+    def run():
+        for _ in range(commands):
+            _, duration, _ = sequencer.get_next_motion_command(0.75)
+            clock.advance(duration / 1000.0)
+
+    with quiet():
+        samples = time_repeated(run, 3)
+    per_command = [s / commands for s in samples]
+    return {'get_next_motion_command': summarize(per_command, 1e6, "us/cmd", NOISE_FLOOR_PER_OP)}
+
+
+def bench_build_seamless_stream(workdir, repeats):
+    sequencer, clock = _make_sequencer(workdir)
+
+    def run():
+        sequencer._clear_stream()
+        sequencer.build_seamless_stream(0.75)
+
+    with quiet():
+        samples = time_repeated(run, repeats)
+    return {'build_seamless_stream': summarize(samples, 1e6, "us")}
+
+
+def bench_arousal_curve(session_lengths):
+    results = {}
+    with quiet():
+        session_manager = SessionManager(os.devnull, clock=VirtualClock(), rng=random.Random(0))
+        for length in session_lengths:
+            samples = time_repeated(lambda: session_manager.create_multi_peak_arousal_curve(length, 5), 20)
+            results[f"create_multi_peak_arousal_curve[{length}s]"] = summarize(samples, 1e6, "us")
+    return results
+
+
+def bench_find_pattern_by_name(workdir, size, lookups):
+    category = f"BENCH_{size}"
+    folder = os.path.join(workdir, "funscripts", category)
+    if not os.path.isdir(folder):
+        write_synthetic_library(workdir, category, size)
+    with quiet():
+        manager = PatternManager(folder)
+    names = [p.name for p in manager.get_all_patterns()]
+    rng = random.Random(0)
+    targets = [rng.choice(names) for _ in range(lookups)]
+
+    def run():
+        for name in targets:
+            manager.find_pattern_by_name(name)
+
+    samples = time_repeated(run, 3)
+    per_lookup = [s / lookups for s in samples]
+    return {f"find_pattern_by_name[{size}]": summarize(per_lookup, 1e6, "us/lookup", NOISE_FLOOR_PER_OP)}
+
+
+def bench_session_plan(workdir, size, session_lengths):
+    category = f"BENCH_{size}"
+    folder = os.path.join(workdir, "funscripts", category)
+    if not os.path.isdir(folder):
+        write_synthetic_library(workdir, category, size)
+    results = {}
+    with quiet():
+        manager = PatternManager(folder)
+        session_manager = SessionManager(os.devnull, clock=VirtualClock(), rng=random.Random(0))
+        session_manager.set_pattern_catalog(manager.get_all_patterns())
+        for length in session_lengths:
+            duration = f"{length // 60}:{length % 60:02d}"
+            samples = time_repeated(lambda: session_manager.start_session(duration), 3)
+            results[f"session_plan[{length}s]"] = summarize(samples)
+    return results
+
+
+def bench_emission_jitter(workdir, actions, interval_ms, runs=LATENCY_RUNS):
+    """Real-time playback against a mock device - measures send time vs schedule"""
+    folder = os.path.join(workdir, "funscripts", "JITTER")
+    os.makedirs(folder, exist_ok=True)
+    script = [{'at': i * interval_ms, 'pos': 0 if i % 2 == 0 else 100} for i in range(actions)]
+    with open(os.path.join(folder, "jitter.funscript"), 'w') as f:
+        json.dump({'actions': script}, f)
+
+    clock = MonotonicClock()
+    means, p99s, maxima = [], [], []
+    for _ in range(runs):
+        device = MockDevice(clock)
+        with quiet():
+            manager = PatternManager(folder)
+            engine = PlaybackEngine(manager, device, clock=clock)
+            engine.is_playing = True
+            pattern = manager.get_all_patterns()[0]
+            start = clock.now()
+            engine._play_pattern(pattern)
+
+        lateness = sorted((sent - start - action['at'] / 1000.0) * 1000.0
+                          for sent, action in zip(device.sent, script))
+        means.append(statistics.mean(lateness))
+        p99s.append(lateness[min(len(lateness) - 1, int(len(lateness) * 0.99))])
+        maxima.append(lateness[-1])
+    return {
+        'emission_jitter_mean': latency_result(means),
+        'emission_jitter_p99': latency_result(p99s),
+        'emission_jitter_max': latency_result(maxima)
+    }
+
+
+def _shm_latency_reader(path, expected, results):
+    """Other-process reader: spin on the seqlock, report how stale each new record was"""
+    reader = PositionShmReader(path)
+    last_sequence = reader.read_sequence()
+    ages = []
+    deadline = time.time() + 30.0
+    while len(ages) < expected and time.time() < deadline:
+        sequence = reader.read_sequence()
+        if sequence == last_sequence or sequence & 1:
+            continue
+        state = reader.read()
+        if state:
+            ages.append((time.time() - state.timestamp) * 1000.0)
+            last_sequence = state.sequence
+    results.put(ages)
+
+
+def bench_position_shm(workdir, writes, interval, runs=LATENCY_RUNS):
+    """Write/read cost in-process, write-to-visible latency across processes"""
+    path = os.path.join(workdir, "position.shm")
+    writer = PositionShmWriter(path)
+    reader = PositionShmReader(path)
+
+    def write_run():
+        for i in range(writes):
+            writer.write(i % 100, 1.0)
+
+    def read_run():
+        for _ in range(writes):
+            reader.read()
+
+    write_samples = [s / writes for s in time_repeated(write_run, SUB_MS_REPEATS)]
+    read_samples = [s / writes for s in time_repeated(read_run, SUB_MS_REPEATS)]
+
+    p50s, p99s = [], []
+    for _ in range(runs):
+        results_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_shm_latency_reader, args=(path, writes, results_queue))
+        process.start()
+        time.sleep(0.5)  # let the reader map the file
+        for i in range(writes):
+            writer.write(i % 100, 1.0)
+            time.sleep(interval)
+        ages = sorted(results_queue.get(timeout=60))
+        process.join()
+        if ages:
+            p50s.append(ages[len(ages) // 2])
+            p99s.append(ages[min(len(ages) - 1, int(len(ages) * 0.99))])
+    reader.close()
+    writer.close()
+
+    results = {
+        'position_shm_write': summarize(write_samples, 1e6, "us/write", NOISE_FLOOR_PER_OP),
+        'position_shm_read': summarize(read_samples, 1e6, "us/read", NOISE_FLOOR_PER_OP),
+    }
+    if p50s:
+        results['position_shm_latency_p50'] = latency_result(p50s)
+        results['position_shm_latency_p99'] = latency_result(p99s)
+    return results
+
+
+def bench_motion_broadcast(commands, subscriber_counts):
+    """Streaming-loop publish cost and sender fan-out cost against subscriber count
+
+    Subscribers are bound sockets that never read, i.e. the slowest possible clients.
+    """
+    results = {}
+    for count in subscriber_counts:
+        with quiet():
+            broadcaster = MotionBroadcaster(port=0)
+            broadcaster.open()
+        clients = []
+        for _ in range(count):
+            client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            client.bind(("127.0.0.1", 0))
+            clients.append(client)
+            broadcaster.add_subscriber(client.getsockname())
+
+        publish_samples, fanout_samples = [], []
+        for _ in range(SUB_MS_REPEATS):
+            start = time.perf_counter()
+            for i in range(commands):
+                broadcaster.publish(i % 100, 100)
+            publish_samples.append((time.perf_counter() - start) / commands)
+            start = time.perf_counter()
+            broadcaster.flush()
+            fanout_samples.append((time.perf_counter() - start) / commands)
+
+        broadcaster.stop()
+        for client in clients:
+            client.close()
+        results[f"broadcast_publish[{count} subs]"] = summarize(publish_samples, 1e6, "us/cmd", NOISE_FLOOR_PER_OP)
+        results[f"broadcast_fanout[{count} subs]"] = summarize(fanout_samples, 1e6, "us/cmd", NOISE_FLOOR_PER_OP)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def run_benchmarks(only=None, quick=False):
+    sizes = [100, 1000] if quick else [100, 1000, 10000]
+    suites = {
+        'load_patterns': lambda d: bench_load_patterns(d, sizes),
+        'get_next_motion_command': lambda d: bench_next_motion_command(d, 2000 if quick else 20000),
+        'build_seamless_stream': lambda d: bench_build_seamless_stream(d, 200 if quick else 2000),
+        'arousal_curve': lambda d: bench_arousal_curve([300, 3600]),
+        'find_pattern_by_name': lambda d: bench_find_pattern_by_name(d, sizes[-1], 200 if quick else 1000),
+        'session_plan': lambda d: bench_session_plan(d, sizes[1], [300, 3600]),
+        'emission_jitter': lambda d: bench_emission_jitter(d, 50 if quick else 200, 10, 3 if quick else LATENCY_RUNS),
+        'position_shm': lambda d: bench_position_shm(d, 500 if quick else 2000, 0.002, 3 if quick else LATENCY_RUNS),
+        'motion_broadcast': lambda d: bench_motion_broadcast(256, [1, 10, 100] if quick else [1, 10, 100, 1000]),
+    }
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="hande_bench_")
+    try:
+        for name, suite in suites.items():
+            if only and name not in only:
+                continue
+            print(f"⏱️ {name}...", file=sys.stderr)
+            results.update(suite(workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'quick': quick,
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        'results': results
+    }
+
+
+def compare_to_baseline(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """Return list of (name, baseline, current, change) and regression names
+
+    A regression is slower than the baseline by more than `threshold` and by
+    more than the metric's absolute noise floor.
+    """
+    rows = []
+    regressions = []
+    for name, current in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or not previous.get('value'):
+            rows.append((name, None, current['value'], None))
+            continue
+        delta = current['value'] - previous['value']
+        if not current.get('lower_is_better', True):
+            delta = -delta
+        change = delta / abs(previous['value'])
+        rows.append((name, previous['value'], current['value'], change))
+        if change > threshold and delta > current.get('noise_floor', 0.0):
+            regressions.append(name)
+    return rows, regressions
+
+
+def print_report(report, rows=None):
+    print(f"{'benchmark':48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in report['results'].items():
+        baseline_value, change = None, None
+        if rows:
+            for row_name, previous, _, row_change in rows:
+                if row_name == name:
+                    baseline_value, change = previous, row_change
+        baseline_text = f"{baseline_value:.3f}" if baseline_value is not None else "-"
+        change_text = f"{change * 100:+.1f}%" if change is not None else "-"
+        print(f"{name:48} {baseline_text:>12} {result['value']:>12.3f} {change_text:>8}  {result['unit']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the motion hot paths")
+    parser.add_argument('--only', nargs='*', help="Benchmark groups to run")
+    parser.add_argument('--quick', action='store_true', help="Smaller sizes for a fast run")
+    parser.add_argument('--output', help="Write results JSON to this path")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the baseline")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.only, args.quick)
+
+    rows, regressions = None, []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        rows, regressions = compare_to_baseline(report, baseline, args.threshold)
+        report['comparison'] = {
+            'baseline': args.baseline,
+            'threshold': args.threshold,
+            'regressions': regressions
+        }
+
+    print_report(report, rows)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Clock sources for the motion engine
+Real-time and simulated clocks share one small interface: now() and sleep()
+
+    MonotonicClock - real use, immune to wall clock adjustments
+    ScaledClock    - real time running N times faster (tests, soak runs)
+    VirtualClock   - simulated time that only moves when advanced
+"""
+
+import time
+
+
+class MonotonicClock:
+    """Real-time clock backed by time.monotonic()"""
+
+    def now(self) -> float:
+        """Current time in seconds"""
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        """Block for the given number of seconds"""
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class SystemClock(MonotonicClock):
+    """Wall clock backed by time.time() - only for timestamps shared with other processes"""
+
+    def now(self) -> float:
+        return time.time()
+
+
+class ScaledClock:
+    """Real-time clock running `rate` times faster than the wall clock"""
+
+    def __init__(self, rate: float = 1.0, start: float = 86400.0):
+        self.rate = max(0.001, float(rate))
+        self._start = float(start)
+        self._real_start = time.monotonic()
+
+    def now(self) -> float:
+        """Current scaled time in seconds"""
+        return self._start + (time.monotonic() - self._real_start) * self.rate
+
+    def sleep(self, seconds: float):
+        """Block for `seconds` of scaled time"""
+        if seconds > 0:
+            time.sleep(seconds / self.rate)
+
+
+class VirtualClock:
+    """Simulated clock - time only moves when advanced"""
+
+    def __init__(self, start: float = 86400.0):
+        # Start away from zero - the engine treats a zero timestamp as "not started"
+        self._now = float(start)
+
+    def now(self) -> float:
+        """Current simulated time in seconds"""
+        return self._now
+
+    def advance(self, seconds: float):
+        """Move simulated time forward"""
+        if seconds > 0:
+            self._now += seconds
+
+    def sleep(self, seconds: float):
+        """Sleeping on a virtual clock just advances it"""
+        self.advance(seconds)
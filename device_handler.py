@@ -6,6 +6,8 @@ import time
 import logging
 from typing import List, Dict, Optional
 
+from clock import MonotonicClock
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -351,14 +353,16 @@ class IntifaceClient:
 
 class PlaybackEngine:
     """Handles pattern playback logic with smart chaining and session integration"""
-    def __init__(self, pattern_manager: PatternManager, device_client: IntifaceClient):
+    def __init__(self, pattern_manager: PatternManager, device_client: IntifaceClient, clock=None):
         self.pattern_manager = pattern_manager
+        self.clock = clock or MonotonicClock()
         self.device_client = device_client
         self.is_playing = False
         self.playback_thread = None
         self.min_range = 0
         self.max_range = 100
         self.slow_mode = False
+        self.skip_requested = False
         self.twerk_mode = False  # NEW: Twerk mode flag
         self.speed_multiplier = 1.0  # NEW: Global speed multiplier (0.25x to 2.0x)
         
@@ -370,6 +374,8 @@ class PlaybackEngine:
         # Session integration
         self.session_manager = None  # NEW: Set by GUI
         self.dynamic_speed_multiplier = 1.0  # NEW: From session manager
+        self.selected_speed_multiplier = 1.0  # Multiplier chosen with the last selected pattern
+        self.next_speed_multiplier = 1.0      # ...kept with next_pattern until it plays
     
     def set_range(self, min_range: int, max_range: int):
         """Set position range limits"""
@@ -379,26 +385,49 @@ class PlaybackEngine:
     def set_slow_mode(self, slow_mode: bool):
         """Set slow mode on/off"""
         self.slow_mode = slow_mode
+        self._record_user_speed()
     
     def set_speed_multiplier(self, multiplier: float):
         """Set global speed multiplier (0.25x to 2.0x)"""
         self.speed_multiplier = multiplier
         logger.info(f"Global speed multiplier set to {multiplier:.2f}x")
+        self._record_user_speed()
+    
+    def _record_user_speed(self):
+        """Feed the user's speed choice to the session's arousal estimate - both settings
+        scale move durations, so the speed factor is their inverse"""
+        if self.session_manager:
+            duration_scale = self.speed_multiplier * (1.5 if self.slow_mode else 1.0)
+            self.session_manager.record_speed_change(1.0 / max(0.01, duration_scale))
+    
+    def skip_pattern(self):
+        """End the current pattern now and move on to the queued one"""
+        if self.is_playing:
+            self.skip_requested = True
+            if self.session_manager:
+                self.session_manager.record_skip()
     
     def start_playback(self):
         """Start pattern playback with look-ahead"""
         if not self.pattern_manager or not self.device_client.connected:
             return False
         
+        # Timeline seeks cancel the queued pattern
+        if self.session_manager:
+            self.session_manager.add_seek_listener(self._on_session_seek)
+        
         # Pick first pattern (start at depth or twerk position)
         self.current_position = 0
         self.current_pattern = self._select_pattern_for_position(0)
         if not self.current_pattern:
             logger.error("No patterns available to start playback")
             return False
+        current_multiplier = self.selected_speed_multiplier
         
         # Immediately select next pattern based on where current will end
         self.next_pattern = self._select_pattern_for_position(self.current_pattern.end_pos)
+        self.next_speed_multiplier = self.selected_speed_multiplier
+        self.dynamic_speed_multiplier = current_multiplier
         
         self.is_playing = True
         self.playback_thread = threading.Thread(target=self._playback_loop)
@@ -440,25 +469,45 @@ class PlaybackEngine:
             # Move to next pattern
             self.current_position = self.current_pattern.end_pos
             self.current_pattern = self.next_pattern
+            self.dynamic_speed_multiplier = self.next_speed_multiplier
             
             # Look ahead - select pattern after next
             if self.current_pattern:
                 self.next_pattern = self._select_pattern_for_position(self.current_pattern.end_pos)
+                self.next_speed_multiplier = self.selected_speed_multiplier
             else:
                 # No more patterns available
                 break
     
+    def _on_session_seek(self, session_time):
+        """Session timeline moved - replace the queued next pattern from the re-planned window"""
+        if not self.is_playing or not self.current_pattern:
+            return
+        self.next_pattern = self._select_pattern_for_position(self.current_pattern.end_pos)
+        self.next_speed_multiplier = self.selected_speed_multiplier
+        logger.info(f"Seek to {session_time:.0f}s - queued pattern replaced with "
+                    f"{self.next_pattern.name if self.next_pattern else 'None'}")
+    
     def _select_pattern_for_position(self, current_pos):
         """Select next pattern based on current position with session manager integration"""
         if not self.pattern_manager:
             return None
         
+        # Patterns without a session choice keep the current session speed
+        self.selected_speed_multiplier = self.dynamic_speed_multiplier
+        
         # NEW: Use session manager if available
         if self.session_manager and self.session_manager.is_session_active():
+            # Planned session: stream the precomputed plan in order, no searching
+            entry = self.session_manager.next_plan_entry(current_pos)
+            if entry:
+                self.selected_speed_multiplier = entry.speed_multiplier
+                return entry.pattern
+            
             pattern_rec, speed_mult = self.session_manager.get_next_pattern_recommendation(current_pos)
             if pattern_rec:
-                # Apply speed multiplier
-                self.dynamic_speed_multiplier = speed_mult
+                # Speed multiplier travels with the pattern until it plays
+                self.selected_speed_multiplier = speed_mult
                 
                 # Find actual pattern object from recommendation
                 selected = self.pattern_manager.find_pattern_by_name(pattern_rec['name'])
@@ -570,19 +619,20 @@ class PlaybackEngine:
             return
             
         logger.info(f"Playing pattern: {pattern.name} ({pattern.start_pos}->{pattern.end_pos}) at {self.speed_multiplier:.2f}x speed")
-        start_time = time.time()
+        start_time = self.clock.now()
+        self.skip_requested = False
         
         for action_index, action in enumerate(pattern.actions):
-            if not self.is_playing:
+            if not self.is_playing or self.skip_requested:
                 break
                 
             # Calculate timing
             target_time = start_time + (action['at'] / 1000.0)
-            current_time = time.time()
+            current_time = self.clock.now()
             
             # Wait until it's time for this action
             if target_time > current_time:
-                time.sleep(target_time - current_time)
+                self.clock.sleep(target_time - current_time)
             
             # Apply range clamping and send command
             position = action['pos'] / 100.0
@@ -605,6 +655,8 @@ class PlaybackEngine:
                 duration = 500
             
             self.device_client.send_position_command(clamped_position, duration)
+            if self.session_manager:
+                self.session_manager.record_position(action['pos'])
     
     def _apply_range_clamp(self, position):
         """Apply min/max range clamping to position"""
@@ -0,0 +1,57 @@
+"""
+Display Surface
+One persistent Tk photo image per display, refreshed in place - showing a frame
+allocates nothing and copies its pixels twice (into a staging image, then into
+the photo) instead of building a new PIL image and PhotoImage every time
+"""
+
+import numpy as np
+from PIL import Image, ImageTk
+
+
+class DisplaySurface:
+    """Persistent PhotoImage fed from a preallocated RGB staging image
+
+    blit() decodes the frame's raw bytes into the staging image and pastes it
+    into the existing Tk photo as one pixel block. Binary PPM through
+    configure(data=...) costs more here: tkinter only hands immutable bytes to
+    Tcl as binary (bytearray/memoryview are stringified), which adds a bytes
+    copy, a Tcl byte array copy and a PPM parse on top.
+    """
+
+    def __init__(self, master=None):
+        self.master = master
+        self.photo = None
+        self.size = None
+        self._staging = None
+        self.blits = 0
+        self.allocations = 0  # photo (re)creations - only when the size changes
+
+    def _allocate(self, size):
+        self.size = size
+        self._staging = Image.new('RGB', size)
+        self.photo = ImageTk.PhotoImage(self._staging, master=self.master)
+        self.allocations += 1
+
+    def blit(self, frame):
+        """Show an RGB uint8 frame (height, width, 3) -> True when the photo was
+        (re)created and has to be attached to its widget"""
+        size = (frame.shape[1], frame.shape[0])
+        created = size != self.size
+        if created:
+            self._allocate(size)
+        self._staging.frombytes(np.ascontiguousarray(frame))
+        self.photo.paste(self._staging)
+        self.blits += 1
+        return created
+
+    def blit_image(self, image):
+        """Show a PIL image -> True when the photo was (re)created"""
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        created = image.size != self.size
+        if created:
+            self._allocate(image.size)
+        self.photo.paste(image)
+        self.blits += 1
+        return created
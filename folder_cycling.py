@@ -0,0 +1,117 @@
+"""
+Folder Cycling Scheduler
+Acts on build-up cycle_folders triggers (time, strokes, 25% progress, patterns)
+by watching the emitted command stream - constant work per command, no polling.
+Strokes come precomputed from the stream (see stroke_detection.py).
+"""
+
+TRIGGER_TIME = "time"
+TRIGGER_STROKES = "strokes"
+TRIGGER_PROGRESS = "progress"
+TRIGGER_PATTERNS = "patterns"
+
+
+def parse_trigger_type(trigger_type):
+    """Map GUI combo text ("Change every X strokes") or a plain name to a trigger"""
+    text = (trigger_type or "").lower()
+    if "stroke" in text:
+        return TRIGGER_STROKES
+    if "25%" in text or "progress" in text:
+        return TRIGGER_PROGRESS
+    if "pattern" in text:
+        return TRIGGER_PATTERNS
+    return TRIGGER_TIME
+
+
+def parse_interval(trigger, interval_value):
+    """Interval in trigger units: seconds for time, counts for strokes/patterns"""
+    text = str(interval_value).strip()
+    try:
+        if trigger == TRIGGER_TIME:
+            if ":" in text:
+                minutes, seconds = text.split(":", 1)
+                return max(1, int(minutes or 0) * 60 + int(seconds or 0))
+            return max(1, int(float(text)))
+        if trigger in (TRIGGER_STROKES, TRIGGER_PATTERNS):
+            return max(1, int(float(text)))
+    except ValueError:
+        pass
+    return {TRIGGER_TIME: 120, TRIGGER_STROKES: 10, TRIGGER_PATTERNS: 3}.get(trigger, 1)
+
+
+class FolderCycleScheduler:
+    """Decides when to move to the next category, fed one emitted command at a time"""
+
+    def __init__(self, categories, current_category, trigger_type, interval_value,
+                 start_time, duration, on_switch):
+        self.categories = list(categories)
+        self.current_category = current_category
+        self.trigger = parse_trigger_type(trigger_type)
+        self.interval = parse_interval(self.trigger, interval_value)
+        self.start_time = start_time
+        self.duration = max(1.0, float(duration))
+        self.on_switch = on_switch
+        self.switch_count = 0
+
+        # Time / progress triggers: a single deadline to compare against
+        self._quarter = 1
+        if self.trigger == TRIGGER_PROGRESS:
+            self.next_deadline = start_time + self.duration * 0.25
+        else:
+            self.next_deadline = start_time + self.interval
+
+        # Stroke / pattern triggers: running counters
+        self.counter = 0
+        self._last_pattern_id = None
+
+    def next_category(self):
+        """Round-robin through the preloaded categories"""
+        if not self.categories:
+            return None
+        if self.current_category in self.categories:
+            index = self.categories.index(self.current_category)
+            return self.categories[(index + 1) % len(self.categories)]
+        return self.categories[0]
+
+    def on_command(self, command):
+        """Feed one emitted stream command ({'timestamp' ms, 'pos', 'pattern_id'})"""
+        if self.trigger == TRIGGER_TIME or self.trigger == TRIGGER_PROGRESS:
+            if command['timestamp'] / 1000.0 >= self.next_deadline:
+                self._switch()
+                if self.trigger == TRIGGER_PROGRESS:
+                    # Only the 25/50/75% marks - 100% is the end of the build-up
+                    self._quarter += 1
+                    if self._quarter > 3:
+                        self.next_deadline = float('inf')
+                    else:
+                        self.next_deadline = self.start_time + self.duration * 0.25 * self._quarter
+                else:
+                    self.next_deadline += self.interval
+
+        elif self.trigger == TRIGGER_PATTERNS:
+            pattern_id = command.get('pattern_id')
+            if pattern_id != self._last_pattern_id:
+                if self._last_pattern_id is not None:
+                    self.counter += 1
+                    if self.counter >= self.interval:
+                        self.counter = 0
+                        self._switch()
+                self._last_pattern_id = pattern_id
+
+    def on_strokes(self, count):
+        """Feed strokes reached by the emitted stream"""
+        if self.trigger != TRIGGER_STROKES:
+            return
+        self.counter += count
+        if self.counter >= self.interval:
+            self.counter = 0
+            self._switch()
+
+    def _switch(self):
+        new_category = self.next_category()
+        if not new_category or new_category == self.current_category:
+            return
+        self.switch_count += 1
+        old_category = self.current_category
+        self.current_category = new_category
+        self.on_switch(old_category, new_category)
@@ -0,0 +1,189 @@
+"""
+Frame Atlas Cache
+Decoded display-size frames kept on disk as memory-mapped uint8 arrays, keyed
+by video content and target size - reloading a video maps its atlas instead of
+decoding it again, and the pages are shared through the OS file cache
+
+Atlas file layout:
+    header    '<4sIIII' magic b'HFAT', version, frame count, width, height
+    valid     one byte per frame (1 = frame stored), at VALID_OFFSET
+    frames    count x height x width x 3 RGB, page aligned after the valid map
+"""
+
+import hashlib
+import os
+import struct
+
+import numpy as np
+
+DEFAULT_ATLAS_DIR = os.path.join("gallery", "cache", "frames")
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024   # total size of all atlases on disk
+MAX_ATLAS_SHARE = 0.5                        # one video may use at most half the cap
+HASH_SAMPLE = 1024 * 1024                    # bytes hashed from the start, middle and end
+
+MAGIC = b'HFAT'
+VERSION = 1
+_HEADER = struct.Struct('<4sIIII')
+VALID_OFFSET = 64
+PAGE = 4096
+
+
+def content_key(path, display_size):
+    """Cache key from the file's size and sampled content plus the target size
+
+    Hashing three 1 MB samples instead of the whole file keeps keying fast for
+    large videos while still following renames and catching re-encodes.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(struct.pack('<QII', size, display_size[0], display_size[1]))
+    with open(path, 'rb') as f:
+        for offset in (0, max(0, size // 2 - HASH_SAMPLE // 2), max(0, size - HASH_SAMPLE)):
+            f.seek(offset)
+            digest.update(f.read(HASH_SAMPLE))
+    return digest.hexdigest()
+
+
+def atlas_bytes(frame_count, display_size):
+    """File size of an atlas for frame_count frames at display_size"""
+    frames_offset = _frames_offset(frame_count)
+    return frames_offset + frame_count * display_size[0] * display_size[1] * 3
+
+
+def _frames_offset(frame_count):
+    return -(-(VALID_OFFSET + frame_count) // PAGE) * PAGE
+
+
+class FrameAtlas:
+    """One video's memory-mapped frames - get() returns views, put() copies in"""
+
+    def __init__(self, path, frame_count, display_size):
+        self.path = path
+        self.frame_count = frame_count
+        self.display_size = display_size
+        width, height = display_size
+
+        if not self._header_matches():
+            with open(path, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, VERSION, frame_count, width, height))
+                f.truncate(atlas_bytes(frame_count, display_size))  # sparse where supported
+
+        self.valid = np.memmap(path, dtype=np.uint8, mode='r+',
+                               offset=VALID_OFFSET, shape=(frame_count,))
+        self.frames = np.memmap(path, dtype=np.uint8, mode='r+',
+                                offset=_frames_offset(frame_count),
+                                shape=(frame_count, height, width, 3))
+        self.stored = int(np.count_nonzero(self.valid))
+
+    def _header_matches(self):
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.read(_HEADER.size)
+            size = os.path.getsize(self.path)
+        except OSError:
+            return False
+        expected = (MAGIC, VERSION, self.frame_count) + tuple(self.display_size)
+        return (len(header) == _HEADER.size and _HEADER.unpack(header) == expected
+                and size == atlas_bytes(self.frame_count, self.display_size))
+
+    @property
+    def complete(self):
+        return self.stored >= self.frame_count
+
+    def has(self, index):
+        return bool(self.valid[index])
+
+    def get(self, index):
+        """Frame view (read straight from the mapping), None if not stored yet"""
+        if self.valid[index]:
+            return self.frames[index]
+        return None
+
+    def put(self, index, frame):
+        if not self.valid[index]:
+            self.frames[index] = frame
+            self.valid[index] = 1
+            self.stored += 1
+
+    def refresh(self):
+        """Recount stored frames - other processes may have filled some in"""
+        self.stored = int(np.count_nonzero(self.valid))
+
+    def first_missing(self, start=0):
+        """Lowest index >= start without a stored frame (wrapping), None when complete"""
+        if self.complete:
+            return None
+        missing = np.flatnonzero(self.valid[start:] == 0)
+        if len(missing):
+            return start + int(missing[0])
+        missing = np.flatnonzero(self.valid[:start] == 0)
+        return int(missing[0]) if len(missing) else None
+
+    def close(self):
+        """Flush stored frames to disk - the mapping itself goes when the atlas is dropped"""
+        for array in (self.frames, self.valid):
+            try:
+                array.flush()
+            except (OSError, ValueError):
+                pass
+
+
+class FrameAtlasCache:
+    """Directory of atlases with a total size cap and least-recently-used eviction
+
+    Use is tracked through file modification times, so it survives restarts.
+    """
+
+    def __init__(self, directory=DEFAULT_ATLAS_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.open_paths = set()
+
+    def open(self, video_path, frame_count, display_size):
+        """Atlas for video_path at display_size, None if it would exceed its share of the cap"""
+        if frame_count <= 0 or atlas_bytes(frame_count, display_size) > self.max_bytes * MAX_ATLAS_SHARE:
+            return None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            key = content_key(video_path, display_size)
+            path = os.path.join(self.directory, f"{key}.atlas")
+            self.evict(reserve=0 if os.path.exists(path) else atlas_bytes(frame_count, display_size),
+                       keep=path)
+            atlas = FrameAtlas(path, frame_count, display_size)
+            os.utime(path)  # mark as most recently used
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Frame atlas unavailable for {os.path.basename(video_path)}: {e}")
+            return None
+        self.open_paths.add(path)
+        return atlas
+
+    def release(self, atlas):
+        if atlas is None:
+            return
+        self.open_paths.discard(atlas.path)
+        atlas.close()
+
+    def evict(self, reserve=0, keep=None):
+        """Delete least recently used atlases until `reserve` more bytes fit under the cap"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.atlas'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries) + reserve
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep or path in self.open_paths:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass  # still mapped by another process (Windows) - try again next time
@@ -0,0 +1,252 @@
+"""
+Motion Stream Broadcast
+Publishes the emitted command stream on a localhost UDP endpoint so players
+and visualizers can render ahead from scheduled timestamps
+
+Protocol:
+    client -> server   b'SUB'    subscribe / keep-alive (resend every few seconds)
+                       b'UNSUB'  unsubscribe
+    server -> client   b'HM' + uint8 count + count x command record
+
+Command record (little endian, 15 bytes):
+    I  sequence
+    d  timestamp - time.time() the move starts
+    B  target position (0-100)
+    H  move duration in ms
+
+Pattern commands are published when the sequencer queues them, a pattern or
+more ahead of playback, so timestamps run into the future. Durations are the
+ones the device is sent - predicted from the speed at queue time. A command
+stamped exactly like one already queued updates that command's duration (the
+speed changed before it was sent). A command stamped earlier than the last one
+received otherwise (skip, category switch, manual override, stream rebuild)
+replaces everything the client queued from that time on.
+
+Every subscriber has its own bounded queue; a client that doesn't keep up
+loses its oldest commands, it never slows down the streaming loop.
+"""
+
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import List, NamedTuple
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 47010
+QUEUE_LIMIT = 2048           # commands buffered per subscriber (whole queued patterns arrive at once)
+SUBSCRIBER_TIMEOUT = 10.0    # seconds without a keep-alive before a subscriber is dropped
+MAX_BATCH = 64               # commands per datagram (64 x 15 bytes stays under typical MTU)
+
+_HEADER = struct.Struct('<2sB')
+_COMMAND = struct.Struct('<IdBH')
+MAGIC = b'HM'
+
+
+class MotionCommand(NamedTuple):
+    sequence: int
+    timestamp: float
+    position: int
+    duration_ms: int
+
+
+class _Subscriber:
+    __slots__ = ('address', 'queue', 'last_seen', 'dropped')
+
+    def __init__(self, address, now):
+        self.address = address
+        self.queue = deque(maxlen=QUEUE_LIMIT)
+        self.last_seen = now
+        self.dropped = 0
+
+
+class MotionBroadcaster:
+    """Non-blocking fan-out of emitted commands to UDP subscribers
+
+    publish() is O(1) for the streaming loop - it only appends to an inbound
+    queue. A sender thread fans commands out to the per-subscriber queues and
+    sends them in batches.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.sequence = 0
+        self.subscribers = {}
+        self.running = False
+        self._inbound = deque(maxlen=QUEUE_LIMIT * 4)
+        self._wakeup = threading.Event()
+        self._socket = None
+        self._thread = None
+
+    def open(self) -> bool:
+        """Bind the endpoint without starting the sender thread"""
+        if self._socket:
+            return True
+        try:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._socket.bind((self.host, self.port))
+            self._socket.setblocking(False)
+        except OSError as e:
+            print(f"⚠️ Motion broadcast unavailable on {self.host}:{self.port}: {e}")
+            self._socket = None
+            return False
+        self.port = self._socket.getsockname()[1]
+        return True
+
+    def start(self) -> bool:
+        if self.running:
+            return True
+        if not self.open():
+            return False
+        self.running = True
+        self._thread = threading.Thread(target=self._sender_loop, daemon=True)
+        self._thread.start()
+        print(f"📡 Motion broadcast on udp://{self.host}:{self.port}")
+        return True
+
+    def stop(self):
+        self.running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+
+    def publish(self, position, duration_ms, timestamp=None):
+        """Queue one command starting at `timestamp` (time.time(), default now) -
+        called from the streaming thread"""
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        self._inbound.append(_COMMAND.pack(self.sequence, timestamp or time.time(),
+                                           max(0, min(100, int(position))),
+                                           max(0, min(0xFFFF, int(duration_ms)))))
+        self._wakeup.set()
+
+    def _sender_loop(self):
+        while self.running:
+            self._wakeup.wait(0.5)
+            self._wakeup.clear()
+            try:
+                self._poll_requests()
+                self.flush()
+            except OSError as e:
+                print(f"Motion broadcast error: {e}")
+
+    def _poll_requests(self):
+        """Handle pending SUB/UNSUB datagrams and expire silent subscribers"""
+        now = time.time()
+        while True:
+            try:
+                data, address = self._socket.recvfrom(64)
+            except (BlockingIOError, InterruptedError):
+                break
+            except ConnectionResetError:  # Windows reports ICMP unreachable here
+                continue
+            if data.startswith(b'UNSUB'):
+                self.subscribers.pop(address, None)
+            elif data.startswith(b'SUB'):
+                subscriber = self.subscribers.get(address)
+                if subscriber:
+                    subscriber.last_seen = now
+                else:
+                    self.add_subscriber(address, now)
+        for address, subscriber in list(self.subscribers.items()):
+            if now - subscriber.last_seen > SUBSCRIBER_TIMEOUT:
+                del self.subscribers[address]
+
+    def add_subscriber(self, address, now=None):
+        self.subscribers[address] = _Subscriber(address, now or time.time())
+
+    def flush(self):
+        """Fan inbound commands out to every subscriber queue, then send what fits"""
+        subscribers = list(self.subscribers.values())
+        while self._inbound:
+            packed = self._inbound.popleft()
+            for subscriber in subscribers:
+                if len(subscriber.queue) == QUEUE_LIMIT:
+                    subscriber.dropped += 1
+                subscriber.queue.append(packed)
+
+        for subscriber in subscribers:
+            queue = subscriber.queue
+            while queue:
+                count = min(MAX_BATCH, len(queue))
+                batch = [queue.popleft() for _ in range(count)]
+                try:
+                    self._socket.sendto(_HEADER.pack(MAGIC, count) + b''.join(batch), subscriber.address)
+                except (BlockingIOError, InterruptedError):
+                    queue.extendleft(reversed(batch))  # socket buffer full - retry next round
+                    break
+                except OSError:
+                    self.subscribers.pop(subscriber.address, None)
+                    break
+
+
+def decode_datagram(data: bytes) -> List[MotionCommand]:
+    """Commands in one broadcast datagram, [] if it isn't one"""
+    if len(data) < _HEADER.size:
+        return []
+    magic, count = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        return []
+    count = min(count, (len(data) - _HEADER.size) // _COMMAND.size)
+    return [MotionCommand(*_COMMAND.unpack_from(data, _HEADER.size + i * _COMMAND.size))
+            for i in range(count)]
+
+
+class MotionStreamClient:
+    """Subscriber side - receive() returns newly arrived commands, keep-alives are automatic"""
+
+    KEEPALIVE_INTERVAL = 3.0
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.server = (host, port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, 0))
+        self._last_keepalive = 0.0
+        self.last_sequence = None
+        self.missed = 0
+
+    def subscribe(self):
+        self.socket.sendto(b'SUB', self.server)
+        self._last_keepalive = time.time()
+
+    def receive(self, timeout=1.0) -> List[MotionCommand]:
+        if time.time() - self._last_keepalive > self.KEEPALIVE_INTERVAL:
+            self.subscribe()
+        self.socket.settimeout(timeout)
+        try:
+            data, _ = self.socket.recvfrom(65536)
+        except (socket.timeout, ConnectionResetError):
+            return []
+        commands = decode_datagram(data)
+        for command in commands:
+            if self.last_sequence is not None:
+                gap = (command.sequence - self.last_sequence) & 0xFFFFFFFF
+                if 1 < gap < 0x80000000:
+                    self.missed += gap - 1
+            self.last_sequence = command.sequence
+        return commands
+
+    def close(self):
+        try:
+            self.socket.sendto(b'UNSUB', self.server)
+        except OSError:
+            pass
+        self.socket.close()
+
+
+if __name__ == "__main__":
+    # Minimal subscriber: python motion_broadcast.py
+    client = MotionStreamClient()
+    client.subscribe()
+    try:
+        while True:
+            for command in client.receive():
+                lead = (command.timestamp - time.time()) * 1000
+                print(f"#{command.sequence} pos {command.position:3d} in {command.duration_ms:4d} ms "
+                      f"(starts {lead:+.1f} ms)")
+    except KeyboardInterrupt:
+        client.close()
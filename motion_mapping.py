@@ -0,0 +1,112 @@
+"""
+Motion-aligned Frame Mapping
+Offline analysis of a clip's on-screen motion: dense optical flow on downscaled
+frames gives a per-frame displacement along the dominant motion axis, the
+largest single stroke in it becomes a position -> frame lookup table, and the
+table is cached per video so runtime lookup is one array index
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+from frame_atlas import content_key
+
+DEFAULT_MOTION_DIR = os.path.join("gallery", "cache", "motion")
+ANALYSIS_WIDTH = 96          # frames are downscaled to this width before optical flow
+LUT_STEPS = 1000             # table entries across position 0-100 (0.1 resolution)
+DRIFT_SECONDS = 2.0          # integrated flow minus its moving average over this window
+MIN_STROKE_PIXELS = 3.0      # smallest stroke (at analysis width) worth mapping
+
+
+def motion_signal(path, should_stop=None):
+    """Per-frame displacement along the clip's dominant motion axis (analysis pixels)
+    -> (signal, fps), or (None, fps) if the clip can't be read"""
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30
+    flows = [(0.0, 0.0)]
+    previous = None
+    try:
+        while not (should_stop and should_stop()):
+            ok, frame = capture.read()
+            if not ok:
+                break
+            height = max(1, int(frame.shape[0] * ANALYSIS_WIDTH / frame.shape[1]))
+            gray = cv2.cvtColor(cv2.resize(frame, (ANALYSIS_WIDTH, height), interpolation=cv2.INTER_AREA),
+                                cv2.COLOR_BGR2GRAY)
+            if previous is not None:
+                flow = cv2.calcOpticalFlowFarneback(previous, gray, None, 0.5, 2, 9, 3, 5, 1.1, 0)
+                # Average over the moving quarter of the image - the static background would dilute it
+                magnitude = np.hypot(flow[..., 0], flow[..., 1])
+                moving = magnitude >= np.percentile(magnitude, 75)
+                flows.append((float(flow[..., 0][moving].mean()), float(flow[..., 1][moving].mean())))
+            previous = gray
+    finally:
+        capture.release()
+    if len(flows) < 3 or (should_stop and should_stop()):
+        return None, fps
+
+    # Integrate to a 2D trajectory, remove slow drift, project on the principal axis
+    trajectory = np.cumsum(np.asarray(flows), axis=0)
+    window = max(3, int(fps * DRIFT_SECONDS) | 1)
+    kernel = np.ones(window) / window
+    padded = np.pad(trajectory, ((window // 2, window // 2), (0, 0)), mode='edge')
+    drift = np.stack([np.convolve(padded[:, axis], kernel, mode='valid') for axis in (0, 1)], axis=1)
+    centered = trajectory - drift
+    axis = np.linalg.svd(centered - centered.mean(axis=0), full_matrices=False)[2][0]
+    if axis[1] > 0:
+        axis = -axis  # positive = up on screen, so position 100 is the top of the stroke
+    signal = centered @ axis
+    return np.convolve(np.pad(signal, 1, mode='edge'), np.ones(3) / 3, mode='valid'), fps
+
+
+def stroke_lut(signal):
+    """Position -> frame table (LUT_STEPS + 1 entries) built from the largest single
+    stroke in the signal, None if there is no clear stroke"""
+    moves = np.diff(signal)
+    reversals = np.flatnonzero(np.sign(moves[1:]) != np.sign(moves[:-1])) + 1
+    bounds = np.concatenate(([0], reversals, [len(signal) - 1]))
+    amplitudes = np.abs(signal[bounds[1:]] - signal[bounds[:-1]])
+    if len(amplitudes) == 0 or amplitudes.max() < MIN_STROKE_PIXELS:
+        return None
+    best = int(np.argmax(amplitudes))
+    first, last = int(bounds[best]), int(bounds[best + 1])
+
+    frames = np.arange(first, last + 1)
+    values = signal[first:last + 1]
+    if values[-1] < values[0]:
+        frames, values = frames[::-1], values[::-1]
+    values = np.maximum.accumulate(values)  # np.interp needs a non-decreasing axis
+    positions = (values - values[0]) * 100.0 / (values[-1] - values[0])
+    return np.round(np.interp(np.linspace(0, 100, LUT_STEPS + 1), positions, frames)).astype(np.int32)
+
+
+class MotionMapCache:
+    """Lookup tables on disk, keyed by video content - an empty table means 'no stroke
+    found' so the clip isn't analyzed again"""
+
+    def __init__(self, directory=DEFAULT_MOTION_DIR):
+        self.directory = directory
+
+    def _path(self, video_path):
+        # The analysis parameters stand in for the size part of the content key
+        return os.path.join(self.directory, content_key(video_path, (ANALYSIS_WIDTH, LUT_STEPS)) + ".npy")
+
+    def load(self, video_path):
+        """Cached table (possibly empty), None if the video hasn't been analyzed"""
+        try:
+            return np.load(self._path(video_path))
+        except (OSError, ValueError):
+            return None
+
+    def analyze(self, video_path, decode_path=None, should_stop=None):
+        """Analyze and cache -> table, empty if the clip has no clear stroke, None if stopped"""
+        signal, _ = motion_signal(decode_path or video_path, should_stop)
+        if signal is None:
+            return None
+        lut = stroke_lut(signal)
+        lut = np.zeros(0, dtype=np.int32) if lut is None else lut
+        os.makedirs(self.directory, exist_ok=True)
+        np.save(self._path(video_path), lut)
+        return lut
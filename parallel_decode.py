@@ -0,0 +1,154 @@
+"""
+Parallel Segmented Decoding
+Worker processes decode independent frame ranges of a video straight into its
+frame atlas - a shared file mapping every process writes into - so filling it
+scales with the available cores. Gallery thumbnails render on the same pool.
+"""
+
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+from PIL import Image
+
+from frame_atlas import FrameAtlas
+
+SEGMENT_FRAMES = 90                              # frames per work item (one seek each)
+WORKERS = max(0, (os.cpu_count() or 1) - 1)      # leave a core for the UI and playback decoder
+
+_pool = None
+
+
+def _init_worker():
+    """Worker start-up: only the decode stack, one decoder thread per process"""
+    import numpy  # noqa: F401 - loaded once per worker, not per segment
+    cv2.setNumThreads(1)
+
+
+def get_pool():
+    """Shared process pool, None on single-core machines
+
+    Workers are spawned on every platform (no forking a threaded GUI process).
+    Spawning re-imports the main script as __mp_main__, which is why the GUI
+    libraries of ai31.py are only imported under its __main__ guard.
+    """
+    global _pool
+    if _pool is None and WORKERS:
+        _pool = ProcessPoolExecutor(max_workers=WORKERS,
+                                    mp_context=multiprocessing.get_context('spawn'),
+                                    initializer=_init_worker)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def decode_segment(video_path, atlas_path, frame_count, display_size, first, last):
+    """Worker: decode frames first..last into the atlas, skipping ones already stored"""
+    from video_frames import convert_frame  # video_frames imports this module
+
+    atlas = FrameAtlas(atlas_path, frame_count, display_size)
+    capture = cv2.VideoCapture(video_path)
+    decoded = 0
+    try:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, first)
+        for index in range(first, last + 1):
+            if atlas.has(index):
+                ok = capture.grab()
+            else:
+                ok, frame = capture.read()
+                if ok:
+                    atlas.put(index, convert_frame(frame, display_size))
+                    decoded += 1
+            if not ok:
+                break
+    finally:
+        capture.release()
+    return decoded
+
+
+class ParallelAtlasFill:
+    """Fills a frame atlas from segments decoded on the process pool"""
+
+    def __init__(self, video_path, atlas, segment_frames=SEGMENT_FRAMES):
+        self.video_path = video_path
+        self.atlas = atlas
+        self.segment_frames = segment_frames
+        self.futures = []
+
+    def start(self):
+        """Submit every segment that still has missing frames -> False without a pool"""
+        pool = get_pool()
+        if pool is None or self.atlas.complete:
+            return False
+        atlas = self.atlas
+        for first in range(0, atlas.frame_count, self.segment_frames):
+            last = min(atlas.frame_count, first + self.segment_frames) - 1
+            if atlas.valid[first:last + 1].all():
+                continue
+            future = pool.submit(decode_segment, self.video_path, atlas.path,
+                                 atlas.frame_count, atlas.display_size, first, last)
+            future.add_done_callback(self._segment_done)
+            self.futures.append(future)
+        return bool(self.futures)
+
+    def _segment_done(self, future):
+        """Count a finished segment's frames in right away - runs on the pool's result thread"""
+        if not future.cancelled():
+            self.atlas.refresh()
+
+    @property
+    def active(self):
+        if self.futures and all(future.done() for future in self.futures):
+            self.futures = []
+            self.atlas.refresh()
+        return bool(self.futures)
+
+    def cancel(self):
+        """Drop queued segments - running ones finish their (short) range"""
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
+
+
+def render_thumbnail(video_path, output_path, size):
+    """Save the middle frame of a video as a PNG thumbnail -> True on success"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return False
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) // 2)
+        ret, frame = cap.read()
+    finally:
+        cap.release()
+    if not ret:
+        return False
+    pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    pil_image.resize(size, Image.Resampling.LANCZOS).save(output_path, "PNG")
+    return True
+
+
+def render_thumbnails(jobs):
+    """[(video_path, output_path, size), ...] -> [success, ...], one process per video"""
+    pool = get_pool()
+    if pool is None or len(jobs) < 2:
+        futures = None
+    else:
+        futures = [pool.submit(render_thumbnail, *job) for job in jobs]
+    results = []
+    for i, job in enumerate(jobs):
+        try:
+            results.append(futures[i].result() if futures else render_thumbnail(*job))
+        except Exception as e:
+            print(f"❌ Thumbnail generation error: {e}")
+            results.append(False)
+    return results
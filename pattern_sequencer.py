@@ -0,0 +1,605 @@
+"""
+Pattern Sequencer
+Seamless motion stream with build-up, chaos and climax modes
+"""
+
+import json
+import os
+import random
+from collections import deque
+
+from clock import MonotonicClock
+from folder_cycling import FolderCycleScheduler
+from speed_envelope import ChaosEnvelope, compile_buildup_envelope
+from stroke_detection import StrokeSchedule, analyze_strokes, integrate_strokes
+
+
+class PatternSequencer:
+    """AI-driven pattern sequencer - FIXED TRANSITION PAUSES"""
+    
+    def __init__(self, clock=None, rng=None):
+        # Time and randomness sources - injectable so the sequencer can be
+        # driven headless (see session_renderer.py)
+        self.clock = clock or MonotonicClock()
+        self.rng = rng or random
+
+        self.pattern_database = {}
+        
+        # FIXED motion stream - NO GAPS
+        self.motion_stream = deque()
+        self.stream_target_duration = 8000  # 8 seconds buffer
+        self.last_command_time = 0
+        
+        # Strokes are found per integrated pattern, fired by stream timestamp
+        self.stroke_schedule = StrokeSchedule()
+        self.stroke_callbacks = []  # callback(count, timestamp_ms)
+        self.stream_callbacks = []  # callback(commands) - as they are scheduled
+        self.last_command = None    # stream command behind the last get_next_motion_command
+        self._stream_last_pos = None
+        self._stream_direction = 0
+        
+        # Manual override state
+        self.manual_override_active = False
+        self.manual_return_position = 0.5
+        
+        # Speed control
+        self.base_speed = 0.75
+        self.joystick_speed_multiplier = 1.0
+        
+        # Build-up mode
+        self.buildup_mode = False
+        self.buildup_duration = 300
+        self.buildup_start_time = None
+        self.buildup_start_speed = 0.3
+        self.buildup_end_speed = 2.0
+        self.buildup_cycles = 1
+        self.current_buildup_cycle = 0
+        self.buildup_envelope = None
+
+        self.cycle_folders = False
+        self.trigger_type = "time" 
+        self.interval_value = "2:00"
+        self.folder_change_counter = 0
+        self.last_folder_change = self.clock.now()
+        
+        # Folder cycling - preloaded categories and the trigger scheduler
+        self.category_store = {}
+        self.current_category = None
+        self.folder_scheduler = None
+        self.folder_cycle_callback = None
+
+        # Pattern tracking
+        self.current_pattern = None
+        self.pattern_history = deque(maxlen=5)
+        
+        # Load patterns
+        self.load_patterns("BLOWJOB")
+
+        # ADD THESE CHAOS MODE VARIABLES
+        self.chaos_mode = False
+        self.chaos_speed_target = 1.0
+        self.chaos_current_speed = 1.0
+        self.chaos_envelope = None
+        self.chaos_speed_change_interval = 3.0  # Change speed every 2-6 seconds
+        self.chaos_folder_change_interval = 15.0  # Change folder every 12-25 seconds
+        self.chaos_pattern_skip_interval = 5.0   # Skip patterns every 4-8 seconds
+    
+        # Available chaos categories (exclude current)
+        self.chaos_categories = []
+        self.chaos_current_category = "BLOWJOB"
+    
+    def load_patterns(self, category_folder="BLOWJOB"):
+        """Load patterns from specified category folder"""
+        print(f"Loading patterns from funscripts/{category_folder}/...")
+        self.pattern_database = self._read_category(category_folder)
+        self.category_store[category_folder] = self.pattern_database
+        self.current_category = category_folder
+
+    def _read_category(self, category_folder):
+        """Read every usable funscript in funscripts/<category_folder>"""
+        database = {}
+    
+        category_path = os.path.join("funscripts", category_folder)
+        if os.path.exists(category_path):
+            for file in os.listdir(category_path):
+                if file.endswith('.funscript'):
+                    try:
+                        file_path = os.path.join(category_path, file)
+                        with open(file_path, 'r') as f:
+                            data = json.load(f)
+                            actions = data['actions']
+                    
+                        if len(actions) >= 3:
+                            pattern_id = f"{category_folder}_{file}"
+                            pattern_info = {
+                                'file': file,
+                                'category': category_folder,
+                                'pattern_id': pattern_id,
+                                'funscript_actions': actions,
+                                'start_pos': actions[0]['pos'],
+                                'end_pos': actions[-1]['pos'],
+                                'total_duration': actions[-1]['at'] - actions[0]['at'],
+                                'stroke_profile': analyze_strokes([a['pos'] for a in actions])
+                            }
+                        
+                            database[pattern_id] = pattern_info
+                
+                    except Exception as e:
+                        print(f"⚠️ Error loading {file}: {e}")
+        return database
+
+    def preload_categories(self):
+        """Read every category into the in-memory store so switches need no disk I/O"""
+        for category in self.get_available_categories():
+            if category not in self.category_store:
+                self.category_store[category] = self._read_category(category)
+        return [cat for cat in sorted(self.category_store) if self.category_store[cat]]
+
+    def switch_category(self, category_folder):
+        """Swap the active pattern set from the store - the queued stream keeps playing"""
+        if category_folder not in self.category_store:
+            self.category_store[category_folder] = self._read_category(category_folder)
+        self.pattern_database = self.category_store[category_folder]
+        self.current_category = category_folder
+        # Recent-pattern filter only makes sense within one category
+        self.pattern_history.clear()
+
+    def set_chaos_mode(self, enabled):
+        """Enable/disable chaos mode"""
+        self.chaos_mode = enabled
+        if enabled:
+            print("🌪️ CHAOS MODE ACTIVATED - Bot takes control!")
+            self.chaos_current_speed = self.base_speed
+            self.chaos_speed_target = self.base_speed
+            # Compile speed glide, folder switches and skips ahead of time
+            self.chaos_envelope = ChaosEnvelope(
+                self.clock.now(), self.base_speed, self.rng,
+                speed_interval=self.chaos_speed_change_interval,
+                folder_interval=self.chaos_folder_change_interval,
+                skip_interval=self.chaos_pattern_skip_interval
+            )
+            # Load available categories for chaos
+            self.update_chaos_categories()
+        else:
+            self.chaos_envelope = None
+            print("🛑 Chaos mode deactivated")
+
+    def update_chaos_categories(self):
+        """Update available categories for chaos mode"""
+        all_categories = self.get_available_categories()
+        # Exclude current category for more variety
+        self.chaos_categories = [cat for cat in all_categories if cat != self.chaos_current_category]
+        print(f"🌪️ Chaos categories: {self.chaos_categories}")
+
+    def update_chaos_control(self, base_speed):
+        """Update chaos mode control - BALANCED CHAOS VERSION
+
+        Speed comes from the precompiled chaos envelope, so it only depends on
+        elapsed time; due folder switches and pattern skips fire from its event queue
+        (at most one of each per call, however long the gap since the last one).
+        """
+        if not self.chaos_mode or not self.chaos_envelope:
+            return base_speed
+        
+        current_time = self.clock.now()
+        envelope = self.chaos_envelope
+        envelope.ensure(current_time)
+    
+        for _, event, payload in envelope.pop_due_events(current_time):
+            if event == "chaos_speed":
+                # FREQUENT BUT NOT MANIC SPEED TRANSITIONS (2-6 seconds)
+                self.chaos_speed_target, self.chaos_speed_change_interval = payload
+                print(f"🌪️ CHAOS SPEED: {self.chaos_current_speed:.2f}x → {self.chaos_speed_target:.2f}x (next in {self.chaos_speed_change_interval:.1f}s)")
+
+            elif event == "chaos_folder" and self.chaos_categories:
+                # REGULAR FOLDER SWITCHING (12-25 seconds)
+                self.chaos_folder_change_interval = payload
+                new_category = self.rng.choice(self.chaos_categories)
+                print(f"🌪️ CHAOS FOLDER: {self.chaos_current_category} → {new_category}")
+        
+                if hasattr(self, 'chaos_folder_callback') and self.chaos_folder_callback:
+                    self.chaos_folder_callback(new_category)
+        
+                self.chaos_current_category = new_category
+                self.update_chaos_categories()
+
+            elif event == "chaos_skip":
+                # OCCASIONAL PATTERN SKIPPING (4-8 seconds)
+                self.chaos_pattern_skip_interval = payload
+                self.skip_to_next_pattern()
+                print(f"🌪️ CHAOS SKIP PATTERN (next in {self.chaos_pattern_skip_interval:.1f}s)")
+    
+        # SMOOTH BUT NOTICEABLE INTERPOLATION to target speed - precomputed
+        self.chaos_current_speed = envelope.speed_at(current_time)
+        return self.chaos_current_speed                        
+    
+
+    def get_available_categories(self):
+        """Get list of available pattern categories"""
+        categories = []
+        funscripts_dir = "funscripts"
+        if os.path.exists(funscripts_dir):
+            for item in os.listdir(funscripts_dir):
+                item_path = os.path.join(funscripts_dir, item)
+                if os.path.isdir(item_path):
+                    # Check if folder contains .funscript files
+                    funscript_files = [f for f in os.listdir(item_path) if f.endswith('.funscript')]
+                    if funscript_files:
+                        categories.append(item)
+        return sorted(categories) if categories else ["bj"]  # fallback to bj
+    
+    def initialize_seamless_stream(self, speed=1.0):
+        """Initialize the seamless motion stream - FIXED"""
+        print("🌊 Initializing SEAMLESS stream...")
+        
+        self._clear_stream()
+        self.last_command_time = self.clock.now() * 1000
+        self.base_speed = speed
+        
+        self.build_seamless_stream(speed)
+        
+        print(f"✅ Stream ready: {len(self.motion_stream)} commands")
+    
+    def build_seamless_stream(self, speed=1.0):
+        """Build continuous motion stream - ZERO GAPS"""
+        pattern_count = 0
+        max_patterns = 8
+        
+        while self._get_stream_duration() < self.stream_target_duration and pattern_count < max_patterns:
+            next_pattern = self.select_next_pattern()
+            if not next_pattern:
+                break
+                
+            self._integrate_pattern_seamlessly(next_pattern, speed)
+            pattern_count += 1
+    
+    def _clear_stream(self):
+        """Drop queued commands and the strokes scheduled with them"""
+        self.motion_stream.clear()
+        self.stroke_schedule.clear()
+        self._stream_last_pos = None
+        self._stream_direction = 0
+    
+    def _get_stream_duration(self):
+        """Get current stream duration - FIXED"""
+        if not self.motion_stream:
+            return 0
+        
+        current_time = self.clock.now() * 1000
+        future_commands = [cmd for cmd in self.motion_stream if cmd['timestamp'] > current_time]
+        
+        if not future_commands:
+            return 0
+            
+        return future_commands[-1]['timestamp'] - current_time
+    
+    def _integrate_pattern_seamlessly(self, pattern, speed):
+        """Integrate pattern into stream - ABSOLUTELY SEAMLESS WITH SPEED"""
+        actions = pattern.get('funscript_actions', [])
+        if not actions:
+            return
+            
+        # Get start time - SEAMLESS CONTINUATION
+        if not self.motion_stream:
+            start_time = self.clock.now() * 1000
+        else:
+            # Start EXACTLY where last command is scheduled - NO GAPS
+            start_time = self.motion_stream[-1]['timestamp']
+        
+        # FIXED: Apply speed properly to duration
+        base_duration = 250  # Base 180ms
+        speed_adjusted_duration = base_duration / max(0.3, min(3.0, speed))
+        actual_duration = max(80, min(400, int(speed_adjusted_duration)))
+        
+        current_time = start_time
+        scheduled = []
+        
+        # Add ALL actions with perfect timing AND speed consideration
+        for action in actions:
+            stream_action = {
+                'timestamp': current_time,
+                'pos': action['pos'],
+                'duration': actual_duration,
+                'pattern_id': pattern['pattern_id'],
+                'speed_used': speed
+            }
+            self.motion_stream.append(stream_action)
+            scheduled.append(stream_action)
+            current_time += actual_duration  # PERFECT SPACING WITH SPEED
+        self._announce_scheduled(scheduled)
+        
+        # Exact stroke timestamps from the pattern's precomputed reversals
+        profile = pattern.get('stroke_profile')
+        if profile is None:
+            profile = pattern['stroke_profile'] = analyze_strokes([a['pos'] for a in actions])
+        indices, self._stream_direction = integrate_strokes(profile, self._stream_last_pos,
+                                                            self._stream_direction)
+        self._stream_last_pos = profile.last_pos
+        if indices:
+            self.stroke_schedule.add([start_time + i * actual_duration for i in indices])
+        
+        self.pattern_history.append(pattern)
+        self.current_pattern = pattern
+    
+    def select_next_pattern(self):
+        """Select next pattern - random selection"""
+        if not self.pattern_database:
+            return None
+        
+        available_patterns = list(self.pattern_database.values())
+        recent_ids = {p['pattern_id'] for p in self.pattern_history if p}
+        
+        candidates = [p for p in available_patterns if p['pattern_id'] not in recent_ids]
+        
+        if len(candidates) < 3:
+            candidates = available_patterns
+        
+        return self.rng.choice(candidates) if candidates else None
+    
+    def get_next_motion_command(self, speed=1.0):
+        """Get next motion command - ZERO PAUSE TRANSITIONS WITH SPEED"""
+        self.last_command = None
+        # Manual override mode
+        if self.manual_override_active:
+            position = int(self.manual_return_position * 100)
+            return position, 50, "manual_override"
+        
+        # Get CURRENT speed including build-up
+        current_speed = self.get_current_speed(speed)
+        
+        # Initialize stream if needed
+        if not self.motion_stream:
+            self.initialize_seamless_stream(current_speed)
+            
+        # AGGRESSIVE refill to prevent ANY gaps - with current speed
+        if self._get_stream_duration() < self.stream_target_duration * 0.7:
+            self.build_seamless_stream(current_speed)
+        
+        # Get next command
+        if not self.motion_stream:
+            return 50, 150, "fallback"
+        
+        # Remove old commands
+        current_time = self.clock.now() * 1000
+        while self.motion_stream and self.motion_stream[0]['timestamp'] <= current_time:
+            self.motion_stream.popleft()
+        
+        if not self.motion_stream:
+            # Emergency fallback - immediate rebuild with current speed
+            self.initialize_seamless_stream(current_speed)
+            if not self.motion_stream:
+                return 50, 150, "emergency"
+        
+        command = self.motion_stream.popleft()
+        self.last_command = command
+        if command['timestamp'] >= self.stroke_schedule.next_time:
+            self._fire_strokes(command['timestamp'])
+        if self.folder_scheduler:
+            self.folder_scheduler.on_command(command)
+        
+        # APPLY CURRENT SPEED TO DURATION
+        base_duration = command.get('duration', 250)
+        speed_ratio = current_speed / command.get('speed_used', 1.0)
+        adjusted_duration = max(80, min(400, int(base_duration / speed_ratio)))
+        
+        position = command['pos']
+        action_type = f"stream_{command.get('pattern_id', 'unknown')}"
+        
+        return position, adjusted_duration, action_type
+    
+    @staticmethod
+    def device_duration(duration, speed):
+        """Move duration the device is sent for a command at `speed`"""
+        return max(50, min(500, int(duration / speed)))
+
+    def _announce_scheduled(self, commands):
+        """Hand newly queued commands (clock-ms timestamps) to stream listeners"""
+        for callback in self.stream_callbacks:
+            try:
+                callback(commands)
+            except Exception as e:
+                print(f"⚠️ Stream callback error: {e}")
+
+    def _fire_strokes(self, timestamp):
+        """Strokes whose scheduled time has been reached by the emitted command"""
+        count = len(self.stroke_schedule.pop_due(timestamp))
+        if not count:
+            return
+        if self.folder_scheduler:
+            self.folder_scheduler.on_strokes(count)
+        for callback in self.stroke_callbacks:
+            try:
+                callback(count, timestamp)
+            except Exception as e:
+                print(f"⚠️ Stroke callback error: {e}")
+    
+    def set_joystick_speed_multiplier(self, multiplier):
+        """Set joystick speed multiplier"""
+        self.joystick_speed_multiplier = multiplier
+    
+    def start_manual_override(self, position):
+        """Start manual override"""
+        if not self.manual_override_active:
+            self.manual_override_active = True
+            self.manual_return_position = position
+            print(f"🎮 Manual override started at {position*100:.1f}%")
+    
+    def update_manual_position(self, position):
+        """Update manual position"""
+        if self.manual_override_active:
+            self.manual_return_position = position
+    
+    def end_manual_override(self):
+        """End manual override"""
+        if self.manual_override_active:
+            self.manual_override_active = False
+            print("🎮 Manual override ended")
+            # Listeners dropped the queue when manual commands arrived - hand back what's left
+            now_ms = self.clock.now() * 1000
+            remaining = [cmd for cmd in self.motion_stream if cmd['timestamp'] > now_ms]
+            if remaining:
+                self._announce_scheduled(remaining)
+    
+    def skip_to_next_pattern(self):
+        """Skip to next pattern"""
+        if not self.manual_override_active:
+            print("⭐ Skipping to next pattern...")
+            # Clear and rebuild for immediate skip
+            self._clear_stream()
+            self.build_seamless_stream(self.base_speed)
+
+    # Add this method to your PatternSequencer class
+
+    def start_buildup_mode(self, duration_seconds, cycles=1, start_speed=0.1, end_speed=1.5,
+                          cycle_folders=False, trigger_type="time", interval_value="2:00"):
+        """Start build-up mode with FIXED speed limits"""
+        self.buildup_mode = True
+        self.buildup_duration = duration_seconds
+        self.buildup_start_time = self.clock.now()
+        self.buildup_start_speed = start_speed  # Now starts at 0.1x
+        self.buildup_end_speed = end_speed      # Now max 1.5x
+        self.buildup_cycles = max(1, cycles)
+        self.current_buildup_cycle = 0
+        # Whole ramp and its 25/50/75/complete cues compiled once up front
+        self.buildup_envelope = compile_buildup_envelope(
+            self.buildup_start_time, duration_seconds, self.buildup_cycles, start_speed, end_speed
+        )
+    
+        # Store folder cycling settings
+        self.cycle_folders = cycle_folders
+        self.trigger_type = trigger_type
+        self.interval_value = interval_value
+        self.folder_change_counter = 0
+        self.last_folder_change = self.clock.now()
+        self.folder_scheduler = None
+        if cycle_folders:
+            categories = self.preload_categories()
+            self.folder_scheduler = FolderCycleScheduler(
+                categories, self.current_category, trigger_type, interval_value,
+                self.buildup_start_time, duration_seconds, self._on_folder_cycle
+            )
+
+        print(f"🚀 Build-up: {start_speed}x → {end_speed}x, {cycles} cycles, {duration_seconds}s")
+        if cycle_folders:
+            print(f"📁 Folder cycling enabled: {trigger_type} every {interval_value}")            
+    
+    
+    def stop_buildup_mode(self):
+        """Stop build-up mode"""
+        self.buildup_mode = False
+        self.buildup_start_time = None
+        self.buildup_envelope = None
+        self.folder_scheduler = None
+        print("ℹ️ Build-up stopped")
+
+    def _on_folder_cycle(self, old_category, new_category):
+        """Folder cycling trigger fired - swap categories without touching the stream"""
+        self.switch_category(new_category)
+        self.folder_change_counter += 1
+        self.last_folder_change = self.clock.now()
+        print(f"📁 Folder cycle: {old_category} → {new_category}")
+        if self.folder_cycle_callback:
+            self.folder_cycle_callback(new_category)
+    
+    def get_current_speed(self, manual_speed):
+        """Get current speed with build-up and joystick multipliers - FIXED RANGE 0.1-1.5"""
+        base_speed = manual_speed          # keep pattern timing stable
+        effective_speed = base_speed       # what we'll actually return
+
+        if self.buildup_mode and self.buildup_envelope:
+            now = self.clock.now()
+            envelope = self.buildup_envelope
+            elapsed = now - envelope.start_time
+            cycle_dur = max(0.001, float(self.buildup_duration)) / self.buildup_cycles
+            self.current_buildup_cycle = min(self.buildup_cycles - 1, int(elapsed // cycle_dur))
+
+            # O(1) lookup into the precompiled ramp
+            effective_speed = envelope.speed_at(now)
+
+            # Milestone cues fire exactly once each from the scheduled event queue
+            for _, event, _ in envelope.pop_due_events(now):
+                if hasattr(self, "audio_manager"):
+                    self.audio_manager.play(event)
+                if event == "buildup_complete":
+                    effective_speed = self.buildup_end_speed
+                    self.stop_buildup_mode()
+                    self.play_climax_patterns()
+                    break
+
+        # 🌪️ ADD CHAOS MODE CONTROL HERE - BEFORE THE RETURN!
+        if self.chaos_mode:
+            effective_speed = self.update_chaos_control(effective_speed)            
+                             
+
+        # Apply joystick multiplier + clamp to NEW RANGE
+        final_speed = effective_speed * self.joystick_speed_multiplier
+        return round(max(0.1, min(1.5, final_speed)), 2)  # 🔧 NEW LIMITS: 0.1-1.5
+
+        
+
+    def play_climax_patterns(self):
+        """Switch to climax folder and start playing patterns - FIXED"""
+        # FIXED: Look in root directory, not inside funscripts
+        climax_folder = "climax"  # Root level folder
+    
+        if not os.path.isdir(climax_folder):
+            print(f"⚠️ Climax folder not found: {climax_folder}")
+            print("💡 Make sure 'climax' folder exists in the same directory as your script")
+            return
+
+        # Get all .funscript files from climax folder
+        scripts = []
+        for file in os.listdir(climax_folder):
+            if file.endswith(".funscript"):
+                scripts.append(os.path.join(climax_folder, file))
+    
+        if not scripts:
+            print("⚠️ No funscripts found in climax folder!")
+            return
+
+        # Choose a random climax script
+        chosen_script = self.rng.choice(scripts)
+        print(f"🔥 Playing climax script: {os.path.basename(chosen_script)}")
+
+        try:
+            # Load the climax script
+            with open(chosen_script, 'r') as f:
+                data = json.load(f)
+                actions = data.get('actions', [])
+        
+            if not actions:
+                print("⚠️ No actions found in climax script")
+                return
+        
+            # Clear current stream and load climax patterns
+            self._clear_stream()
+        
+            # Create climax pattern entry
+            climax_pattern = {
+                'file': os.path.basename(chosen_script),
+                'category': 'climax',
+                'pattern_id': f"climax_{os.path.basename(chosen_script)}",
+                'funscript_actions': actions,
+                'start_pos': actions[0]['pos'],
+                'end_pos': actions[-1]['pos'],
+                'total_duration': actions[-1]['at'] - actions[0]['at']
+            }    
+        
+            # Integrate the climax pattern with high speed
+            climax_speed = 1.5  # Max speed for climax
+            self._integrate_pattern_seamlessly(climax_pattern, climax_speed)
+        
+            # Add to pattern history
+            self.current_pattern = climax_pattern
+            self.pattern_history.append(climax_pattern)
+        
+            print(f"✅ Climax pattern loaded: {len(actions)} actions at {climax_speed}x speed")
+        
+            # Play audio notification
+            if hasattr(self, "audio_manager"):
+                self.audio_manager.play("buildup_complete")
+        
+        except Exception as e:
+            print(f"❌ Error loading climax script: {e}")
+            import traceback
+            traceback.print_exc()
@@ -0,0 +1,125 @@
+"""
+Position Bus
+In-process publish/subscribe for the live stroke position - typed messages,
+latest-value semantics, no files or polling between producer and consumers
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+DEFAULT_EXPORT_PATH = "manual_position.json"
+
+
+class PositionUpdate(NamedTuple):
+    """One position sample with the engine state that goes with it"""
+    position: float                 # 0-100
+    timestamp: float                # time.time() of publish
+    mode: str = 'pattern'           # 'pattern' or 'manual'
+    manual_active: bool = False
+    running: bool = False
+    buildup_active: bool = False
+    current_speed: float = 1.0
+    joystick_speed_multiplier: float = 1.0
+    fallback: bool = False          # position was filled in, not an emitted command
+
+    def to_status(self) -> dict:
+        """The manual_position.json layout external tools already read"""
+        return {
+            'manual_active': self.manual_active,
+            'position': self.position,
+            'timestamp': self.timestamp,
+            'running': self.running,
+            'mode': self.mode,
+            'buildup_active': self.buildup_active,
+            'current_speed': self.current_speed,
+            'joystick_speed_multiplier': self.joystick_speed_multiplier
+        }
+
+
+class PositionBus:
+    """Latest-value bus: publishers overwrite, subscribers see the newest update
+
+    Callbacks run synchronously on the publishing thread and must stay cheap.
+    Threads that prefer to block can use wait_for_update() instead of polling.
+    """
+
+    def __init__(self):
+        self.latest: Optional[PositionUpdate] = None
+        self.sequence = 0
+        self._subscribers: List[Callable[[PositionUpdate], None]] = []
+        self._condition = threading.Condition()
+
+    def subscribe(self, callback: Callable[[PositionUpdate], None]) -> Callable[[], None]:
+        """Register a callback; returns a function that unsubscribes it"""
+        with self._condition:
+            self._subscribers = self._subscribers + [callback]
+
+        def unsubscribe():
+            with self._condition:
+                self._subscribers = [s for s in self._subscribers if s is not callback]
+        return unsubscribe
+
+    def publish(self, update: PositionUpdate):
+        with self._condition:
+            self.latest = update
+            self.sequence += 1
+            subscribers = self._subscribers
+            self._condition.notify_all()
+        for callback in subscribers:
+            try:
+                callback(update)
+            except Exception as e:
+                print(f"Position subscriber error: {e}")
+
+    def wait_for_update(self, last_sequence: int, timeout: Optional[float] = None):
+        """Block until a newer update than last_sequence exists -> (sequence, update)"""
+        with self._condition:
+            if self.sequence == last_sequence:
+                self._condition.wait(timeout)
+            return self.sequence, self.latest
+
+
+class PositionFileExporter:
+    """Optional low-rate export of the latest update to a JSON file
+
+    Writes a temp file and os.replace()s it, so readers never see the file missing.
+    Only writes when something new was published.
+    """
+
+    def __init__(self, bus: PositionBus, path: str = DEFAULT_EXPORT_PATH, interval: float = 0.5):
+        self.bus = bus
+        self.path = path
+        self.interval = interval
+        self.running = False
+        self._thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._export_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _export_loop(self):
+        last_sequence = 0
+        while self.running:
+            sequence, update = self.bus.wait_for_update(last_sequence, timeout=1.0)
+            if sequence != last_sequence and update is not None:
+                last_sequence = sequence
+                self.export(update)
+            time.sleep(self.interval)
+
+    def export(self, update: PositionUpdate):
+        temp_file = self.path + ".tmp"
+        try:
+            with open(temp_file, 'w') as f:
+                json.dump(update.to_status(), f)
+            os.replace(temp_file, self.path)
+        except OSError as e:
+            print(f"Position export error: {e}")
@@ -0,0 +1,164 @@
+"""
+Shared-Memory Position Channel
+Live position/speed/mode record in a memory-mapped file, guarded by a seqlock,
+so other local processes (overlays, secondary visualizers) can read it
+without locks, file parsing or syscalls
+
+Record layout (little endian, 64 bytes):
+    0   4s  magic b'HPOS'
+    4   H   layout version
+    8   Q   sequence - odd while a write is in progress
+    16  d   position (0-100)
+    24  d   speed multiplier
+    32  d   timestamp (time.time() of the write)
+    40  B   mode (0 = pattern, 1 = manual)
+    41  B   manual override active
+    42  B   build-up active
+    43  B   running
+
+Reading from another process:
+    reader = PositionShmReader()
+    state = reader.read()   # PositionState or None if the channel isn't there yet
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import NamedTuple, Optional
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "hande_position.shm")
+RECORD_SIZE = 64
+MAGIC = b'HPOS'
+VERSION = 1
+
+MODE_PATTERN = 0
+MODE_MANUAL = 1
+MODE_NAMES = {MODE_PATTERN: 'pattern', MODE_MANUAL: 'manual'}
+
+_HEADER = struct.Struct('<4sH')
+_SEQUENCE = struct.Struct('<Q')
+_PAYLOAD = struct.Struct('<dddBBBB')
+_SEQUENCE_OFFSET = 8
+_PAYLOAD_OFFSET = 16
+
+
+class PositionState(NamedTuple):
+    sequence: int
+    position: float
+    speed: float
+    timestamp: float
+    mode: str
+    manual_active: bool
+    buildup_active: bool
+    running: bool
+
+
+class PositionShmWriter:
+    """Single writer - write() packs straight into the mapping, nothing is built per call"""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        with open(path, 'a+b') as f:
+            f.truncate(RECORD_SIZE)
+        self._file = open(path, 'r+b')
+        self.buffer = mmap.mmap(self._file.fileno(), RECORD_SIZE)
+        _HEADER.pack_into(self.buffer, 0, MAGIC, VERSION)
+        self.sequence = _SEQUENCE.unpack_from(self.buffer, _SEQUENCE_OFFSET)[0] & ~1
+
+        # Bound methods looked up once for the hot path
+        self._pack_sequence = _SEQUENCE.pack_into
+        self._pack_payload = _PAYLOAD.pack_into
+        self._time = time.time
+
+    def write(self, position, speed, mode=MODE_PATTERN, manual_active=False,
+              buildup_active=False, running=True):
+        buffer = self.buffer
+        sequence = self.sequence + 1
+        self._pack_sequence(buffer, _SEQUENCE_OFFSET, sequence)          # odd: write in progress
+        self._pack_payload(buffer, _PAYLOAD_OFFSET, position, speed, self._time(),
+                           mode, manual_active, buildup_active, running)
+        self.sequence = sequence + 1
+        self._pack_sequence(buffer, _SEQUENCE_OFFSET, self.sequence)     # even: consistent
+
+    def close(self):
+        if self.buffer is not None:
+            self.buffer.close()
+            self._file.close()
+            self.buffer = None
+
+
+class PositionShmReader:
+    """Lock-free reader - retries while the writer is mid-update"""
+
+    MAX_RETRIES = 1000
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self.buffer = None
+        self._file = None
+
+    def _open(self) -> bool:
+        if self.buffer is not None:
+            return True
+        try:
+            if os.path.getsize(self.path) < RECORD_SIZE:
+                return False
+            self._file = open(self.path, 'rb')
+            self.buffer = mmap.mmap(self._file.fileno(), RECORD_SIZE, access=mmap.ACCESS_READ)
+        except OSError:
+            return False
+        magic, version = _HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            return False
+        return True
+
+    def read_sequence(self) -> int:
+        """Cheap change check - compare against the last state's sequence"""
+        if not self._open():
+            return 0
+        return _SEQUENCE.unpack_from(self.buffer, _SEQUENCE_OFFSET)[0]
+
+    def read(self) -> Optional[PositionState]:
+        """Latest consistent record, None if the channel is missing or nothing was written"""
+        if not self._open():
+            return None
+        buffer = self.buffer
+        for _ in range(self.MAX_RETRIES):
+            before = _SEQUENCE.unpack_from(buffer, _SEQUENCE_OFFSET)[0]
+            if before & 1:
+                continue
+            payload = _PAYLOAD.unpack_from(buffer, _PAYLOAD_OFFSET)
+            if _SEQUENCE.unpack_from(buffer, _SEQUENCE_OFFSET)[0] == before:
+                if before == 0:
+                    return None
+                position, speed, timestamp, mode, manual, buildup, running = payload
+                return PositionState(before, position, speed, timestamp, MODE_NAMES.get(mode, 'pattern'),
+                                     bool(manual), bool(buildup), bool(running))
+        return None
+
+    def close(self):
+        if self.buffer is not None:
+            self.buffer.close()
+            self._file.close()
+            self.buffer = None
+            self._file = None
+
+
+if __name__ == "__main__":
+    # Minimal live monitor: python position_shm.py [path]
+    import sys
+    reader = PositionShmReader(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH)
+    last_sequence = None
+    try:
+        while True:
+            state = reader.read()
+            if state and state.sequence != last_sequence:
+                last_sequence = state.sequence
+                print(f"{state.mode:8} pos {state.position:6.1f}  speed {state.speed:.2f}x  "
+                      f"age {(time.time() - state.timestamp) * 1000:.1f} ms")
+            time.sleep(0.05)
+    except KeyboardInterrupt:
+        pass
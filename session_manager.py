@@ -5,23 +5,78 @@ Supports 1-10 peaks with visual timeline integration
 
 import json
 import random
-import time
 import math
 import logging
+import threading
+import numpy as np
 from typing import List, Dict, Optional, Tuple
 
+from arousal_estimator import ArousalEstimator
+from clock import MonotonicClock
+from session_planner import RECENT_WINDOW, SessionPlanner, endpoint_of
+
 logger = logging.getLogger(__name__)
 
+# Arousal band -> {speed_class: weight per pattern}. Secondary classes keep the
+# share they had when pools were built from list slices (a third / a half of
+# the list), but spread across every pattern in the class instead of a prefix.
+AROUSAL_BAND_WEIGHTS = {
+    'low': {'slow': 1.0, 'medium': 1.0 / 3},
+    'medium': {'medium': 1.0, 'slow': 1.0 / 3, 'fast': 1.0 / 3},
+    'high': {'fast': 1.0, 'medium': 0.5},
+}
+
+
+class AliasTable:
+    """Walker/Vose alias table - O(1) weighted sampling after O(n) setup"""
+    
+    def __init__(self, items: List, weights: List[float]):
+        self.items = list(items)
+        count = len(self.items)
+        self.probability = [1.0] * count
+        self.alias = list(range(count))
+        total = float(sum(weights))
+        if count == 0 or total <= 0:
+            return
+        
+        scaled = [w * count / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            lo, hi = small.pop(), large.pop()
+            self.probability[lo] = scaled[lo]
+            self.alias[lo] = hi
+            scaled[hi] -= 1.0 - scaled[lo]
+            (small if scaled[hi] < 1.0 else large).append(hi)
+        for i in small + large:  # Rounding leftovers are certain picks
+            self.probability[i] = 1.0
+    
+    def __len__(self):
+        return len(self.items)
+    
+    def sample(self, rng):
+        index = int(rng.random() * len(self.items))
+        if rng.random() < self.probability[index]:
+            return self.items[index]
+        return self.items[self.alias[index]]
+
+
 class SessionManager:
     """Manages session timing and pattern progression with multi-peak support"""
     
-    def __init__(self, pattern_speeds_file: str = "pattern_speeds.json"):
+    def __init__(self, pattern_speeds_file: str = "pattern_speeds.json", clock=None, rng=None):
+        self.clock = clock or MonotonicClock()
+        self.rng = rng or random
         self.pattern_speeds = {}
         self.session_queue = []
         self.session_length = 0  # seconds
         self.session_start_time = 0
         self.current_arousal = 0.0  # 0-100
-        self.target_arousal_curve = []
+        self.target_arousal_curve = np.zeros(0)
+        self.arousal_times = np.zeros(0)
+        self.arousal_slope = np.zeros(0)
+        self.curve_resolution = 1.0  # seconds between curve samples
+        self.curve_step = 1.0
         self.peaks_count = 3  # NEW: Number of peaks in session
         
         # Load pattern speed data
@@ -31,7 +86,26 @@ class SessionManager:
         self.slow_patterns = []
         self.medium_patterns = []
         self.fast_patterns = []
+        self.arousal_pools = {}
         self._organize_patterns_by_speed()
+        
+        # Whole-session planning - needs the playable patterns (set_pattern_catalog)
+        self.pattern_catalog = []
+        self.session_planner = None
+        self.session_plan = None
+        
+        # Closed loop: live signals -> current_arousal, re-plan when it leaves the band
+        self.arousal_estimator = ArousalEstimator()
+        self.arousal_tolerance = 15.0  # same band calculate_speed_multiplier reacts to
+        self.replan_count = 0
+        self._estimator_started = None
+        self._out_of_band = False
+        self._plan_lock = threading.Lock()  # plan reads/swaps - the search itself runs unlocked
+        self._replan_thread = None
+        
+        # Timeline seeks: re-plan lazily from the engine's position, tell listeners
+        self.seek_listeners = []
+        self._pending_seek = None
     
     def _load_pattern_speeds(self, file_path: str):
         """Load pattern speed analysis data"""
@@ -43,8 +117,20 @@ class SessionManager:
             logger.error(f"Failed to load pattern speeds: {e}")
             self.pattern_speeds = {}
     
+    def set_pattern_catalog(self, patterns: List):
+        """Playable FunscriptPattern objects the session planner chooses from"""
+        self.pattern_catalog = list(patterns)
+    
+    def set_pattern_speeds(self, pattern_speeds: Dict):
+        """Replace pattern speed data and rebuild the sampling pools"""
+        self.pattern_speeds = pattern_speeds
+        self._organize_patterns_by_speed()
+    
     def _organize_patterns_by_speed(self):
         """Organize patterns into speed categories"""
+        self.slow_patterns = []
+        self.medium_patterns = []
+        self.fast_patterns = []
         for pattern_name, data in self.pattern_speeds.items():
             speed_class = data.get('speed_class', 'medium')
             pattern_info = {
@@ -63,8 +149,24 @@ class SessionManager:
         
         logger.info(f"Organized patterns: {len(self.slow_patterns)} slow, "
                    f"{len(self.medium_patterns)} medium, {len(self.fast_patterns)} fast")
+        self._build_arousal_pools()
     
-    def parse_session_time(self, time_str: str) -> int:
+    def _build_arousal_pools(self):
+        """Precompute one weighted alias table per arousal band"""
+        by_class = {'slow': self.slow_patterns, 'medium': self.medium_patterns, 'fast': self.fast_patterns}
+        self.arousal_pools = {}
+        for band, class_weights in AROUSAL_BAND_WEIGHTS.items():
+            items, weights = [], []
+            for speed_class, weight in class_weights.items():
+                items.extend(by_class[speed_class])
+                weights.extend([weight] * len(by_class[speed_class]))
+            if not items:
+                items = self.medium_patterns  # Fallback
+                weights = [1.0] * len(items)
+            self.arousal_pools[band] = AliasTable(items, weights)
+    
+    @staticmethod
+    def parse_session_time(time_str: str) -> int:
         """Parse session time string (MM:SS, M:SS, :SS) to seconds"""
         try:
             time_str = time_str.strip()
@@ -88,88 +190,117 @@ class SessionManager:
             logger.error(f"Failed to parse time '{time_str}': {e}")
             return 300  # Default 5 minutes
     
-    def create_multi_peak_arousal_curve(self, session_length: int, peaks: int) -> List[float]:
-        """Create multi-peak arousal progression curve"""
+    def create_multi_peak_arousal_curve(self, session_length: int, peaks: int,
+                                        resolution: Optional[float] = None) -> np.ndarray:
+        """Create multi-peak arousal progression curve
+
+        Sampled every `resolution` seconds (default self.curve_resolution).
+        Noise is still drawn on the original 15 second grid (minimum 20 knots)
+        and interpolated, and smoothing spans three grid points at any resolution.
+        """
         peaks = max(1, min(10, peaks))  # Clamp to 1-10 peaks
-        curve_points = max(20, session_length // 15)  # Point every 15 seconds, minimum 20 points
-        curve = []
+        resolution = resolution or self.curve_resolution
+        curve_points = max(20, int(session_length / resolution) + 1)  # minimum 20 points
+        noise_knots = max(20, session_length // 15)  # Point every 15 seconds, minimum 20 points
         
         logger.info(f"Creating {peaks}-peak arousal curve with {curve_points} points")
         
-        for i in range(curve_points):
-            progress = i / (curve_points - 1)  # 0 to 1
-            
-            # Base arousal level (gradual increase over session)
-            base_arousal = 20 + (progress * 30)  # 20-50 base level
-            
-            # Calculate wave component based on peaks
-            wave_frequency = peaks * math.pi * 2  # Full cycles over session
-            wave_amplitude = 35 + (progress * 20)  # Increasing amplitude over time
-            
-            # Create wave pattern
-            wave_component = math.sin(progress * wave_frequency) * wave_amplitude
-            
-            # Combine base and wave
-            arousal = base_arousal + (wave_component * 0.5)  # Reduce wave intensity
-            
-            # Add some controlled randomness
-            noise = random.uniform(-3, 3)
-            arousal += noise
-            
-            # Ensure peaks get progressively more intense
-            if peaks > 1:
-                peak_progress = (progress * peaks) % 1.0
-                if peak_progress > 0.7:  # Near peak
-                    peak_bonus = (progress * 20) + 10  # Later peaks are more intense
-                    arousal += peak_bonus * (peak_progress - 0.7) / 0.3
-            
-            # Clamp to valid range
-            arousal = max(10, min(95, arousal))
-            curve.append(arousal)
-        
-        # Ensure curve starts low and has proper peaks
-        curve[0] = random.uniform(15, 25)  # Always start low
-        
-        # Smooth the curve slightly
-        smoothed_curve = []
-        for i in range(len(curve)):
-            if i == 0 or i == len(curve) - 1:
-                smoothed_curve.append(curve[i])
-            else:
-                # Simple moving average
-                avg = (curve[i-1] + curve[i] + curve[i+1]) / 3
-                smoothed_curve.append(avg)
+        progress = np.linspace(0.0, 1.0, curve_points)  # 0 to 1
+        
+        # Base arousal level (gradual increase over session)
+        base_arousal = 20 + (progress * 30)  # 20-50 base level
+        
+        # Wave pattern with increasing amplitude over time
+        wave_frequency = peaks * math.pi * 2  # Full cycles over session
+        wave_amplitude = 35 + (progress * 20)
+        wave_component = np.sin(progress * wave_frequency) * wave_amplitude
+        
+        # Combine base and wave
+        arousal = base_arousal + (wave_component * 0.5)  # Reduce wave intensity
         
-        return smoothed_curve
+        # Add some controlled randomness
+        noise = [self.rng.uniform(-3, 3) for _ in range(noise_knots)]
+        arousal += np.interp(progress, np.linspace(0.0, 1.0, noise_knots), noise)
+        
+        # Ensure peaks get progressively more intense
+        if peaks > 1:
+            peak_progress = (progress * peaks) % 1.0
+            peak_bonus = (progress * 20) + 10  # Later peaks are more intense
+            near_peak = peak_progress > 0.7
+            arousal[near_peak] += peak_bonus[near_peak] * (peak_progress[near_peak] - 0.7) / 0.3
+        
+        # Clamp to valid range
+        arousal = np.clip(arousal, 10, 95)
+        
+        # Ensure curve starts low
+        arousal[0] = self.rng.uniform(15, 25)  # Always start low
+        
+        # Smooth the curve slightly - moving average, endpoints kept
+        window = max(3, int(round(2 * (curve_points - 1) / (noise_knots - 1))) | 1)
+        if window < curve_points:
+            half = window // 2
+            padded = np.pad(arousal, half, mode='edge')
+            smoothed = np.convolve(padded, np.ones(window) / window, mode='valid')
+            smoothed[0] = arousal[0]
+            smoothed[-1] = arousal[-1]
+            arousal = smoothed
+        
+        return arousal
+    
+    def _build_curve_tables(self):
+        """Time axis and derivative table for the current curve"""
+        points = len(self.target_arousal_curve)
+        self.curve_step = self.session_length / (points - 1) if points > 1 and self.session_length > 0 else 1.0
+        self.arousal_times = np.arange(points) * self.curve_step
+        self.arousal_slope = np.gradient(self.target_arousal_curve, self.curve_step) if points > 1 else np.zeros(points)
     
-    def get_target_arousal(self, elapsed_time: int) -> float:
-        """Get target arousal for current time in session"""
-        if not self.target_arousal_curve or self.session_length == 0:
+    def _curve_position(self, elapsed_time: float) -> Tuple[int, float]:
+        """Index and fraction into the curve for an elapsed time"""
+        offset = max(0.0, float(elapsed_time)) / self.curve_step
+        last = len(self.target_arousal_curve) - 1
+        index = int(offset)
+        if index >= last:
+            return last, 0.0
+        return index, offset - index
+    
+    def get_target_arousal(self, elapsed_time: float) -> float:
+        """Get target arousal for current time in session - O(1) linear interpolation"""
+        if len(self.target_arousal_curve) == 0 or self.session_length == 0:
             return 50.0
         
-        # Calculate progress through session
-        progress = min(1.0, elapsed_time / self.session_length)
-        curve_index = int(progress * (len(self.target_arousal_curve) - 1))
+        index, frac = self._curve_position(elapsed_time)
+        curve = self.target_arousal_curve
+        if frac == 0.0:
+            return float(curve[index])
+        return float(curve[index] + (curve[index + 1] - curve[index]) * frac)
+    
+    def get_target_arousal_slope(self, elapsed_time: float) -> float:
+        """Rate of change of target arousal (points per second) at a session time"""
+        if len(self.target_arousal_curve) < 2 or self.session_length == 0:
+            return 0.0
         
-        return self.target_arousal_curve[curve_index]
+        index, frac = self._curve_position(elapsed_time)
+        slope = self.arousal_slope
+        if frac == 0.0:
+            return float(slope[index])
+        return float(slope[index] + (slope[index + 1] - slope[index]) * frac)
+    
+    def get_arousal_curve_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(times, arousal, slope) arrays for the timeline UI - no recomputation"""
+        return self.arousal_times, self.target_arousal_curve, self.arousal_slope
     
     def select_pattern_by_arousal(self, target_arousal: float, current_pos: int = 0) -> Optional[Dict]:
-        """Select appropriate pattern based on target arousal level"""
+        """Select appropriate pattern based on target arousal level - O(1) weighted draw"""
         # Map arousal to speed preference
         if target_arousal < 30:
-            # Low arousal - prefer slow patterns
-            pattern_pool = self.slow_patterns + (self.medium_patterns[:len(self.medium_patterns)//3])
+            band = 'low'     # Low arousal - prefer slow patterns
         elif target_arousal < 70:
-            # Medium arousal - prefer medium patterns
-            pattern_pool = self.medium_patterns + (self.slow_patterns[:len(self.slow_patterns)//3]) + (self.fast_patterns[:len(self.fast_patterns)//3])
+            band = 'medium'  # Medium arousal - prefer medium patterns
         else:
-            # High arousal - prefer fast patterns
-            pattern_pool = self.fast_patterns + (self.medium_patterns[:len(self.medium_patterns)//2])
-        
-        if not pattern_pool:
-            pattern_pool = self.medium_patterns  # Fallback
+            band = 'high'    # High arousal - prefer fast patterns
         
-        return random.choice(pattern_pool) if pattern_pool else None
+        pool = self.arousal_pools.get(band)
+        return pool.sample(self.rng) if pool else None
     
     def calculate_speed_multiplier(self, current_arousal: float, target_arousal: float) -> float:
         """Calculate speed multiplier based on arousal levels"""
@@ -199,28 +330,50 @@ class SessionManager:
         """Start a new session with given time and peaks"""
         try:
             self.session_length = self.parse_session_time(session_time_str)
-            self.session_start_time = time.time()
+            self.session_start_time = self.clock.now()
             self.current_arousal = 0.0
             
             # Create multi-peak arousal progression curve
             self.target_arousal_curve = self.create_multi_peak_arousal_curve(
                 self.session_length, self.peaks_count
             )
+            self._build_curve_tables()
+            
+            # Plan the whole session up front when we know the playable patterns
+            self.session_planner = None
+            self.session_plan = None
+            if self.pattern_catalog:
+                self.session_planner = SessionPlanner(self, self.pattern_catalog)
+                self.session_plan = self.session_planner.plan(self.session_length)
+            
+            self.arousal_estimator.reset()
+            self.replan_count = 0
+            self._estimator_started = self.session_start_time
+            self._out_of_band = False
+            self._pending_seek = None
             
             logger.info(f"Started session: {self.session_length}s ({session_time_str}) with {self.peaks_count} peaks")
-            logger.info(f"Arousal curve: {len(self.target_arousal_curve)} points, peaks at ~{[i for i, v in enumerate(self.target_arousal_curve) if v > 70]}")
+            logger.info(f"Arousal curve: {len(self.target_arousal_curve)} points, peaks at ~{self._peak_times()}s")
             
             return True
         except Exception as e:
             logger.error(f"Failed to start session: {e}")
             return False
     
+    def _peak_times(self) -> List[int]:
+        """Session times of local maxima above 70 - for logging"""
+        curve = self.target_arousal_curve
+        if len(curve) < 3:
+            return []
+        is_peak = (curve[1:-1] > 70) & (curve[1:-1] >= curve[:-2]) & (curve[1:-1] > curve[2:])
+        return [int(t) for t in self.arousal_times[1:-1][is_peak]]
+    
     def get_session_progress(self) -> Tuple[int, int, float]:
         """Get current session progress"""
         if self.session_start_time == 0:
             return 0, 0, 0.0
         
-        elapsed = int(time.time() - self.session_start_time)
+        elapsed = int(self.clock.now() - self.session_start_time)
         remaining = max(0, self.session_length - elapsed)
         progress = min(1.0, elapsed / self.session_length) if self.session_length > 0 else 0.0
         
@@ -230,6 +383,79 @@ class SessionManager:
         """Update current arousal level"""
         self.current_arousal = max(0, min(100, new_arousal))
     
+    # Live input signals - each is O(1) and feeds the arousal estimator
+    def record_position(self, position: float):
+        """Emitted stroke position (0-100)"""
+        self.arousal_estimator.record_position(self.clock.now(), position)
+        self._refresh_arousal()
+    
+    def record_speed_change(self, speed: float):
+        """User speed setting as a speed factor (above 1.0 = faster)"""
+        self.arousal_estimator.record_speed(self.clock.now(), speed)
+        self._refresh_arousal()
+    
+    def record_skip(self):
+        """Pattern skipped by the user"""
+        self.arousal_estimator.record_skip(self.clock.now())
+        self._refresh_arousal()
+    
+    def _refresh_arousal(self):
+        """Pull the estimate into current_arousal; re-plan when it leaves the tolerance band"""
+        if not self.is_session_active():
+            return
+        now = self.clock.now()
+        self.update_arousal(self.arousal_estimator.estimate(now))
+        
+        # Wait for a full window of signals before trusting the estimate
+        if now - self._estimator_started < self.arousal_estimator.window:
+            return
+        target = self.get_target_arousal(now - self.session_start_time)
+        gap = abs(self.current_arousal - target)
+        # Hysteresis: back in band only at half the tolerance, so the edge doesn't chatter
+        out_of_band = gap > (self.arousal_tolerance * 0.5 if self._out_of_band else self.arousal_tolerance)
+        if out_of_band and not self._out_of_band:
+            logger.info(f"Arousal estimate {self.current_arousal:.1f}% vs target {target:.1f}% - re-planning")
+            self._schedule_replan()
+        self._out_of_band = out_of_band
+    
+    def _schedule_replan(self):
+        """Re-plan on a worker thread - the beam search must not stall the playback thread"""
+        if self._replan_thread and self._replan_thread.is_alive():
+            return
+        self._replan_thread = threading.Thread(target=self._replan_worker, daemon=True)
+        self._replan_thread.start()
+    
+    def _replan_worker(self):
+        # The engine may take an entry while the search runs - then search again
+        while self.is_session_active() and not self.replan_remaining():
+            pass
+    
+    def replan_remaining(self) -> bool:
+        """Re-plan everything the playback engine has not been handed yet
+        
+        Returns False when the plan moved on during the search (result dropped).
+        """
+        plan, planner = self.session_plan, self.session_planner
+        if not plan or not planner:
+            return True
+        with self._plan_lock:
+            revision = plan.revision
+            handed_out = plan.handed_out()
+        endpoint = endpoint_of(handed_out[-1].pattern.end_pos) if handed_out else 0
+        # Anchor on the real elapsed time, not the plan's own timeline, so drift can't accumulate
+        start_time = min(self.session_length, max(0.0, self.clock.now() - self.session_start_time))
+        recent = tuple(entry.pattern.name for entry in handed_out[-RECENT_WINDOW:])
+        
+        tail = planner.plan(self.session_length, endpoint, start_time, recent, self.current_arousal)
+        with self._plan_lock:
+            if plan is not self.session_plan:
+                return True  # session restarted or stopped meanwhile
+            if plan.revision != revision:
+                return False
+            plan.replace_remaining(tail.entries)
+            self.replan_count += 1
+        return True
+    
     def manual_arousal_override(self, position: float):
         """Override arousal position manually (0.0 to 1.0)"""
         if self.session_length > 0:
@@ -237,13 +463,22 @@ class SessionManager:
             target_time = position * self.session_length
             
             # Override session start time to make current time = target time
-            self.session_start_time = time.time() - target_time
+            self.session_start_time = self.clock.now() - target_time
             
             # Update arousal to match position
-            if self.target_arousal_curve:
-                curve_index = int(position * (len(self.target_arousal_curve) - 1))
-                target_arousal = self.target_arousal_curve[curve_index]
+            if len(self.target_arousal_curve):
+                target_arousal = self.get_target_arousal(target_time)
                 self.update_arousal(target_arousal)
+                self.arousal_estimator.record_anchor(self.clock.now(), target_arousal)
+            
+            # Anything queued is now stale - re-plan from the seek point on the next request
+            if self.session_plan:
+                self._pending_seek = target_time
+                for listener in list(self.seek_listeners):
+                    try:
+                        listener(target_time)
+                    except Exception as e:
+                        logger.error(f"Seek listener failed: {e}")
                 
                 logger.info(f"Manual override: position {position:.2f} -> time {target_time:.0f}s -> arousal {target_arousal:.1f}%")
     
@@ -255,7 +490,7 @@ class SessionManager:
             return None, 1.0  # Session ended
         
         # Get target arousal for current time
-        target_arousal = self.get_target_arousal(elapsed)
+        target_arousal = self.get_target_arousal(self.clock.now() - self.session_start_time)
         
         # Select appropriate pattern
         pattern = self.select_pattern_by_arousal(target_arousal, current_pos)
@@ -265,12 +500,48 @@ class SessionManager:
         
         return pattern, speed_multiplier
     
+    def add_seek_listener(self, callback):
+        """callback(session_time) runs after a timeline seek - cancel queued patterns there"""
+        if callback not in self.seek_listeners:
+            self.seek_listeners.append(callback)
+    
+    def remove_seek_listener(self, callback):
+        if callback in self.seek_listeners:
+            self.seek_listeners.remove(callback)
+    
+    def next_plan_entry(self, current_pos: Optional[float] = None):
+        """Next entry of the precomputed session plan, None without a plan or at its end
+        
+        current_pos is where the next pattern has to start - used to chain the
+        re-planned window after a timeline seek.
+        """
+        if not self.session_plan:
+            return None
+        with self._plan_lock:
+            if self._pending_seek is not None:
+                self._replan_after_seek(self._pending_seek, current_pos)
+                self._pending_seek = None
+            return self.session_plan.next_entry()
+    
+    def _replan_after_seek(self, seek_time: float, current_pos: Optional[float]):
+        """Replace the unplayed plan with a fresh window at seek_time plus cached segments"""
+        handed_out = self.session_plan.handed_out()
+        if current_pos is None:
+            current_pos = handed_out[-1].pattern.end_pos if handed_out else 0
+        recent = tuple(entry.pattern.name for entry in handed_out[-RECENT_WINDOW:])
+        
+        tail = self.session_planner.replan_window(self.session_length, seek_time,
+                                                  endpoint_of(current_pos), recent)
+        self.session_plan.replace_remaining(tail)
+        logger.info(f"Re-planned from {seek_time:.0f}s: {len(tail)} patterns "
+                    f"({len(self.session_planner.segment_cache)} cached segments)")
+    
     def is_session_active(self) -> bool:
         """Check if session is currently active"""
         if self.session_start_time == 0:
             return False
         
-        elapsed = time.time() - self.session_start_time
+        elapsed = self.clock.now() - self.session_start_time
         return elapsed < self.session_length
     
     def stop_session(self):
@@ -278,7 +549,13 @@ class SessionManager:
         self.session_start_time = 0
         self.session_length = 0
         self.current_arousal = 0.0
-        self.target_arousal_curve = []
+        self.target_arousal_curve = np.zeros(0)
+        self.arousal_times = np.zeros(0)
+        self.arousal_slope = np.zeros(0)
+        self.session_planner = None
+        self.session_plan = None
+        self._out_of_band = False
+        self._pending_seek = None
         logger.info("Session stopped")
 
 # Test function
@@ -297,12 +574,12 @@ def test_multi_peak_session():
         # Show curve preview
         curve = sm.target_arousal_curve
         print(f"Curve length: {len(curve)}")
-        print(f"Peak positions: {[i for i, v in enumerate(curve) if v > 70]}")
+        print(f"Peak times: {sm._peak_times()}s")
         print(f"Arousal range: {min(curve):.1f} - {max(curve):.1f}")
         
         # Simulate a few time points
         for i in range(0, 120, 30):  # Every 30 seconds
-            sm.session_start_time = time.time() - i
+            sm.session_start_time = sm.clock.now() - i
             target = sm.get_target_arousal(i)
             pattern, speed = sm.get_next_pattern_recommendation()
             
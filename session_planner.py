@@ -0,0 +1,238 @@
+"""
+Session Planner
+Plans a whole session's pattern sequence up front with a beam search over the
+0/50/100 endpoint transition graph, tracking the SessionManager arousal curve
+"""
+
+import logging
+import math
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SPEED_MULTIPLIERS = (0.6, 0.8, 1.0, 1.5, 2.0)  # move-duration multipliers, as in PlaybackEngine
+SPEED_CLASS_RANK = {'slow': 0, 'medium': 1, 'fast': 2}
+SEGMENT_SECONDS = 60.0   # plan is built (and can be rebuilt) one segment at a time
+CACHE_TOLERANCE = 15.0   # a cached segment is reused if it was planned from within this many seconds
+BEAM_WIDTH = 6
+CANDIDATES_PER_STEP = 10
+RECENT_WINDOW = 3        # patterns repeated within this many steps are penalized
+
+BAND_WEIGHT = 1.0
+SPEED_WEIGHT = 1.5
+REPEAT_PENALTY = 2.0
+
+_LOG_MULTIPLIERS = {m: math.log(m) for m in SPEED_MULTIPLIERS}
+
+
+def endpoint_of(position: float) -> int:
+    """Snap a stroke position to the 0/50/100 chaining endpoints"""
+    if position <= 30:
+        return 0
+    if position >= 70:
+        return 100
+    return 50
+
+
+class PlanEntry(NamedTuple):
+    """One planned pattern: when it starts, what plays and how fast"""
+    start_time: float        # seconds into the session
+    duration: float          # seconds - the multiplier scales moves, not the pattern's timeline
+    pattern: object          # FunscriptPattern - resolved, no lookup at play time
+    speed_multiplier: float
+    target_arousal: float
+
+
+class SessionPlan:
+    """Compact planned sequence that the playback engine streams in order"""
+
+    def __init__(self, entries: List[PlanEntry], session_length: float):
+        self.entries = entries
+        self.session_length = session_length
+        self.cursor = 0
+        self.revision = 0  # bumped whenever the cursor moves or the tail is replaced
+
+    def __len__(self):
+        return len(self.entries)
+
+    def next_entry(self) -> Optional[PlanEntry]:
+        """Next entry in play order, None when the plan is exhausted"""
+        if self.cursor >= len(self.entries):
+            return None
+        entry = self.entries[self.cursor]
+        self.cursor += 1
+        self.revision += 1
+        return entry
+
+    def handed_out(self) -> List[PlanEntry]:
+        """Entries already given to the playback engine - these can no longer change"""
+        return self.entries[:self.cursor]
+
+    def replace_remaining(self, entries: List[PlanEntry]):
+        """Swap everything after the cursor for a re-planned tail"""
+        self.entries = self.entries[:self.cursor] + list(entries)
+        self.revision += 1
+
+
+class _Candidate(NamedTuple):
+    index: int
+    name: str
+    start: int
+    end: int
+    seconds: float
+    rank: int
+
+
+class SessionPlanner:
+    """Beam search over patterns x speed multipliers against the arousal curve"""
+
+    def __init__(self, session_manager, patterns: List, rng=None):
+        self.session_manager = session_manager
+        self.rng = rng or session_manager.rng
+        self.candidates = []
+        self.by_start: Dict[int, List[_Candidate]] = {0: [], 50: [], 100: []}
+
+        speeds = session_manager.pattern_speeds
+        for index, pattern in enumerate(patterns):
+            if not pattern.actions:
+                continue
+            # PlaybackEngine schedules action i at its 'at', whatever the speed multiplier
+            seconds = max(0.25, pattern.actions[-1]['at'] / 1000.0)
+            speed_class = speeds.get(pattern.name, {}).get('speed_class', 'medium')
+            candidate = _Candidate(index, pattern.name, endpoint_of(pattern.start_pos),
+                                   endpoint_of(pattern.end_pos), seconds,
+                                   SPEED_CLASS_RANK.get(speed_class, 1))
+            self.candidates.append(candidate)
+            self.by_start[candidate.start].append(candidate)
+        self.patterns = patterns
+        
+        # (segment index, start endpoint) -> (entries, end endpoint, recent names)
+        self.segment_cache: Dict[Tuple[int, int], Tuple[List[PlanEntry], int, Tuple[str, ...]]] = {}
+
+    @staticmethod
+    def _desired_rank(target_arousal: float) -> int:
+        if target_arousal < 30:
+            return 0
+        if target_arousal < 70:
+            return 1
+        return 2
+
+    def _pattern_cost(self, candidate: _Candidate, target_arousal: float, recent: Tuple[str, ...],
+                      current_arousal: Optional[float] = None) -> Tuple[float, float]:
+        """Per-second cost independent of speed, plus log of the speed the target wants
+
+        Without a measured current_arousal the plan assumes the target is being tracked.
+        """
+        if current_arousal is None:
+            current_arousal = target_arousal
+        desired_multiplier = self.session_manager.calculate_speed_multiplier(current_arousal, target_arousal)
+        cost = BAND_WEIGHT * abs(candidate.rank - self._desired_rank(target_arousal))
+        if candidate.name in recent:
+            cost += REPEAT_PENALTY
+        return cost, math.log(desired_multiplier)
+
+    def _expand_pool(self, endpoint: int) -> List[_Candidate]:
+        pool = self.by_start.get(endpoint) or self.candidates
+        if len(pool) <= CANDIDATES_PER_STEP:
+            return pool
+        return self.rng.sample(pool, CANDIDATES_PER_STEP)
+
+    def plan_segment(self, start_time: float, end_time: float, start_endpoint: int,
+                     recent: Tuple[str, ...] = (),
+                     current_arousal: Optional[float] = None) -> Tuple[List[PlanEntry], int, Tuple[str, ...]]:
+        """Plan patterns from start_time until end_time is covered
+
+        Returns (entries, end endpoint, recent pattern names) so segments chain.
+        """
+        # Beam state: (integrated cost, time, endpoint, recent names, entries)
+        beam = [(0.0, start_time, start_endpoint, tuple(recent), [])]
+        finished = []
+
+        while beam:
+            expanded = {}
+            pools = {}
+            for cost, time, endpoint, names, entries in beam:
+                if time >= end_time:
+                    finished.append((cost, time, endpoint, names, entries))
+                    continue
+                if endpoint not in pools:
+                    pools[endpoint] = self._expand_pool(endpoint)
+                for candidate in pools[endpoint]:
+                    target = self.session_manager.get_target_arousal(time + candidate.seconds / 2)
+                    pattern_cost, log_desired = self._pattern_cost(candidate, target, names, current_arousal)
+                    seconds = candidate.seconds
+                    for multiplier, log_multiplier in _LOG_MULTIPLIERS.items():
+                        step = pattern_cost + SPEED_WEIGHT * abs(log_multiplier - log_desired)
+                        new_cost = cost + step * seconds
+                        # DP merge: keep the cheapest path per (endpoint, last pattern)
+                        key = (candidate.end, candidate.name)
+                        best = expanded.get(key)
+                        if best is not None and best[0] / (best[1] - start_time) <= new_cost / (time + seconds - start_time):
+                            continue
+                        entry = PlanEntry(time, seconds, self.patterns[candidate.index], multiplier, target)
+                        expanded[key] = (new_cost, time + seconds, candidate.end,
+                                         (names + (candidate.name,))[-RECENT_WINDOW:], entries + [entry])
+            # Compare paths of different lengths by average cost per second
+            beam = sorted(expanded.values(), key=lambda s: s[0] / max(1e-6, s[1] - start_time))[:BEAM_WIDTH]
+
+        if not finished:
+            return [], start_endpoint, tuple(recent)
+        best = min(finished, key=lambda s: s[0] / max(1e-6, s[1] - start_time))
+        return best[4], best[2], best[3]
+
+    def _cached_segment(self, index: int, endpoint: int, time: float):
+        """Cached segment shifted to start at `time`, None when there is no close match"""
+        cached = self.segment_cache.get((index, endpoint))
+        if not cached:
+            return None
+        segment, end_endpoint, recent = cached
+        shift = time - segment[0].start_time
+        if abs(shift) > CACHE_TOLERANCE:
+            return None
+        if shift:
+            segment = [entry._replace(start_time=entry.start_time + shift) for entry in segment]
+        return segment, end_endpoint, recent
+
+    def replan_window(self, session_length: float, seek_time: float, endpoint: int,
+                      recent: Tuple[str, ...] = ()) -> List[PlanEntry]:
+        """Plan from a timeline seek: only the window up to the next segment
+        boundary is planned fresh, later segments come from the cache"""
+        index = int(seek_time // SEGMENT_SECONDS)
+        window_end = min(session_length, (index + 1) * SEGMENT_SECONDS)
+        window, endpoint, recent = self.plan_segment(seek_time, window_end, endpoint, recent)
+        if not window:
+            return []
+        resume = window[-1].start_time + window[-1].duration
+        return window + self.plan(session_length, endpoint, resume, recent).entries
+
+    def plan(self, session_length: float, start_endpoint: int = 0, start_time: float = 0.0,
+             recent: Tuple[str, ...] = (), current_arousal: Optional[float] = None) -> SessionPlan:
+        """Plan the session from start_time to the end, segment by segment
+
+        A measured current_arousal only steers the first segment - later
+        segments assume the curve has been caught up with.
+        """
+        entries = []
+        time, endpoint = start_time, start_endpoint
+        while time < session_length and self.candidates:
+            # Segments sit on a fixed grid so later ones can be reused after a seek
+            index = int(time // SEGMENT_SECONDS)
+            segment_end = min(session_length, (index + 1) * SEGMENT_SECONDS)
+            segment = None
+            if current_arousal is None:
+                segment = self._cached_segment(index, endpoint, time)
+            if segment:
+                segment, endpoint, recent = segment
+            else:
+                key = (index, endpoint)
+                segment, endpoint, recent = self.plan_segment(time, segment_end, endpoint, recent,
+                                                              current_arousal)
+                if segment and current_arousal is None:
+                    self.segment_cache[key] = (segment, endpoint, recent)
+            if not segment:
+                break
+            entries.extend(segment)
+            time = segment[-1].start_time + segment[-1].duration
+            current_arousal = None
+        logger.info(f"Planned {len(entries)} patterns for {session_length - start_time:.0f}s of session")
+        return SessionPlan(entries, session_length)
@@ -0,0 +1,204 @@
+"""
+Offline Session Renderer
+Drives PatternSequencer / SessionManager against a simulated clock and writes the
+full command timeline as a .funscript plus a speed-curve sidecar
+
+Usage:
+    python session_renderer.py buildup --duration 30:00 --cycles 3 -o preview.funscript
+    python session_renderer.py chaos --duration 10:00 --seed 7 -o chaos.funscript
+    python session_renderer.py climax --duration 2:00 -o climax.funscript
+    python session_renderer.py session --duration 20:00 --peaks 4 -o session.funscript
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import time
+
+from clock import VirtualClock
+from pattern_sequencer import PatternSequencer
+from session_manager import SessionManager
+
+logger = logging.getLogger(__name__)
+
+
+class CueRecorder:
+    """Stands in for the audio manager and records cues on the timeline"""
+
+    def __init__(self, clock, start_time):
+        self.clock = clock
+        self.start_time = start_time
+        self.cues = []
+
+    def play(self, trigger, force=False):
+        self.cues.append({'at': int((self.clock.now() - self.start_time) * 1000), 'cue': trigger})
+
+
+class SessionRenderer:
+    """Renders sequencer output faster than real time"""
+
+    def __init__(self, category="BLOWJOB", seed=0, base_speed=0.75):
+        self.seed = seed
+        self.base_speed = base_speed
+        self.clock = VirtualClock()
+        self.rng = random.Random(seed)
+
+        self.sequencer = PatternSequencer(clock=self.clock, rng=self.rng)
+        self.sequencer.load_patterns(category)
+        self.sequencer.chaos_current_category = category
+        self.cue_recorder = CueRecorder(self.clock, self.clock.now())
+        self.sequencer.audio_manager = self.cue_recorder
+        self.sequencer.chaos_folder_callback = self._on_chaos_folder_change
+
+        self.mode = None
+        self.actions = []       # funscript actions
+        self.speed_curve = []   # [at_ms, requested_speed, actual_speed]
+        self.arousal_curve = [] # [at_ms, target_arousal] (session mode only)
+
+    def _on_chaos_folder_change(self, category):
+        """Mirrors the GUI's on_chaos_folder_change: new pattern set, queued stream dropped"""
+        self.sequencer.switch_category(category)
+        self.sequencer.motion_stream.clear()
+
+    def _elapsed_ms(self):
+        return int((self.clock.now() - self.cue_recorder.start_time) * 1000)
+
+    def _emit(self, speed):
+        """One iteration of the streaming loop - mirrors seamless_streaming_loop"""
+        position, duration, action_type = self.sequencer.get_next_motion_command(speed)
+        current_speed = self.sequencer.get_current_speed(speed)
+        final_duration = self.sequencer.device_duration(duration, current_speed)
+
+        at = self._elapsed_ms()
+        # Funscript actions mark where the device arrives, not where it departs
+        self.actions.append({'at': at + final_duration, 'pos': int(position)})
+        self.speed_curve.append([at, round(speed, 3), current_speed])
+
+        # The live loop sleeps for the command duration before the next one
+        self.clock.advance(duration / 1000.0)
+
+    def _run(self, duration_seconds, speed_fn):
+        end_time = self.clock.now() + duration_seconds
+        while self.clock.now() < end_time:
+            self._emit(speed_fn())
+
+    def render_buildup(self, duration_seconds, cycles=1, start_speed=0.1, end_speed=1.5,
+                       tail_seconds=60):
+        """Render a build-up session plus the climax tail that follows it"""
+        self.mode = 'buildup'
+        self.sequencer.start_buildup_mode(duration_seconds, cycles, start_speed, end_speed)
+        self._run(duration_seconds + tail_seconds, lambda: self.base_speed)
+
+    def render_chaos(self, duration_seconds):
+        """Render chaos mode for the given duration"""
+        self.mode = 'chaos'
+        self.sequencer.set_chaos_mode(True)
+        self._run(duration_seconds, lambda: self.base_speed)
+
+    def render_climax(self, duration_seconds):
+        """Render the climax script followed by regular patterns"""
+        self.mode = 'climax'
+        self.sequencer.play_climax_patterns()
+        self._run(duration_seconds, lambda: self.base_speed)
+
+    def render_session(self, session_time_str, peaks=3, pattern_speeds_file="pattern_speeds.json"):
+        """Render a SessionManager arousal session"""
+        self.mode = 'session'
+        session_manager = SessionManager(pattern_speeds_file, clock=self.clock, rng=self.rng)
+        session_manager.peaks_count = peaks
+        if not session_manager.start_session(session_time_str):
+            return
+
+        state = {'pattern_id': None, 'speed': self.base_speed}
+
+        def session_speed():
+            current = self.sequencer.current_pattern
+            current_id = current['pattern_id'] if current else None
+            # Only ask for a new recommendation when the stream moves to a new pattern
+            if current_id != state['pattern_id']:
+                state['pattern_id'] = current_id
+                _, multiplier = session_manager.get_next_pattern_recommendation()
+                # Session multipliers stretch durations - invert them for stream speed
+                state['speed'] = max(0.1, min(1.5, self.base_speed / multiplier))
+                elapsed, _, _ = session_manager.get_session_progress()
+                self.arousal_curve.append([self._elapsed_ms(),
+                                           round(session_manager.get_target_arousal(elapsed), 2)])
+            return state['speed']
+
+        self._run(session_manager.session_length, session_speed)
+
+    def write(self, output_path):
+        """Write the funscript and its .speed.json sidecar, returns both paths"""
+        funscript = {
+            'version': '1.0',
+            'inverted': False,
+            'range': 100,
+            'actions': self.actions,
+            'metadata': {'created_by': 'session_renderer', 'mode': self.mode, 'seed': self.seed}
+        }
+        with open(output_path, 'w') as f:
+            json.dump(funscript, f)
+
+        sidecar_path = os.path.splitext(output_path)[0] + '.speed.json'
+        sidecar = {
+            'mode': self.mode,
+            'seed': self.seed,
+            'base_speed': self.base_speed,
+            'speed_curve': self.speed_curve,
+            'arousal_curve': self.arousal_curve,
+            'cues': self.cue_recorder.cues
+        }
+        with open(sidecar_path, 'w') as f:
+            json.dump(sidecar, f)
+
+        return output_path, sidecar_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a session to .funscript without waiting for it")
+    parser.add_argument('mode', choices=['buildup', 'chaos', 'climax', 'session'])
+    parser.add_argument('--duration', default='30:00', help="MM:SS, HH:MM:SS or seconds")
+    parser.add_argument('--category', default='BLOWJOB')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--speed', type=float, default=0.75, help="Base speed (manual speed slider)")
+    parser.add_argument('--cycles', type=int, default=1, help="Build-up cycles")
+    parser.add_argument('--start-speed', type=float, default=0.1)
+    parser.add_argument('--end-speed', type=float, default=1.5)
+    parser.add_argument('--tail', type=int, default=60, help="Seconds rendered after build-up completes")
+    parser.add_argument('--peaks', type=int, default=3, help="Session arousal peaks")
+    parser.add_argument('--pattern-speeds', default='pattern_speeds.json')
+    parser.add_argument('--root', default='.', help="Folder containing funscripts/ and climax/")
+    parser.add_argument('--verbose', action='store_true', help="Show sequencer output")
+    parser.add_argument('-o', '--output', default='rendered_session.funscript')
+    args = parser.parse_args()
+
+    output_path = os.path.abspath(args.output)
+    os.chdir(args.root)
+    duration = SessionManager.parse_session_time(args.duration)
+
+    wall_start = time.perf_counter()
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        renderer = SessionRenderer(args.category, args.seed, args.speed)
+        if args.mode == 'buildup':
+            renderer.render_buildup(duration, args.cycles, args.start_speed, args.end_speed, args.tail)
+        elif args.mode == 'chaos':
+            renderer.render_chaos(duration)
+        elif args.mode == 'climax':
+            renderer.render_climax(duration)
+        else:
+            renderer.render_session(args.duration, args.peaks, args.pattern_speeds)
+
+    funscript_path, sidecar_path = renderer.write(output_path)
+    wall_time = time.perf_counter() - wall_start
+    print(f"✅ Rendered {len(renderer.actions)} actions ({duration}s of {args.mode}) in {wall_time:.2f}s")
+    print(f"   {funscript_path}")
+    print(f"   {sidecar_path}")
+
+
+if __name__ == "__main__":
+    main()
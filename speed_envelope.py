@@ -0,0 +1,173 @@
+"""
+Speed Envelopes
+Build-up and chaos speed curves compiled up front into a time-indexed table,
+so speed lookups are O(1) and independent of how often they are called
+"""
+
+import math
+from array import array
+
+ENVELOPE_STEP = 0.1  # seconds between envelope samples
+
+
+class SpeedEnvelope:
+    """Speed sampled every `step` seconds plus a time-ordered cue event queue"""
+
+    def __init__(self, start_time, step=ENVELOPE_STEP):
+        self.start_time = start_time
+        self.step = step
+        self.speeds = array('d')
+        self.events = []        # (time, name, payload) in time order
+        self._next_event = 0
+
+    @property
+    def end_time(self):
+        return self.start_time + max(0, len(self.speeds) - 1) * self.step
+
+    def speed_at(self, now):
+        """Interpolated speed at `now` - clamps to the first/last sample"""
+        if not self.speeds:
+            return 0.0
+        offset = (now - self.start_time) / self.step
+        if offset <= 0:
+            return self.speeds[0]
+        index = int(offset)
+        if index >= len(self.speeds) - 1:
+            return self.speeds[-1]
+        frac = offset - index
+        return self.speeds[index] + (self.speeds[index + 1] - self.speeds[index]) * frac
+
+    def pop_due_events(self, now):
+        """Return every event scheduled at or before `now` that has not fired yet"""
+        due = []
+        while self._next_event < len(self.events) and self.events[self._next_event][0] <= now:
+            due.append(self.events[self._next_event])
+            self._next_event += 1
+        return due
+
+
+def compile_buildup_envelope(start_time, duration, cycles, start_speed, end_speed, step=ENVELOPE_STEP):
+    """Build-up ramp: each cycle eases from start_speed to end_speed (quadratic)"""
+    envelope = SpeedEnvelope(start_time, step)
+    total = max(0.001, float(duration))
+    cycles = max(1, int(cycles))
+    cycle_duration = total / cycles
+    span = end_speed - start_speed
+
+    samples = int(math.ceil(total / step)) + 1
+    for i in range(samples):
+        elapsed = min(total, i * step)
+        cycle_index = min(cycles - 1, int(elapsed // cycle_duration))
+        cycle_progress = min(1.0, (elapsed - cycle_index * cycle_duration) / cycle_duration)
+        envelope.speeds.append(start_speed + cycle_progress * cycle_progress * span)
+    envelope.speeds[-1] = end_speed
+
+    for cycle_index in range(cycles):
+        cycle_start = start_time + cycle_index * cycle_duration
+        for milestone in (25, 50, 75):
+            envelope.events.append((cycle_start + cycle_duration * milestone / 100.0,
+                                    f"buildup_progress_{milestone}", cycle_index))
+    envelope.events.append((start_time + total, "buildup_complete", cycles - 1))
+    return envelope
+
+
+class ChaosEnvelope(SpeedEnvelope):
+    """Open-ended chaos speed curve, compiled a horizon at a time
+
+    Speed targets, folder switches and pattern skips are drawn from the same
+    ranges as before; speed glides toward each target exponentially with a
+    fixed time constant instead of a per-call step.
+    """
+
+    HORIZON = 120.0        # seconds compiled per extension
+    TIME_CONSTANT = 1.5    # seconds for the glide to cover ~63% of a speed change
+
+    def __init__(self, start_time, start_speed, rng, step=ENVELOPE_STEP,
+                 speed_interval=3.0, folder_interval=15.0, skip_interval=5.0):
+        super().__init__(start_time, step)
+        self.rng = rng
+        self.speed_target = start_speed
+        self._speed = start_speed
+        self._next_speed_change = start_time + speed_interval
+        self._next_folder_change = start_time + folder_interval
+        self._next_skip = start_time + skip_interval
+        self._glide = 1.0 - math.exp(-step / self.TIME_CONSTANT)
+        self.last_time = start_time  # latest time ensure() was called for
+        self.speeds.append(start_speed)
+
+    def pop_due_events(self, now):
+        """Due events, at most one of each kind - after a gap only the latest speed
+        target, one folder switch and one skip fire; fired events are dropped"""
+        latest = {}
+        for event in super().pop_due_events(now):
+            latest[event[1]] = event
+        del self.events[:self._next_event]
+        self._next_event = 0
+        return sorted(latest.values(), key=lambda event: event[0])
+
+    def _draw_speed_target(self):
+        if self.rng.random() < 0.3:  # 30% chance for extreme speeds
+            if self.rng.random() < 0.5:
+                return self.rng.uniform(0.1, 0.3)  # Very slow
+            return self.rng.uniform(1.2, 1.5)      # Very fast
+        return self.rng.uniform(0.4, 1.1)          # 70% chance for normal range
+
+    def ensure(self, now):
+        """Compile further horizons until `now` is covered
+
+        A gap longer than a horizon (e.g. paused playback) restarts the curve at
+        `now`; samples already behind `now` are dropped a horizon at a time.
+        """
+        if now - self.last_time > self.HORIZON:
+            self._reanchor(now)
+        self.last_time = max(self.last_time, now)
+        used = int((now - self.start_time) / self.step)
+        if used >= self.HORIZON / self.step:
+            del self.speeds[:used]
+            self.start_time += used * self.step
+        while now >= self.end_time:
+            self._extend()
+
+    def _reanchor(self, now):
+        """Restart at `now` from the last speed played - nothing due in the gap fires"""
+        speed = self.speed_at(self.last_time)
+        self.start_time = now
+        self.speeds = array('d', [speed])
+        self.events = []
+        self._next_event = 0
+        self._speed = speed
+        self._next_speed_change = now + self.rng.uniform(2.0, 6.0)
+        self._next_folder_change = now + self.rng.uniform(12.0, 25.0)
+        self._next_skip = now + self.rng.uniform(4.0, 8.0)
+
+    def _extend(self):
+        horizon_start = self.end_time
+        horizon_end = horizon_start + self.HORIZON
+        batch = []
+
+        # Speed changes must be known before sampling the glide
+        while self._next_speed_change < horizon_end:
+            interval = self.rng.uniform(2.0, 6.0)
+            batch.append((self._next_speed_change, "chaos_speed", (self._draw_speed_target(), interval)))
+            self._next_speed_change += interval
+        while self._next_folder_change < horizon_end:
+            interval = self.rng.uniform(12.0, 25.0)
+            batch.append((self._next_folder_change, "chaos_folder", interval))
+            self._next_folder_change += interval
+        while self._next_skip < horizon_end:
+            interval = self.rng.uniform(4.0, 8.0)
+            batch.append((self._next_skip, "chaos_skip", interval))
+            self._next_skip += interval
+        batch.sort(key=lambda event: event[0])
+
+        targets = [event for event in batch if event[1] == "chaos_speed"]
+        target_index = 0
+        for _ in range(int(round(self.HORIZON / self.step))):
+            t = self.start_time + len(self.speeds) * self.step
+            while target_index < len(targets) and targets[target_index][0] <= t:
+                self.speed_target = targets[target_index][2][0]
+                target_index += 1
+            self._speed += (self.speed_target - self._speed) * self._glide
+            self.speeds.append(self._speed)
+
+        self.events.extend(batch)
@@ -0,0 +1,89 @@
+"""
+Stroke Detection
+Direction reversals found once per pattern with numpy, then turned into exact
+stroke timestamps when the pattern is integrated into the motion stream
+"""
+
+from collections import deque
+from typing import NamedTuple
+
+import numpy as np
+
+STROKE_MIN_TRAVEL = 20  # position change that counts as real movement
+
+
+class StrokeProfile(NamedTuple):
+    """Reversal structure of one pattern's action positions"""
+    first_pos: int
+    last_pos: int
+    first_direction: int      # direction of the first significant move, 0 if none
+    first_index: int          # action index that move ends on
+    last_direction: int       # direction of the last significant move, 0 if none
+    stroke_indices: tuple     # action indices where an internal reversal completes
+
+
+def analyze_strokes(positions) -> StrokeProfile:
+    """Vectorized reversal detection - a stroke is a change of direction between
+    consecutive moves of at least STROKE_MIN_TRAVEL"""
+    pos = np.asarray(positions, dtype=np.int32)
+    if len(pos) == 0:
+        return StrokeProfile(0, 0, 0, 0, 0, ())
+    moves = np.diff(pos)
+    significant = np.flatnonzero(np.abs(moves) >= STROKE_MIN_TRAVEL)
+    if len(significant) == 0:
+        return StrokeProfile(int(pos[0]), int(pos[-1]), 0, 0, 0, ())
+    directions = np.sign(moves[significant])
+    reversals = significant[1:][directions[1:] != directions[:-1]] + 1
+    return StrokeProfile(int(pos[0]), int(pos[-1]), int(directions[0]), int(significant[0]) + 1,
+                         int(directions[-1]), tuple(int(i) for i in reversals))
+
+
+def integrate_strokes(profile: StrokeProfile, previous_pos, previous_direction):
+    """Stroke action indices for a pattern played after `previous_pos` while moving
+    in `previous_direction` -> (indices, direction after the pattern)
+
+    Only the boundary move and the first internal move depend on what came before.
+    """
+    indices = []
+    direction = previous_direction
+    if previous_pos is not None:
+        boundary = profile.first_pos - previous_pos
+        if abs(boundary) >= STROKE_MIN_TRAVEL:
+            boundary_direction = 1 if boundary > 0 else -1
+            if direction and boundary_direction != direction:
+                indices.append(0)
+            direction = boundary_direction
+    if profile.first_direction:
+        if direction and profile.first_direction != direction:
+            indices.append(profile.first_index)
+        indices.extend(profile.stroke_indices)
+        direction = profile.last_direction
+    return indices, direction
+
+
+class StrokeSchedule:
+    """Upcoming stroke timestamps (stream ms) in time order"""
+
+    def __init__(self):
+        self.times = deque()
+        self.next_time = float('inf')
+        self.total = 0
+
+    def add(self, timestamps):
+        self.times.extend(timestamps)
+        if self.times:
+            self.next_time = self.times[0]
+
+    def pop_due(self, now_ms):
+        """Strokes scheduled at or before now_ms -> list of their timestamps"""
+        due = []
+        times = self.times
+        while times and times[0] <= now_ms:
+            due.append(times.popleft())
+        self.next_time = times[0] if times else float('inf')
+        self.total += len(due)
+        return due
+
+    def clear(self):
+        self.times.clear()
+        self.next_time = float('inf')
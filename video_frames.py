@@ -0,0 +1,546 @@
+"""
+Video Frame Provider
+Decoded frames on demand for the video visualizer - an LRU of display-size
+frames under a memory budget, filled by a background decoder that prefetches
+in the direction the position is moving. Idle time first fills in coarse
+positions across the whole video, then - with a frame atlas, where frames live
+in a memory-mapped file - every remaining frame, decoded by worker processes
+when there are cores to spare
+"""
+
+import bisect
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from parallel_decode import ParallelAtlasFill
+
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024   # bytes of decoded RGB frames
+PREFETCH_FRAMES = 24                        # frames decoded ahead of the requested one
+MAX_DISPLAY_SIZE = (800, 600)
+
+TABLE_POSITIONS = 101                       # quantized positions decoded in table mode
+TABLE_READERS = max(1, min(4, os.cpu_count() or 1))
+TABLE_GRAB_GAP = 30                         # grab forward instead of seeking up to this many frames
+COARSE_POSITIONS = TABLE_POSITIONS          # frames decoded across the video before anything else
+FULLSCREEN_TABLE_BUDGET = 1024 * 1024 * 1024
+FULLSCREEN_MEMORY_BUDGET = 512 * 1024 * 1024
+FULLSCREEN_PREFETCH = 8
+PRELOAD_MEMORY_BUDGET = 384 * 1024 * 1024   # all preloaded videos together - LRUs and position tables
+
+
+def display_size_for(width, height, max_width=MAX_DISPLAY_SIZE[0], max_height=MAX_DISPLAY_SIZE[1]):
+    """Visualizer display size: half the source size, capped to max_width/max_height"""
+    aspect_ratio = width / height if height else 1.0
+    if aspect_ratio > 1:
+        display_width = min(max_width, width // 2)
+        display_height = int(display_width / aspect_ratio)
+    else:
+        display_height = min(max_height, height // 2)
+        display_width = int(display_height * aspect_ratio)
+    return max(1, display_width), max(1, display_height)
+
+
+def fit_size(size, bounds):
+    """Largest size with the aspect ratio of `size` that fits inside `bounds`"""
+    scale = min(bounds[0] / size[0], bounds[1] / size[1])
+    return max(1, int(size[0] * scale)), max(1, int(size[1] * scale))
+
+
+def convert_frame(frame, size, interpolation=cv2.INTER_AREA):
+    """Decoded BGR frame -> RGB at size, converting colour on the smaller of the two"""
+    if size[0] * size[1] > frame.shape[1] * frame.shape[0]:
+        return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), size, interpolation=interpolation)
+    return cv2.cvtColor(cv2.resize(frame, size, interpolation=interpolation), cv2.COLOR_BGR2RGB)
+
+
+class FrameProvider:
+    """Random access to a video's frames at display size with bounded memory
+
+    get() never blocks: it returns the frame if it is cached and otherwise
+    queues it for the decoder thread. on_frame_ready(index) is called from
+    the decoder thread whenever the most recently requested frame arrives.
+
+    proxy_path is an all-intra copy of the video already at display size; when
+    given, frames are decoded from it while path still identifies the video.
+    """
+
+    def __init__(self, path, display_size=None, memory_budget=DEFAULT_MEMORY_BUDGET,
+                 prefetch=PREFETCH_FRAMES, atlas_cache=None, interpolation=cv2.INTER_AREA,
+                 fill_atlas=True, proxy_path=None):
+        self.path = path
+        self.decode_path = proxy_path or path
+        self.capture = cv2.VideoCapture(self.decode_path)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open video file: {self.decode_path}")
+
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if proxy_path:
+            self.display_size = display_size or (self.width, self.height)
+        else:
+            self.display_size = display_size or display_size_for(self.width, self.height)
+
+        self.prefetch = prefetch
+        self._cache = OrderedDict()     # index -> RGB ndarray, oldest first
+        self._lock = threading.Lock()
+        self.set_memory_budget(memory_budget)
+        self.interpolation = interpolation
+        self.on_frame_ready = None
+
+        # Persistent atlas - when available it replaces the in-memory LRU
+        self.atlas_cache = atlas_cache
+        self.atlas = atlas_cache.open(path, self.frame_count, self.display_size) if atlas_cache else None
+        self.atlas_fill = None
+        self.fill_atlas = False
+
+        self._wakeup = threading.Event()
+        self._requested = None
+        self._last_requested = None
+        self._direction = 1
+        self._next_read = 0             # frame the capture will return on the next read()
+        # Coarse pass only when the frames can stay cached (not for huge fullscreen frames)
+        self._coarse = np.unique(np.round(
+            np.linspace(0, max(0, self.frame_count - 1), COARSE_POSITIONS)).astype(int)).tolist()
+        if self.atlas is None and self.capacity < len(self._coarse) + prefetch * 3:
+            self._coarse = []
+        self.coarse_stride = max(1, self.frame_count // COARSE_POSITIONS)
+        self.running = True
+        self._thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self._thread.start()
+        if fill_atlas:
+            self.start_atlas_fill()
+
+    def __len__(self):
+        return self.frame_count
+
+    @property
+    def memory_used(self):
+        return sum(frame.nbytes for frame in self._cache.values())
+
+    def get(self, index):
+        """Cached frame for index, or None while it is being decoded"""
+        index = max(0, min(self.frame_count - 1, index))
+        if self.atlas is not None:
+            frame = self.atlas.get(index)
+        else:
+            with self._lock:
+                frame = self._cache.get(index)
+                if frame is not None:
+                    self._cache.move_to_end(index)
+        self.request(index)
+        return frame
+
+    def nearest(self, index, radius=None):
+        """Closest cached frame to index - something to show while decoding"""
+        radius = radius or max(self.prefetch * 4, self.coarse_stride)
+        with self._lock:
+            for offset in range(radius + 1):
+                for candidate in (index - offset * self._direction, index + offset * self._direction):
+                    if self.atlas is not None:
+                        frame = self.atlas.get(candidate) if 0 <= candidate < self.frame_count else None
+                    else:
+                        frame = self._cache.get(candidate)
+                    if frame is not None:
+                        return frame
+        return None
+
+    def set_memory_budget(self, memory_budget):
+        """Resize the in-memory LRU, evicting down to it right away"""
+        frame_bytes = self.display_size[0] * self.display_size[1] * 3
+        self.capacity = max(self.prefetch * 2, memory_budget // frame_bytes)
+        with self._lock:
+            self._evict()
+
+    def start_atlas_fill(self):
+        """Decode the whole video into the atlas from now on - on worker processes when
+        there are cores to spare, otherwise in the decoder's idle time"""
+        self.fill_atlas = True
+        if self.atlas is not None and not self.atlas.complete and self.atlas_fill is None:
+            fill = ParallelAtlasFill(self.decode_path, self.atlas)
+            if fill.start():
+                self.atlas_fill = fill
+        self._wakeup.set()
+
+    def request(self, index):
+        """Ask for index (and frames beyond it in the direction of motion)"""
+        if index == self._requested:
+            return
+        if self._last_requested is not None and index != self._last_requested:
+            self._direction = 1 if index > self._last_requested else -1
+        self._last_requested = index
+        self._requested = index
+        self._wakeup.set()
+
+    def close(self, wait=True):
+        """Stop the decoder; waits for it so the capture is released cleanly"""
+        self.running = False
+        self._wakeup.set()
+        if self.atlas_fill:
+            self.atlas_fill.cancel()
+        if wait and threading.current_thread() is not self._thread:
+            self._thread.join(timeout=2.0)
+
+    def _decode_loop(self):
+        try:
+            while self.running:
+                if not self._wakeup.is_set():
+                    # Idle: coarse positions first, then the rest of the atlas
+                    if self._coarse:
+                        self._fill_coarse()
+                        continue
+                    if self.fill_atlas and self.atlas is not None and not self.atlas.complete:
+                        if self.atlas_fill and self.atlas_fill.active:
+                            self._wakeup.wait(0.1)  # worker processes are filling it
+                        else:
+                            self._fill_atlas()
+                        continue
+                self._wakeup.wait()
+                self._wakeup.clear()
+                index = self._requested
+                if index is None:
+                    continue
+                # Keep a runway of two spans cached ahead of the request; decode
+                # the next span in play order so reads stay sequential
+                if self._direction > 0:
+                    first = index
+                    limit = min(self.frame_count - 1, index + self.prefetch * 2)
+                    while first <= limit and self._cached(first):
+                        first += 1
+                    if first > limit:
+                        continue
+                    last = min(self.frame_count - 1, first + self.prefetch)
+                else:
+                    last = index
+                    limit = max(0, index - self.prefetch * 2)
+                    while last >= limit and self._cached(last):
+                        last -= 1
+                    if last < limit:
+                        continue
+                    first = max(0, last - self.prefetch)
+                self._decode_span(first, last, index)
+                self._wakeup.set()  # re-check the runway for the latest request
+        finally:
+            self.capture.release()
+            if self.atlas_cache:
+                self.atlas_cache.release(self.atlas)
+
+    def _fill_coarse(self):
+        """Idle work: decode one coarse position, continuing upward from the decoder"""
+        slot = bisect.bisect_left(self._coarse, self._next_read)
+        index = self._coarse.pop(slot if slot < len(self._coarse) else 0)
+        if self._cached(index):
+            return
+        gap = index - self._next_read
+        if not 0 <= gap <= TABLE_GRAB_GAP:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self._next_read = index
+        while self._next_read < index and self.capture.grab():
+            self._next_read += 1
+        ok, frame = self.capture.read()
+        if not ok:
+            self._next_read = -1  # position unknown - seek next time
+            return
+        self._next_read = index + 1
+        self._store(index, self._convert(frame))
+        if self.on_frame_ready and index != self._requested:
+            self.on_frame_ready(index)
+
+    def _fill_atlas(self):
+        """Idle work: decode the next span the atlas doesn't have yet, continuing from
+        where the decoder is so reads stay sequential"""
+        first = self.atlas.first_missing(min(self._next_read, self.frame_count - 1))
+        if first is None:
+            return
+        last = min(self.frame_count - 1, first + self.prefetch)
+        self._decode_span(first, last, self._requested)
+
+    def _decode_span(self, first, last, wanted):
+        if self._next_read != first:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, first)
+            self._next_read = first
+        for frame_index in range(first, last + 1):
+            if not self.running:
+                return
+            requested = self._requested
+            if requested != wanted:
+                if requested is not None and not self._cached(requested) and not first <= requested <= last:
+                    return  # newer request outside this span - the loop picks it up
+                wanted = requested
+            if self._cached(frame_index):
+                ok = self.capture.grab()  # keep the decoder in step without converting
+            else:
+                ok, frame = self.capture.read()
+                if ok:
+                    self._store(frame_index, self._convert(frame))
+            self._next_read = frame_index + 1
+            if not ok:
+                return
+            if frame_index == wanted and self.on_frame_ready:
+                self.on_frame_ready(frame_index)
+
+    def _convert(self, frame):
+        return convert_frame(frame, self.display_size, self.interpolation)
+
+    def _cached(self, index):
+        if self.atlas is not None:
+            return self.atlas.has(index)
+        with self._lock:
+            return index in self._cache
+
+    def _in_runway(self, index):
+        """Prefetched frames ahead of the latest request are protected from eviction"""
+        requested = self._requested
+        if requested is None:
+            return False
+        ahead = (index - requested) * self._direction
+        return 0 <= ahead <= self.prefetch * 3
+
+    def _store(self, index, frame):
+        if self.atlas is not None:
+            self.atlas.put(index, frame)
+            return
+        with self._lock:
+            self._cache[index] = frame
+            self._cache.move_to_end(index)
+            self._evict()
+
+    def _evict(self):
+        """Trim the LRU to capacity - caller holds the lock"""
+        while len(self._cache) > self.capacity:
+            # Least recently used first, skipping the prefetch runway
+            victim = next((key for key in self._cache if not self._in_runway(key)), None)
+            if victim is None:
+                self._cache.popitem(last=False)
+            else:
+                del self._cache[victim]
+
+
+class PositionFrameTable:
+    """Only the frames at N evenly spaced positions, decoded up front
+
+    Playback only ever shows about as many distinct frames as there are
+    positions, so a long clip needs N frames instead of all of them. The
+    positions are split into contiguous chunks read in parallel, each reader
+    grabbing forward between nearby targets instead of seeking. Frames are
+    pre-rendered at the windowed size and, when fullscreen_bounds is given and
+    they fit the budget, at the fullscreen size too.
+
+    Same interface as FrameProvider - get() snaps a frame index to the nearest
+    table frame. frame_indices overrides the evenly spaced frames (for a
+    motion-aligned mapping, where positions aren't spread evenly over the clip).
+    """
+
+    def __init__(self, path, positions=TABLE_POSITIONS, display_size=None, fullscreen_bounds=None,
+                 readers=TABLE_READERS, fullscreen_budget=FULLSCREEN_TABLE_BUDGET, frame_indices=None):
+        self.path = path
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise IOError(f"Could not open video file: {path}")
+        self.fps = capture.get(cv2.CAP_PROP_FPS) or 30
+        self.frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        capture.release()
+        self.display_size = display_size or display_size_for(self.width, self.height)
+
+        self.mapped = frame_indices is not None
+        if self.mapped:
+            self.indices = np.unique(np.clip(np.asarray(frame_indices, dtype=int), 0, self.frame_count - 1))
+        else:
+            self.indices = np.unique(np.round(np.linspace(0, self.frame_count - 1,
+                                                          max(2, min(positions, self.frame_count)))).astype(int))
+        self.positions = len(self.indices)
+        self.frames = [None] * self.positions
+        self.loaded = 0
+
+        self.fullscreen_size = None
+        self.fullscreen_frames = None
+        if fullscreen_bounds:
+            size = fit_size(self.display_size, fullscreen_bounds)
+            if size[0] * size[1] * 3 * self.positions <= fullscreen_budget:
+                self.fullscreen_size = size
+                self.fullscreen_frames = [None] * self.positions
+
+        self.on_frame_ready = None
+        self.running = True
+        chunks = np.array_split(np.arange(self.positions), max(1, min(readers, self.positions)))
+        # The reader holding the middle position (where playback starts) begins there
+        middle = self.positions // 2
+        chunks = [np.roll(chunk, -int(np.searchsorted(chunk, middle))) if chunk[0] <= middle <= chunk[-1]
+                  else chunk for chunk in chunks]
+        self._threads = [threading.Thread(target=self._read_chunk, args=(chunk,), daemon=True)
+                         for chunk in chunks]
+        for thread in self._threads:
+            thread.start()
+
+    def __len__(self):
+        return self.frame_count
+
+    @property
+    def memory_used(self):
+        frames = self.frames + (self.fullscreen_frames or [])
+        return sum(frame.nbytes for frame in frames if frame is not None)
+
+    @property
+    def memory_needed(self):
+        """Bytes the table holds once every frame is decoded"""
+        frame_bytes = self.display_size[0] * self.display_size[1] * 3
+        if self.fullscreen_size:
+            frame_bytes += self.fullscreen_size[0] * self.fullscreen_size[1] * 3
+        return self.positions * frame_bytes
+
+    def slot(self, index):
+        """Table position of the table frame nearest to a frame index"""
+        slot = int(np.searchsorted(self.indices, index))
+        if slot >= self.positions or (slot > 0 and index - self.indices[slot - 1] < self.indices[slot] - index):
+            slot -= 1
+        return slot
+
+    def get(self, index):
+        return self.frames[self.slot(index)]
+
+    def get_fullscreen(self, index):
+        """Pre-rendered fullscreen frame, None if not loaded or over the budget"""
+        if self.fullscreen_frames is None:
+            return None
+        return self.fullscreen_frames[self.slot(index)]
+
+    def nearest(self, index, radius=None):
+        slot = self.slot(index)
+        for offset in range(radius or self.positions):
+            for candidate in (slot - offset, slot + offset):
+                if 0 <= candidate < self.positions and self.frames[candidate] is not None:
+                    return self.frames[candidate]
+        return None
+
+    def request(self, index):
+        """Nothing to schedule - every position is being loaded already"""
+
+    def close(self, wait=True):
+        self.running = False
+        if wait:
+            for thread in self._threads:
+                if thread is not threading.current_thread():
+                    thread.join(timeout=2.0)
+
+    def _read_chunk(self, slots):
+        capture = cv2.VideoCapture(self.path)
+        position = None  # frame the capture returns on the next read()
+        try:
+            for slot in slots:
+                if not self.running:
+                    return
+                target = int(self.indices[slot])
+                if position is None or not 0 <= target - position <= TABLE_GRAB_GAP:
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    position = target
+                while position < target and capture.grab():
+                    position += 1
+                ok, frame = capture.read()
+                if not ok:
+                    position = None
+                    continue
+                position += 1
+                if self.fullscreen_frames is not None:
+                    self.fullscreen_frames[slot] = convert_frame(frame, self.fullscreen_size, cv2.INTER_LINEAR)
+                self.frames[slot] = convert_frame(frame, self.display_size)
+                self.loaded += 1
+                if self.on_frame_ready:
+                    self.on_frame_ready(target)
+        finally:
+            capture.release()
+
+
+
+class VideoPreloader:
+    """Keeps frame providers open for the videos likely to be shown next
+
+    open_provider(path) builds a provider in the background (it starts on the
+    middle frame and coarse positions on its own); take(path) hands a ready one
+    over so switching is a swap instead of a cold load.
+
+    All preloaded videos share one memory_budget: position tables reserve what
+    they hold when complete, FrameProviders split the rest of it evenly (see
+    provider_budget) and are resized whenever the preloaded set changes.
+    Atlas-backed frames live in mapped files and are not counted.
+    """
+
+    def __init__(self, open_provider, memory_budget=PRELOAD_MEMORY_BUDGET):
+        self.open_provider = open_provider
+        self.memory_budget = memory_budget
+        self.providers = {}     # path -> provider (None while it is being opened)
+        self._lock = threading.Lock()
+
+    def provider_budget(self):
+        """LRU budget for a FrameProvider being preloaded now"""
+        with self._lock:
+            return self._share()
+
+    def _reserved(self):
+        return sum(provider.memory_needed for provider in self.providers.values()
+                   if isinstance(provider, PositionFrameTable))
+
+    def _share(self):
+        """Even split of what the tables leave over everything else - lock held"""
+        tables = sum(isinstance(provider, PositionFrameTable) for provider in self.providers.values())
+        slots = max(1, len(self.providers) - tables)
+        return max(0, self.memory_budget - self._reserved()) // slots
+
+    def _rebalance(self):
+        share = self._share()
+        for provider in self.providers.values():
+            if isinstance(provider, FrameProvider):
+                provider.set_memory_budget(share)
+
+    def prepare(self, paths):
+        """Preload exactly these videos - providers for any others are closed"""
+        wanted = set(paths)
+        with self._lock:
+            stale = [path for path in self.providers if path not in wanted]
+            closing = [self.providers.pop(path) for path in stale]
+            starting = [path for path in wanted if path not in self.providers]
+            for path in starting:
+                self.providers[path] = None
+            self._rebalance()
+        for provider in closing:
+            if provider:
+                provider.close(wait=False)
+        for path in starting:
+            threading.Thread(target=self._open, args=(path,), daemon=True).start()
+
+    def _open(self, path):
+        try:
+            provider = self.open_provider(path)
+        except Exception as e:
+            print(f"⚠️ Preload failed for {os.path.basename(path)}: {e}")
+            provider = None
+        with self._lock:
+            keep = provider is not None and path in self.providers and self.providers[path] is None
+            if keep and isinstance(provider, PositionFrameTable):
+                if self._reserved() + provider.memory_needed > self.memory_budget:
+                    print(f"⚠️ Preload budget full - not keeping {os.path.basename(path)}")
+                    keep = False
+                    del self.providers[path]
+            if keep:
+                self.providers[path] = provider
+            elif provider is None and self.providers.get(path, False) is None:
+                del self.providers[path]
+            self._rebalance()
+        if provider and not keep:
+            provider.close(wait=False)  # no longer wanted, over budget, or taken while opening
+
+    def take(self, path):
+        """Preloaded provider for path (removed from the preloader), None if not ready"""
+        with self._lock:
+            provider = self.providers.pop(path, None)
+            self._rebalance()
+            return provider
+
+    def close(self):
+        self.prepare([])
@@ -0,0 +1,122 @@
+"""
+Intra-frame Video Proxies
+All-intra (MJPEG) copies of gallery videos at display resolution - every frame
+is a keyframe, so a random seek decodes one frame instead of everything since
+the previous keyframe of a long-GOP source
+"""
+
+import os
+import threading
+from collections import deque
+
+import cv2
+
+from video_frames import display_size_for
+
+DEFAULT_PROXY_DIR = os.path.join("gallery", "proxies")
+PROXY_FOURCC = 'MJPG'
+PROXY_SUFFIX = ".proxy.avi"
+
+
+def proxy_path_for(video_path, directory=DEFAULT_PROXY_DIR):
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(directory, name + PROXY_SUFFIX)
+
+
+def find_proxy(video_path, directory=DEFAULT_PROXY_DIR):
+    """Proxy for video_path if one exists and is newer than the source, else None"""
+    path = proxy_path_for(video_path, directory)
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(video_path):
+            return path
+    except OSError:
+        pass
+    return None
+
+
+def transcode_proxy(video_path, output_path, should_stop=None):
+    """Write an all-intra proxy of video_path at display size -> True on success
+
+    Written to a temporary file and moved into place only once every frame is
+    in it, so a proxy that exists is always complete.
+    """
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        return False
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    size = display_size_for(int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                            int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    temp_path = output_path[:-len(PROXY_SUFFIX)] + ".tmp.avi"
+    writer = cv2.VideoWriter(temp_path, cv2.VideoWriter_fourcc(*PROXY_FOURCC), fps, size)
+    written = 0
+    try:
+        if not writer.isOpened():
+            return False
+        while not (should_stop and should_stop()):
+            ok, frame = capture.read()
+            if not ok:
+                break
+            writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+            written += 1
+    finally:
+        capture.release()
+        writer.release()
+
+    # Frame indices must line up with the source for every consumer
+    check = cv2.VideoCapture(temp_path)
+    proxy_frames = int(check.get(cv2.CAP_PROP_FRAME_COUNT))
+    check.release()
+    if written == 0 or written != frame_count or proxy_frames != frame_count:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return False
+    os.replace(temp_path, output_path)
+    return True
+
+
+class ProxyTranscoder:
+    """Background queue building proxies for videos that don't have one yet"""
+
+    def __init__(self, directory=DEFAULT_PROXY_DIR):
+        self.directory = directory
+        self.queue = deque()
+        self.running = True
+        self.on_proxy_ready = None  # callback(video_path, proxy_path)
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def enqueue(self, video_paths):
+        for video_path in video_paths:
+            if video_path and video_path not in self.queue and not find_proxy(video_path, self.directory):
+                self.queue.append(video_path)
+        if self.queue:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, daemon=True)
+                self._thread.start()
+            self._wakeup.set()
+
+    def stop(self):
+        self.running = False
+        self._wakeup.set()
+
+    def _worker(self):
+        while self.running:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while self.running and self.queue:
+                video_path = self.queue.popleft()
+                if not os.path.exists(video_path) or find_proxy(video_path, self.directory):
+                    continue
+                os.makedirs(self.directory, exist_ok=True)
+                output_path = proxy_path_for(video_path, self.directory)
+                print(f"🎞️ Building intra-frame proxy: {os.path.basename(video_path)}")
+                if transcode_proxy(video_path, output_path, lambda: not self.running):
+                    print(f"✅ Proxy ready: {output_path}")
+                    if self.on_proxy_ready:
+                        self.on_proxy_ready(video_path, output_path)
+                elif self.running:
+                    print(f"⚠️ Proxy transcode failed: {os.path.basename(video_path)}")